@@ -20,12 +20,90 @@ XML_API_URL_TOTAL_COUNT = 'http://dbforms.ga.gov.au/www_distp/a.igsn_api.get_Num
 XML_API_URL_TOTAL_COUNT_DATE_RANGE = 'http://dbforms.ga.gov.au/www_distp/a.igsn_api.get_Number_Modified'\
                                      '?pModifiedFromDate={0}&pModifiedToDate={1}'
 
+# connection handling for the Oracle XML API, see model/upstream.py
+UPSTREAM_POOL_SIZE = 10  # max pooled keep-alive connections per process
+UPSTREAM_CONNECT_TIMEOUT = 3.05  # seconds
+UPSTREAM_READ_TIMEOUT = 30  # seconds
+UPSTREAM_RETRIES = 2  # retries after the first attempt for connection errors, timeouts & 502/503/504 responses
+UPSTREAM_BACKOFF = 0.25  # seconds, base of the jittered exponential backoff between retries
+UPSTREAM_BACKOFF_MAX = 2  # seconds
+# if set, a directory, writable by all worker processes, in which they coordinate so that concurrent fetches of the same
+# URL by different processes are made only once
+UPSTREAM_COALESCE_DIR = None
+UPSTREAM_COALESCE_WINDOW = 2  # seconds for which a fetched response is shared with processes waiting for it
+# the circuit breaker opens after this many consecutive failed, or slower than UPSTREAM_BREAKER_SLOW seconds, API calls
+UPSTREAM_BREAKER_FAILURES = 5
+UPSTREAM_BREAKER_SLOW = 10  # seconds
+UPSTREAM_BREAKER_RESET = 30  # seconds after which an open breaker lets a trial call through
+UPSTREAM_BACKGROUND_WORKERS = 4  # threads per process for API calls made concurrently with a request's own
+
+# cache of Samples loaded from the Oracle XML API, see model/cache.py
+SAMPLE_CACHE_MAX_ENTRIES = 10000
+SAMPLE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # approximate
+SAMPLE_CACHE_TTL = 300  # seconds
+SAMPLE_CACHE_STALE_TTL = 86400  # seconds past SAMPLE_CACHE_TTL that a Sample may be given while it is reloaded
+
+# cache of Samples' rendered views, for /sample/<igsn> & OAI-PMH GetRecord. Keyed by the Samples' modified dates too, so
+# a view is rendered again once a modified Sample is reloaded into SAMPLE_CACHE.
+RENDER_CACHE_MAX_ENTRIES = 20000
+RENDER_CACHE_MAX_BYTES = 128 * 1024 * 1024  # approximate
+RENDER_CACHE_TTL = 3600  # seconds
+
+# compression of responses, negotiated by Accept-Encoding, see controller/compression.py. The compressed bytes of
+# responses with a strong ETag, such as Samples' views from RENDER_CACHE, are cached too.
+COMPRESSION_ENABLED = True
+COMPRESSION_MIN_SIZE = 1024  # bytes, smaller (non-streamed) responses are sent uncompressed
+COMPRESSION_GZIP_LEVEL = 6  # 1-9
+COMPRESSION_BROTLI_QUALITY = 5  # 0-11, if the brotli package is installed
+COMPRESSED_CACHE_MAX_ENTRIES = 20000
+COMPRESSED_CACHE_MAX_BYTES = 32 * 1024 * 1024
+COMPRESSED_CACHE_TTL = 3600  # seconds
+
+# cache of record counts (Register size & OAI-PMH completeListSize) from the Oracle XML API
+COUNT_CACHE_MAX_ENTRIES = 1000
+COUNT_CACHE_TTL = 600  # seconds
+COUNT_CACHE_REFRESH_AFTER = 60  # seconds after which a cached count is refreshed in the background
+COUNT_CACHE_STALE_TTL = 86400  # seconds past COUNT_CACHE_TTL that a count may be given while it is refreshed
+# seconds to wait for the Register size, fetched alongside a Register page, before the page is given without a last link
+REGISTER_COUNT_DEADLINE = 2
+
+# cache of Register pages' IGSNs from the Oracle XML API, by page & number per page
+REGISTER_PAGE_CACHE_MAX_ENTRIES = 1000
+REGISTER_PAGE_CACHE_TTL = 300  # seconds
+REGISTER_PAGE_CACHE_STALE_TTL = 86400  # seconds past REGISTER_PAGE_CACHE_TTL that a page may be given while refetched
+
+# cache of the earliest modified date, for OAI-PMH Identify
+EARLIEST_DATESTAMP_TTL = 86400  # seconds
+EARLIEST_DATESTAMP_REFRESH_AFTER = 3600  # seconds after which it is refreshed in the background
+EARLIEST_DATESTAMP_STALE_TTL = 7 * 86400  # seconds past EARLIEST_DATESTAMP_TTL that it may be given while refreshed
+
+# speculative prefetch of the next page of OAI-PMH ListIdentifiers & ListRecords results
+OAI_PREFETCH_MAX_CONCURRENT = 2  # per process, 0 to disable prefetching
+OAI_PREFETCH_MAX_PAGES = 16
+OAI_PREFETCH_MAX_BYTES = 128 * 1024 * 1024
+OAI_PREFETCH_TTL = 300  # seconds
+# seconds past OAI_PREFETCH_TTL that a page may be given, to a harvester asking for it again, while it is refetched
+OAI_PAGE_STALE_TTL = 86400
+
+# local SQLite mirror of the Oracle Samples table, see model/mirror.py
+MIRROR_ENABLED = False  # if True, read Samples, the Register & OAI-PMH pages from the mirror rather than the API
+MIRROR_PATH = join(APP_DIR, 'mirror.sqlite')
+MIRROR_SYNC_BATCH_SIZE = 1000  # samples per SampleSet API page when backfilling or syncing
+MIRROR_SYNC_OVERLAP = 3600  # seconds by which successive sync windows overlap
+
+# bulk dump of every sample, see model/dump.py
+DUMP_PAGE_SIZE = 1000  # samples per SampleSet API, or mirror, page
+
 ADMIN_EMAIL = 'dataman@ga.gov.au'
 
 REGISTER_BASE_URI = 'http://pid.geoscience.gov.au/sample/'
 URI_SAMPLE_CLASS = 'http://pid.geoscience.gov.au/def/ont/ga/igsn#Sample'
 URI_SAMPLE_INSTANCE_BASE = 'http://pid.geoscience.gov.au/sample/'
 BASE_URI_OAI = 'http://pid.geoscience.gov.au/oai'
+# the @context of Samples' & the Register's JSON-LD, which refers to it by URL. A published context must not change: a
+# changed context is a new version, in a new file.
+JSONLD_CONTEXT_URI = 'http://pid.geoscience.gov.au/static/context/samples-1.0.jsonld'
+JSONLD_CONTEXT_PATH = join(STATIC_DIR, 'context', 'samples-1.0.jsonld')
 
 OAI_BATCH_SIZE = 1000
 
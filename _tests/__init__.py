@@ -3,6 +3,55 @@ Constructor for test module
 Unit tests for the Sample class
 """
 import logging
+import os
+import unittest
+from unittest import mock
+from lxml import etree
+from app import app
+from model import sample
+from model.sample import SampleRecord
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
+
+STATIC_DATA = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'static_data')
+
+
+def static_xml(filename='AU239.xml'):
+    """
+    :param filename: the name of a file in static_data
+    :return: the file's content, as bytes
+    """
+    with open(os.path.join(STATIC_DATA, filename), 'rb') as f:
+        return f.read()
+
+
+def static_row(filename='AU239.xml'):
+    """
+    :param filename: the name of a Samples API response in static_data
+    :return: the response's first ROW element, serialised, for making pages of rows with other IGSNs
+    """
+    return etree.tostring(etree.fromstring(static_xml(filename)).find('ROW'))
+
+
+class SampleTestCase(unittest.TestCase):
+    """
+    A TestCase of requests for the AU239 Sample, from static_data, without calling the API and with empty caches
+    """
+
+    def setUp(self):
+        self.xml = static_xml()
+        self.record = SampleRecord.from_xml(self.xml)
+        sample.SAMPLE_CACHE.purge()
+        sample.RENDER_CACHE.purge()
+
+    def get(self, uri, headers=None, record=None, **kwargs):
+        """
+        :param uri: the URI to request
+        :param headers: the request's headers
+        :param record: the SampleRecord any Sample is loaded from, defaults to AU239's
+        :param kwargs: other arguments of the test client's get(), e.g. base_url
+        :return: the Response
+        """
+        with mock.patch('model.sample.Sample._load_record', return_value=record or self.record):
+            return app.test_client().get(uri, headers=headers, **kwargs)
@@ -0,0 +1,55 @@
+"""
+Benchmarks making the Samples for a 1000-row OAI-PMH ListRecords/ListIdentifiers page, comparing re-parsing each ROW
+from its serialisation with making each Sample straight from the parsed ROW element and with decoding the page into
+columns, as for ListIdentifiers.
+
+The page is recorded from the AU239 Samples API response in static_data, repeated with different IGSNs.
+
+Timings vary a good deal between runs and machines. On a shared Linux VM, with Python 3.11 and lxml 6, from_elements
+took 17-29% less time than reparse_each_row: e.g. 282 ms against 231 ms, and 236 ms against 193 ms at the commit that
+introduced it.
+
+Usage, from the repository root:
+    python -m _tests.bench_oai_page
+"""
+import timeit
+from io import BytesIO
+from lxml import etree
+from model import Sample
+from model.sampleset import SampleSet
+from _tests import static_row
+from controller.oai_functions import _samples_from_api_response
+
+ROWS = 1000
+REPEATS = 5
+
+
+def make_page(rows=ROWS):
+    row = static_row()
+    return b'<?xml version="1.0"?>\n<ROWSET>' + \
+        b''.join(row.replace(b'AU239', 'AU{}'.format(i).encode()) for i in range(rows)) + \
+        b'</ROWSET>'
+
+
+def reparse_each_row(xml):
+    # how pages were handled before Sample.from_element()
+    return [
+        Sample(None, '<root>{}</root>'.format(etree.tostring(elem)))
+        for event, elem in etree.iterparse(BytesIO(xml), tag='ROW')
+    ]
+
+
+def from_elements(xml):
+    return _samples_from_api_response(BytesIO(xml))
+
+
+def columns(xml):
+    return SampleSet.from_api_response(BytesIO(xml))
+
+
+if __name__ == '__main__':
+    page = make_page()
+    print('{} rows, {} KB of XML'.format(ROWS, len(page) // 1024))
+    for fn in (reparse_each_row, from_elements, columns):
+        seconds = min(timeit.repeat(lambda: fn(page), number=1, repeat=REPEATS))
+        print('{:<18} {:7.1f} ms'.format(fn.__name__, seconds * 1000))
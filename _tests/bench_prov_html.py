@@ -0,0 +1,129 @@
+"""
+Benchmarks drawing the vis.js network of a Sample's provenance, for the PROV view's HTML, comparing the SPARQL UPDATEs
+and SELECTs, over a Graph parsed from the Sample's PROV Turtle, that it was drawn with before with walking the
+Sample's PROV triples.
+
+The Sample is AU239 from static_data, with a collector so that it has a blank node Agent.
+
+Usage, from the repository root:
+    python -m _tests.bench_prov_html
+"""
+import timeit
+from rdflib import Graph
+from model.sample import Sample, SampleRecord
+from _tests import static_xml
+
+REPEATS = 5
+NUMBER = 20
+
+PRECONSTRUCT = [
+    '''
+    PREFIX prov: <http://www.w3.org/ns/prov#>
+    DELETE {
+        ?a prov:generated ?e .
+    }
+    INSERT {
+        ?e prov:wasGeneratedBy ?a .
+    }
+    WHERE {
+        ?a prov:generated ?e .
+    }
+    ''',
+    '''
+    PREFIX prov: <http://www.w3.org/ns/prov#>
+    PREFIX foaf: <http://xmlns.com/foaf/0.1/>
+    INSERT {
+        ?e prov:wasAttributedTo ?a .
+        ?a rdfs:label ?n .
+    }
+    WHERE {
+        ?e prov:qualifiedAttribution/prov:agent ?a .
+        ?a foaf:name ?n .
+    }
+    ''',
+    '''
+    PREFIX prov: <http://www.w3.org/ns/prov#>
+    PREFIX foaf: <http://xmlns.com/foaf/0.1/>
+    INSERT {
+        ?a a prov:Agent
+    }
+    WHERE {
+        {?a a foaf:Organization}
+        UNION
+        {?a a prov:Person}
+    }
+    '''
+]
+NODES = '''
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    PREFIX prov: <http://www.w3.org/ns/prov#>
+    SELECT *
+    WHERE {
+        ?s a ?o .
+        {?s a prov:Entity .}
+        UNION
+        {?s a prov:Activity .}
+        UNION
+        {?s a prov:Agent .}
+        OPTIONAL {?s rdfs:label ?label .}
+    }
+'''
+EDGES = '''
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    PREFIX prov: <http://www.w3.org/ns/prov#>
+    SELECT *
+    WHERE {
+        ?s ?p ?o .
+        ?s prov:wasAttributedTo|prov:wasGeneratedBy|prov:used|prov:wasDerivedFrom|prov:wasInformedBy ?o .
+    }
+'''
+NODE_TEMPLATES = {
+    'http://www.w3.org/ns/prov#Entity': ('Entity', '{id: "%(node_id)s", label: "%(label)s", shape: "ellipse", '
+                                                   'color:{background:"#FFFC87", border:"#808080"}}'),
+    'http://www.w3.org/ns/prov#Activity': ('Activity', '{id: "%(node_id)s", label: "%(label)s", shape: "box", '
+                                                       'color:{background:"#9FB1FC", border:"blue"}}'),
+    'http://www.w3.org/ns/prov#Agent': ('Agent', '{id: "%(node_id)s", label: "%(label)s", '
+                                                 'image: "/static/img/ga/agent.png", shape: "image"}')
+}
+EDGE_TEMPLATE = '{from: "%(from)s", to: "%(to)s", arrows:"to", font: {align: "bottom"}, color:{color:"black"}, ' \
+                'label: "%(relationship)s"}'
+
+
+def make_sample():
+    xml = static_xml().replace(b'<ROW>', b'<ROW><ORIGINATOR>Jane Smith</ORIGINATOR>', 1)
+    return Sample(None, record=SampleRecord.from_xml(xml))
+
+
+def sparql_visjs(sample):
+    """
+    How the vis.js network was drawn before Sample._make_vsjs() walked the triples
+
+    :return: a (list of node JavaScript objects, list of edge JavaScript objects) tuple, in SPARQL result order
+    """
+    g = Graph().parse(data=sample.export_rdf('prov', 'text/turtle'), format='turtle')
+    for u in PRECONSTRUCT:
+        g.update(u)
+
+    nodes = []
+    for row in g.query(NODES):
+        if str(row['o']) in NODE_TEMPLATES:
+            default_label, template = NODE_TEMPLATES[str(row['o'])]
+            nodes.append(template % {
+                'node_id': row['s'],
+                'label': row['label'] if row['label'] is not None else default_label
+            })
+    edges = []
+    for row in g.query(EDGES):
+        edges.append(EDGE_TEMPLATE % {'from': row['s'], 'to': row['o'], 'relationship': str(row['p']).split('#')[1]})
+    return nodes, edges
+
+
+def walk_triples(sample):
+    return sample._make_vsjs(sample._rdf_triples('prov'))
+
+
+if __name__ == '__main__':
+    s = make_sample()
+    for fn in (sparql_visjs, walk_triples):
+        seconds = min(timeit.repeat(lambda: fn(s), number=NUMBER, repeat=REPEATS)) / NUMBER
+        print('{:<14} {:7.2f} ms'.format(fn.__name__, seconds * 1000))
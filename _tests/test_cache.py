@@ -0,0 +1,123 @@
+import threading
+import time
+import unittest
+from unittest import mock
+from model.cache import TTLCache, SingleFlight
+
+
+class TestTTLCache(unittest.TestCase):
+    """
+    Tests for the in-process TTL/LRU cache
+    """
+
+    def test_hit_and_miss(self):
+        c = TTLCache(10, 60)
+        self.assertIsNone(c.get('AU239'))
+        c.set('AU239', {'igsn': 'AU239'})
+        self.assertEqual(c.get('AU239'), {'igsn': 'AU239'})
+        self.assertEqual(c.stats()['hits'], 1)
+        self.assertEqual(c.stats()['misses'], 1)
+
+    def test_ttl_expiry(self):
+        c = TTLCache(10, 60)
+        with mock.patch('model.cache.time.time', return_value=1000):
+            c.set('AU239', 'x')
+        with mock.patch('model.cache.time.time', return_value=1059):
+            self.assertEqual(c.get('AU239'), 'x')
+        with mock.patch('model.cache.time.time', return_value=1061):
+            self.assertIsNone(c.get('AU239'))
+        self.assertEqual(len(c), 0)
+
+    def test_lru_eviction(self):
+        c = TTLCache(2, 60)
+        c.set('a', 1)
+        c.set('b', 2)
+        c.get('a')  # b is now least recently used
+        c.set('c', 3)
+        self.assertIsNone(c.get('b'))
+        self.assertEqual(c.get('a'), 1)
+        self.assertEqual(c.get('c'), 3)
+        self.assertEqual(c.stats()['evictions'], 1)
+
+    def test_max_bytes(self):
+        c = TTLCache(100, 60, max_bytes=250, sizeof=lambda v: 100)
+        c.set('a', 1)
+        c.set('b', 2)
+        c.set('c', 3)
+        self.assertEqual(len(c), 2)
+        self.assertLessEqual(c.current_bytes, 250)
+
+    def test_purge(self):
+        c = TTLCache(10, 60)
+        c.set('a', 1)
+        c.set('b', 2)
+        c.purge('a')
+        self.assertIsNone(c.get('a'))
+        c.purge()
+        self.assertEqual(len(c), 0)
+        self.assertEqual(c.current_bytes, 0)
+
+    def test_get_or_compute_single_flight(self):
+        c = TTLCache(10, 60)
+        calls = []
+
+        def count():
+            calls.append(1)
+            time.sleep(0.2)
+            return 6267770
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(c.get_or_compute('all', count))) for i in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [6267770] * 5)
+
+    def test_get_or_compute_background_refresh(self):
+        c = TTLCache(10, 60)
+        c.set('all', 1)
+        refreshed = threading.Event()
+
+        def count():
+            refreshed.set()
+            return 2
+
+        with mock.patch('model.cache.time.time', return_value=time.time() + 30):
+            # the stale value is returned immediately and refreshed in the background
+            self.assertEqual(c.get_or_compute('all', count, refresh_after=10), 1)
+        self.assertTrue(refreshed.wait(5))
+        for i in range(50):
+            if c.get('all') == 2:
+                break
+            time.sleep(0.01)
+        self.assertEqual(c.get('all'), 2)
+
+    def test_get_or_compute_serves_stale(self):
+        c = TTLCache(10, 60, stale_ttl=600)
+        with mock.patch('model.cache.time.time', return_value=1000):
+            c.set('AU239', 'old')
+
+        def unavailable():
+            raise ConnectionError('down')
+
+        with mock.patch('model.cache.time.time', return_value=1100), mock.patch('builtins.print'):
+            # expired, so get() misses, but get_or_compute() gives the stale value while it (fails to) refresh
+            self.assertIsNone(c.get('AU239'))
+            self.assertEqual(c.get_or_compute('AU239', unavailable), 'old')
+            self.assertEqual(c.stats()['stale_hits'], 1)
+        with mock.patch('model.cache.time.time', return_value=1700):
+            self.assertRaises(ConnectionError, c.get_or_compute, 'AU239', unavailable)
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_error_is_shared(self):
+        sf = SingleFlight()
+        self.assertRaises(ZeroDivisionError, sf.do, 'k', lambda: 1 / 0)
+        self.assertFalse(sf.in_flight('k'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import gzip
+import unittest
+from io import BytesIO
+from unittest import mock
+from app import app
+from controller import compression
+from _tests import SampleTestCase
+
+
+class TestCompression(SampleTestCase):
+    """
+    Tests for the compression of responses, negotiated by Accept-Encoding
+    """
+
+    def setUp(self):
+        super().setUp()
+        compression.COMPRESSED_CACHE.purge()
+
+    def test_sample(self):
+        uri = '/sample/AU239?_view=igsn-o&_format=text/turtle'
+        plain = self.get(uri)
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual(plain.headers['Vary'], 'Accept-Encoding')
+
+        compressed = self.get(uri, {'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(int(compressed.headers['Content-Length']), len(compressed.data))
+        self.assertEqual(gzip.decompress(compressed.data), plain.data)
+        self.assertEqual(compressed.headers['ETag'], 'W/' + plain.headers['ETag'])
+
+        # compressed once, then served from COMPRESSED_CACHE, and If-None-Match is still answered
+        with mock.patch.object(compression, 'compress') as compress:
+            self.assertEqual(self.get(uri, {'Accept-Encoding': 'gzip'}).data, compressed.data)
+            response = self.get(uri, {'Accept-Encoding': 'gzip', 'If-None-Match': compressed.headers['ETag']})
+            self.assertEqual(response.status_code, 304)
+            compress.assert_not_called()
+
+    def test_html(self):
+        # weakly validated, but the same export_key() always gives the same body so it is compressed once too
+        uri = '/sample/AU239?_view=igsn-o&_format=text/html'
+        compressed = self.get(uri, {'Accept-Encoding': 'gzip'})
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertTrue(compressed.headers['ETag'].startswith('W/'))
+        with mock.patch.object(compression, 'compress') as compress:
+            self.assertEqual(self.get(uri, {'Accept-Encoding': 'gzip'}).data, compressed.data)
+            compress.assert_not_called()
+        # but not when requested through another host
+        proxied = self.get(uri, {'Accept-Encoding': 'gzip'}, base_url='https://pid.geoscience.gov.au/api')
+        self.assertIn(b'https://pid.geoscience.gov.au/api/sample/AU239', gzip.decompress(proxied.data))
+
+    def test_not_accepted(self):
+        uri = '/sample/AU239?_view=igsn-o&_format=text/turtle'
+        for accept_encoding in ('identity', 'gzip;q=0', 'compress'):
+            self.assertNotIn('Content-Encoding', self.get(uri, {'Accept-Encoding': accept_encoding}).headers)
+
+    def test_streamed(self):
+        rows = self.xml.split(b'<ROW>', 1)[1].split(b'</ROW>', 1)[0]
+        xml = b'<ROWSET>' + b''.join(
+            b'<ROW>' + rows.replace(b'AU239', 'AU{}'.format(i).encode()) + b'</ROW>' for i in range(500)
+        ) + b'</ROWSET>'
+
+        def fetch(url, parse=None):
+            return parse(BytesIO(xml))
+
+        def get(headers=None):
+            with mock.patch('model.upstream.fetch', side_effect=fetch), \
+                    mock.patch('model.register.get_register_size', return_value=1000):
+                response = app.test_client().get('/sample/?_view=reg&per_page=500&_format=text/turtle',
+                                                 headers=headers)
+                return response, list(response.response)
+
+        plain, plain_chunks = get()
+        compressed, chunks = get({'Accept-Encoding': 'gzip'})
+        self.assertTrue(compressed.is_streamed)
+        self.assertNotIn('Content-Length', compressed.headers)
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(len(chunks), len(plain_chunks) + 1)
+        # each chunk is flushed, so may be decompressed as soon as it is received
+        self.assertTrue(gzip.GzipFile(fileobj=BytesIO(chunks[0])).read1().startswith(b'@prefix'))
+        self.assertEqual(gzip.decompress(b''.join(chunks)), b''.join(plain_chunks))
+
+    @unittest.skipIf(compression.brotli is None, 'brotli is not installed')
+    def test_brotli(self):
+        uri = '/sample/AU239?_view=igsn-o&_format=text/turtle'
+        response = self.get(uri, {'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(compression.brotli.decompress(response.data), self.get(uri).data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import datetime
+import time
+import unittest
+from io import BytesIO
+from unittest import mock
+from app import app
+from model import sample
+from model.sample import Sample
+from _tests import SampleTestCase
+
+
+class TestConditional(SampleTestCase):
+    """
+    Tests for the ETag & Last-Modified headers of Sample, Register and GetRecord responses and 304 Not Modified
+    """
+
+    def test_sample_not_modified(self):
+        uri = '/sample/AU239?_view=igsn-o&_format=text/turtle'
+        first = self.get(uri)
+        self.assertEqual(first.status_code, 200)
+        self.assertFalse(first.headers['ETag'].startswith('W/'))
+        self.assertEqual(first.headers['Last-Modified'], 'Fri, 07 Apr 2017 15:10:48 GMT')
+
+        with mock.patch.object(Sample, '_export') as export:
+            response = self.get(uri, {'If-None-Match': first.headers['ETag']})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.headers['ETag'], first.headers['ETag'])
+            response = self.get(uri, {'If-Modified-Since': first.headers['Last-Modified']})
+            self.assertEqual(response.status_code, 304)
+            export.assert_not_called()
+
+        # another format, or an older copy, is sent in full
+        response = self.get('/sample/AU239?_view=igsn-o&_format=text/nt', {'If-None-Match': first.headers['ETag']})
+        self.assertEqual(response.status_code, 200)
+        response = self.get(uri, {'If-Modified-Since': 'Fri, 07 Apr 2017 15:10:47 GMT'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_strong_etag_means_same_bytes(self):
+        uri = '/sample/AU239?_view=prov&_format=text/turtle'
+        first = self.get(uri)
+        sample.RENDER_CACHE.purge()
+        second = self.get(uri)
+        self.assertEqual(first.headers['ETag'], second.headers['ETag'])
+        self.assertEqual(first.data, second.data)
+        # rdflib's serializations are only equivalent
+        self.assertTrue(self.get('/sample/AU239?_view=prov&_format=application/rdf%2Bxml')
+                        .headers['ETag'].startswith('W/'))
+
+    def test_get_record_not_modified(self):
+        uri = '/oai?verb=GetRecord&identifier=AU239&metadataPrefix=oai_dc'
+        first = self.get(uri)
+        self.assertTrue(first.headers['ETag'].startswith('W/'))
+        with mock.patch.object(Sample, '_export') as export:
+            response = self.get(uri, {'If-None-Match': first.headers['ETag']})
+            self.assertEqual(response.status_code, 304)
+            export.assert_not_called()
+
+    def test_register_not_modified(self):
+        client = app.test_client()
+        uri = '/sample/?_view=reg&_format=text/html&per_page=10'
+
+        def fetch(url, parse=None):
+            return parse(BytesIO(self.xml))
+
+        with mock.patch('model.upstream.fetch', side_effect=fetch), \
+                mock.patch('model.register.get_register_size', return_value=1):
+            first = client.get(uri)
+            self.assertEqual(first.status_code, 200)
+            self.assertEqual(first.headers['Last-Modified'], 'Fri, 07 Apr 2017 15:10:48 GMT')
+            response = client.get(uri, headers={'If-None-Match': first.headers['ETag']})
+            self.assertEqual(response.status_code, 304)
+            self.assertIn('rel="first"', response.headers['Link'])
+            # pages' IGSNs may shift without being modified
+            response = client.get(uri, headers={'If-Modified-Since': first.headers['Last-Modified']})
+            self.assertEqual(response.status_code, 200)
+
+    def test_aware_if_modified_since(self):
+        # Werkzeug 2 and later give If-Modified-Since as an aware datetime
+        uri = '/sample/AU239?_view=igsn-o&_format=text/turtle'
+        for since, status_code in ((datetime.datetime(2017, 4, 7, 15, 10, 48), 304),
+                                   (datetime.datetime(2017, 4, 7, 15, 10, 47), 200)):
+            with mock.patch('flask.Request.if_modified_since', new_callable=mock.PropertyMock,
+                            return_value=since.replace(tzinfo=datetime.timezone.utc)):
+                response = self.get(uri, {'If-Modified-Since': 'ignored'})
+            self.assertEqual(response.status_code, status_code)
+
+    def test_html_is_weak_and_modified_daily(self):
+        uri = '/sample/AU239?_view=igsn-o&_format=text/html'
+        first = self.get(uri)
+        self.assertTrue(first.headers['ETag'].startswith('W/'))
+        # the page gives the date it was accessed, so changes at the start of each day, as well as when the Sample does
+        self.assertEqual(first.last_modified.date(), datetime.datetime.utcfromtimestamp(
+            time.mktime(datetime.date.today().timetuple())).date())
+        response = self.get(uri, {'If-Modified-Since': 'Fri, 07 Apr 2017 15:10:48 GMT'})
+        self.assertEqual(response.status_code, 200)
+        response = self.get(uri, {'If-Modified-Since': first.headers['Last-Modified']})
+        self.assertEqual(response.status_code, 304)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import gzip
+import re
+import unittest
+from io import BytesIO
+from unittest import mock
+from lxml import etree
+from rdflib import Graph, URIRef
+from rdflib.compare import isomorphic
+from app import app
+import _config as conf
+from model import dump
+from _tests import static_row
+
+SAMPLES = 7
+PER_PAGE = 3
+
+
+class TestDump(unittest.TestCase):
+    """
+    Tests for the bulk dump of every Sample, read page by page
+    """
+
+    def setUp(self):
+        self.row = static_row()
+        self.urls = []
+
+    def get(self, url, stream=False):
+        self.urls.append(url)
+        page, per_page = [int(n) for n in re.search(r'pPageNo=(\d+)&pNoOfLinesPerPage=(\d+)', url).groups()]
+        first = (page - 1) * per_page
+        xml = b'<ROWSET>' + b''.join(
+            self.row.replace(b'AU239', 'AU{}'.format(i).encode())
+            for i in range(first, min(first + per_page, SAMPLES))
+        ) + b'</ROWSET>'
+        return mock.Mock(raw=BytesIO(xml))
+
+    def request(self, query):
+        with mock.patch('model.upstream.get', side_effect=self.get), \
+                mock.patch.object(conf, 'DUMP_PAGE_SIZE', PER_PAGE), \
+                mock.patch.object(conf, 'MIRROR_ENABLED', False):
+            response = app.test_client().get('/sample/dump' + query)
+            return response, response.is_streamed, response.data
+
+    def test_rdf(self):
+        for mimetype, rdf_format in (('text/nt', 'nt'), ('text/turtle', 'turtle')):
+            self.urls = []
+            response, streamed, data = self.request('?_format=' + mimetype)
+            self.assertTrue(streamed, mimetype)
+            self.assertEqual(response.mimetype, mimetype)
+            g = Graph().parse(data=data, format=rdf_format)
+            for i in range(SAMPLES):
+                self.assertIn((URIRef(conf.REGISTER_BASE_URI + 'AU{}'.format(i)), None, None), g)
+            self.assertEqual(len(self.urls), 3)  # the last page is short
+
+    def test_each_sample_as_exported(self):
+        _, _, data = self.request('?_format=text/turtle&_view=prov')
+        expected = Graph()
+        for i in range(SAMPLES):
+            row = self.row.replace(b'AU239', 'AU{}'.format(i).encode())
+            s = dump.Sample(None, xml=b'<ROWSET>' + row + b'</ROWSET>')
+            expected.parse(data=s.export_rdf('prov', 'text/nt'), format='nt')
+        self.assertTrue(isomorphic(Graph().parse(data=data, format='turtle'), expected))
+
+    def test_xml_gz(self):
+        response, _, data = self.request('?_format=application/gzip')
+        self.assertEqual(response.headers['Content-Disposition'], 'attachment; filename=samples.xml.gz')
+        rows = etree.fromstring(gzip.decompress(data)).findall('ROW')
+        self.assertEqual([row.findtext('IGSN') for row in rows], ['AU{}'.format(i) for i in range(SAMPLES)])
+
+    def test_invalid(self):
+        self.assertEqual(self.request('?_format=text/html')[0].status_code, 400)
+        self.assertEqual(self.request('?_view=reg')[0].status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
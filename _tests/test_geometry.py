@@ -0,0 +1,73 @@
+import unittest
+from model.geometry import Geometry, ordinates_array
+from model.sample import SampleRecord
+from _tests import static_xml
+
+
+class TestGeometry(unittest.TestCase):
+    """
+    Tests for Samples' geometries
+    """
+
+    def setUp(self):
+        xml = static_xml()
+        # a polygon, without a point
+        xml = xml[:xml.index(b'<SDO_POINT>')] + xml[xml.index(b'</SDO_POINT>') + len(b'</SDO_POINT>'):]
+        self.polygon = SampleRecord.from_xml(xml.replace(
+            b'<SDO_ORDINATES/>',
+            b'<SDO_ORDINATES>'
+            b'<ORDINATE>137.5</ORDINATE><ORDINATE>-33.25</ORDINATE>'
+            b'<ORDINATE>138</ORDINATE><ORDINATE>-33.25</ORDINATE>'
+            b'<ORDINATE>138</ORDINATE><ORDINATE>-34.125</ORDINATE>'
+            b'<ORDINATE>137.5</ORDINATE><ORDINATE>-33.25</ORDINATE>'
+            b'</SDO_ORDINATES>'
+        ))
+
+    def test_polygon(self):
+        g = self.polygon.geometry
+        self.assertEqual(
+            g.wkt(),
+            '<http://www.opengis.net/def/crs/EPSG/0/4283> '
+            'POLYGON((137.5 -33.25, 138 -33.25, 138 -34.125, 137.5 -33.25))'
+        )
+        self.assertEqual(
+            g.gmap_bbox(),
+            '{lat: -33.25, lng: 137.5},\n                {lat: -33.25, lng: 138},\n'
+            '                {lat: -34.125, lng: 138},\n                {lat: -33.25, lng: 137.5}'
+        )
+        self.assertEqual(g.centroid(), (-33.54, 137.83))
+        self.assertEqual(g.bbox(), (137.5, -34.125, 138.0, -33.25))
+        self.assertEqual(g.gml(), '')
+        # worked out once
+        self.assertIs(g.wkt(), g.wkt())
+        self.assertIs(self.polygon.geometry, g)
+
+    def test_ordinates_as_given(self):
+        # whole numbers given with a decimal point keep it, as they did before ordinates were held as floats
+        g = Geometry(ordinates=ordinates_array(['137.0', '-33.25', '138', '-34.0', '137.0', '-33.25']))
+        self.assertEqual(g.wkt(), '<http://www.opengis.net/def/crs/EPSG/0/4283> POLYGON((137.0 -33.25, 138 -34.0, '
+                                  '137.0 -33.25))')
+        self.assertIn('{lat: -34.0, lng: 138}', g.gmap_bbox())
+        self.assertEqual(g.bbox(), (137.0, -34.0, 138.0, -33.25))
+
+    def test_point(self):
+        g = Geometry(137.8563726, -33.7108293, 51, 'GDA94', ordinates_array([]))
+        self.assertEqual(g.wkt(), '<http://www.opengis.net/def/crs/EPSG/0/4283> POINTZ(137.8563726 -33.7108293 51)')
+        self.assertEqual(
+            g.gml(),
+            '<gml:Point srsDimension="3" srsName="https://epsg.io/GDA94">'
+            '<gml:pos>137.8563726 -33.7108293 51</gml:pos></gml:Point>'
+        )
+        self.assertEqual(g.centroid(), (None, None))
+        self.assertEqual(g.bbox(), (137.8563726, -33.7108293, 137.8563726, -33.7108293))
+        self.assertEqual(g.gmap_bbox(), '')
+
+    def test_none(self):
+        g = Geometry()
+        self.assertEqual(g.wkt(), '')
+        self.assertIsNone(g.gmap_bbox())
+        self.assertIsNone(g.bbox())
+
+
+if __name__ == '__main__':
+    unittest.main()
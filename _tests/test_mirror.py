@@ -0,0 +1,144 @@
+import datetime
+import os
+import re
+import shutil
+import tempfile
+import unittest
+import requests
+from unittest import mock
+from lxml import etree
+import _config as conf
+from model import mirror
+from _tests import static_row
+
+
+class TestMirror(unittest.TestCase):
+    """
+    Tests for the local SQLite mirror of the Samples table
+    """
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path_patch = mock.patch('_config.MIRROR_PATH', os.path.join(self.dir, 'mirror.sqlite'))
+        self.path_patch.start()
+        mirror._local.conn = None
+
+        self.row = row = static_row()
+        rows = []
+        for i, modified in enumerate(['2017-04-07T15:10:48', '2016-01-02T00:00:00', '2018-05-06T07:08:09']):
+            rows.append(row.replace(b'AU239', 'AU10{}'.format(i).encode())
+                           .replace(b'2017-04-07T15:10:48', modified.encode()))
+        mirror.store_rows(b'<ROWSET>' + b''.join(rows) + b'</ROWSET>')
+
+    def tearDown(self):
+        mirror._local.conn.close()
+        mirror._local.conn = None
+        self.path_patch.stop()
+        shutil.rmtree(self.dir)
+
+    def test_get_sample_xml(self):
+        root = etree.fromstring(mirror.get_sample_xml('AU101'))
+        self.assertEqual(root.findtext('ROW/IGSN'), 'AU101')
+        self.assertEqual(root.findtext('ROW/MODIFIED_DATE'), '2016-01-02T00:00:00')
+        self.assertIsNone(mirror.get_sample_xml('AU239'))
+
+    def test_get_sampleset_xml(self):
+        page_1 = etree.fromstring(mirror.get_sampleset_xml(1, 2))
+        self.assertEqual([r.findtext('IGSN') for r in page_1], ['AU100', 'AU101'])
+        page_2 = etree.fromstring(mirror.get_sampleset_xml(2, 2))
+        self.assertEqual([r.findtext('IGSN') for r in page_2], ['AU102'])
+        self.assertIsNone(mirror.get_sampleset_xml(3, 2))
+
+        in_range = etree.fromstring(mirror.get_sampleset_xml(1, 10, '2017-01-01T00:00:00', '2099-12-31T23:59:59'))
+        self.assertEqual([r.findtext('IGSN') for r in in_range], ['AU100', 'AU102'])
+
+    def test_counts_and_dates(self):
+        self.assertEqual(mirror.get_count(), 3)
+        self.assertEqual(mirror.get_count('2017-01-01T00:00:00', '2017-12-31T23:59:59'), 1)
+        self.assertEqual(mirror.get_earliest_date().isoformat(), '2016-01-02T00:00:00')
+
+
+    def upstream_get(self, igsns, fail_on_page=None):
+        """
+        :param igsns: the IGSNs of the samples the mocked SampleSet API has
+        :param fail_on_page: a page number whose request raises a ConnectionError
+        :return: a mock of upstream.get, recording the URLs requested in self.urls
+        """
+        self.urls = []
+
+        def get(url):
+            self.urls.append(url)
+            page, per_page = [int(n) for n in re.search(r'pPageNo=(\d+)&pNoOfLinesPerPage=(\d+)', url).groups()]
+            if page == fail_on_page:
+                raise requests.ConnectionError('connection reset')
+            on_page = igsns[(page - 1) * per_page:page * per_page]
+            if len(on_page) == 0:
+                return mock.Mock(content=b'No data found')
+            return mock.Mock(content=b'<ROWSET>' + b''.join(
+                self.row.replace(b'AU239', igsn.encode()) for igsn in on_page
+            ) + b'</ROWSET>')
+        return mock.patch.object(mirror.upstream, 'get', side_effect=get)
+
+    def test_backfill_stops_on_short_page(self):
+        with self.upstream_get(['AU20{}'.format(i) for i in range(5)]), \
+                mock.patch.object(conf, 'MIRROR_SYNC_BATCH_SIZE', 2):
+            self.assertEqual(mirror.backfill(), 5)
+        self.assertEqual(len(self.urls), 3)  # the third page, of 1, is short
+        self.assertEqual(mirror.get_count(), 3 + 5)
+        self.assertIsNotNone(mirror._get_state('last_synced'))
+
+    def test_backfill_stops_on_empty_page(self):
+        with self.upstream_get(['AU20{}'.format(i) for i in range(4)]), \
+                mock.patch.object(conf, 'MIRROR_SYNC_BATCH_SIZE', 2):
+            self.assertEqual(mirror.backfill(), 4)
+        self.assertEqual(len(self.urls), 3)  # the third page says 'No data'
+
+    def test_backfill_resumes_from_page(self):
+        with self.upstream_get(['AU20{}'.format(i) for i in range(5)]), \
+                mock.patch.object(conf, 'MIRROR_SYNC_BATCH_SIZE', 2):
+            self.assertEqual(mirror.backfill(first_page=2), 3)
+        self.assertIn('pPageNo=2&', self.urls[0])
+        self.assertIsNone(mirror.get_sample_xml('AU200'))
+        self.assertIsNotNone(mirror.get_sample_xml('AU204'))
+
+    def test_failed_page_leaves_last_synced(self):
+        with self.upstream_get(['AU20{}'.format(i) for i in range(5)], fail_on_page=2), \
+                mock.patch.object(conf, 'MIRROR_SYNC_BATCH_SIZE', 2):
+            with self.assertRaises(requests.ConnectionError):
+                mirror.backfill()
+        self.assertIsNone(mirror._get_state('last_synced'))
+        self.assertIsNotNone(mirror.get_sample_xml('AU201'))  # the pages before are kept, to be resumed from
+
+        with mirror.get_connection():
+            mirror._set_state('last_synced', '2020-01-01T00:00:00')
+        with self.upstream_get(['AU20{}'.format(i) for i in range(5)], fail_on_page=2), \
+                mock.patch.object(conf, 'MIRROR_SYNC_BATCH_SIZE', 2):
+            with self.assertRaises(requests.ConnectionError):
+                mirror.sync()
+        self.assertEqual(mirror._get_state('last_synced'), '2020-01-01T00:00:00')
+
+    def test_sync_windows_overlap(self):
+        with self.upstream_get([]):
+            with self.assertRaises(ValueError):
+                mirror.sync()  # not backfilled
+
+        with mirror.get_connection():
+            mirror._set_state('last_synced', '2020-01-01T00:00:00')
+        with self.upstream_get(['AU300']), mock.patch.object(conf, 'MIRROR_SYNC_OVERLAP', 3600):
+            self.assertEqual(mirror.sync(), 1)
+        self.assertIn('pModifiedFromDate=2019-12-31T23:00:00&', self.urls[0])
+        until = re.search(r'pModifiedToDate=([^&]+)', self.urls[0]).group(1)
+        self.assertEqual(mirror._get_state('last_synced'), until)
+
+        # the next window starts MIRROR_SYNC_OVERLAP before the end of this one
+        with self.upstream_get([]), mock.patch.object(conf, 'MIRROR_SYNC_OVERLAP', 3600):
+            mirror.sync()
+        from_date = re.search(r'pModifiedFromDate=([^&]+)', self.urls[0]).group(1)
+        self.assertEqual(
+            datetime.datetime.strptime(until, mirror.DATE_FORMAT) - datetime.timedelta(seconds=3600),
+            datetime.datetime.strptime(from_date, mirror.DATE_FORMAT)
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
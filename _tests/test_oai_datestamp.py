@@ -0,0 +1,72 @@
+import datetime
+import unittest
+from unittest import mock
+from lxml import objectify
+from controller import oai_datestamp
+from controller.oai_datestamp import str2datetime, fast_str2datetime, DATETIME_FORMATS
+
+DATE_STRINGS = [
+    '2017-11-06 09:54:21',
+    '2017-11-06T09:54:21',
+    '2017-11-06T09:54:21UTC',
+    '2017-11-06T09:54:21GMT',
+    '2017-11-06',
+    '12-MAR-98',
+    '1-Jan-05',
+    '2017-11-06T09:54:21.123',
+    '2017-11-06T09:54:21+1000',
+    '2017-11-06T09:54:21Z',
+    '2017-11-06T09:54:21.123456-05:30',
+    '  2017-11-06  ',
+    '2017-1-6',
+    '2017-11-06 9:54:21',
+    '2017-11-06  09:54:21',
+    '2017-02-30',
+    '2017-13-06 09:54:21',
+    '2017-11-06T24:00:00',
+    '2017-11-06T09:54',
+    '06/11/2017',
+    '20171106',
+    '',
+    'None',
+    'unknown',
+    '٢٠١٧-١١-٠٦'
+]
+
+
+class TestFastStr2Datetime(unittest.TestCase):
+    """
+    Differential tests of fast_str2datetime() against str2datetime()
+    """
+
+    def setUp(self):
+        oai_datestamp._last_formats.clear()
+
+    def test_same_as_str2datetime(self):
+        for s in DATE_STRINGS:
+            self.assertEqual(fast_str2datetime(s), str2datetime(s), s)
+
+    def test_same_whichever_format_was_last(self):
+        for i in range(len(DATETIME_FORMATS)):
+            for s in DATE_STRINGS:
+                with mock.patch.dict(oai_datestamp._last_formats, {'MODIFIED_DATE': i}):
+                    fast = fast_str2datetime(s, 'MODIFIED_DATE')
+                self.assertEqual(fast, str2datetime(s), '{} after {}'.format(s, DATETIME_FORMATS[i]))
+                if fast is not None:
+                    self.assertEqual(fast.tzinfo, str2datetime(s).tzinfo)
+
+    def test_remembers_format_by_column(self):
+        self.assertEqual(fast_str2datetime('12-MAR-98', 'ACQUIREDATE'), datetime.datetime(1998, 3, 12))
+        self.assertEqual(DATETIME_FORMATS[oai_datestamp._last_formats['ACQUIREDATE']], '%d-%b-%y')
+        self.assertNotIn('MODIFIED_DATE', oai_datestamp._last_formats)
+
+    def test_element(self):
+        row = objectify.fromstring(
+            '<ROW><ACQUIREDATE>1998-03-12</ACQUIREDATE><MODIFIED_DATE></MODIFIED_DATE></ROW>'
+        )
+        self.assertEqual(fast_str2datetime(row.ACQUIREDATE), str2datetime(row.ACQUIREDATE))
+        self.assertIsNone(fast_str2datetime(row.MODIFIED_DATE))
+
+
+if __name__ == '__main__':
+    unittest.main()
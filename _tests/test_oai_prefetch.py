@@ -0,0 +1,82 @@
+import time
+import unittest
+from io import BytesIO
+from unittest import mock
+from app import app
+from controller import oai_functions, oai_prefetch
+from model.upstream import CircuitOpenError
+from _tests import static_row
+
+
+class TestPrefetchOAI(unittest.TestCase):
+    """
+    Tests for the speculative prefetch of the next page of OAI-PMH ListRecords results
+    """
+
+    def setUp(self):
+        row = static_row()
+        self.pages = {}
+        for page in range(3):
+            rows = [row.replace(b'AU239', 'AU{}{}'.format(page, i).encode()) for i in range(2)]
+            self.pages[str(page)] = b'<ROWSET>' + b''.join(rows) + b'</ROWSET>'
+        oai_prefetch.PAGE_CACHE.purge()
+
+    def get_sampleset(self, resumptionToken=None):
+        self.fetched.append(resumptionToken)
+        if resumptionToken is None:
+            xml = self.pages['0']
+        else:
+            xml = self.pages.get(str(int(resumptionToken.split(',')[2]) // 2), b'<ROWSET/>')
+        return oai_functions._samples_from_api_response(BytesIO(xml))
+
+    def wait_for_prefetch(self, token):
+        for i in range(100):
+            if oai_prefetch.PAGE_CACHE.get(('ListRecords', token), count=False) is not None:
+                return
+            time.sleep(0.05)
+        self.fail('page for {} was not prefetched'.format(token))
+
+    def test_next_page_is_prefetched(self):
+        self.fetched = []
+        hits = oai_prefetch.stats()['hits']
+        with mock.patch('_config.OAI_BATCH_SIZE', 2), \
+                mock.patch('controller.oai_functions.get_complete_list_size', return_value=6), \
+                mock.patch('controller.oai_functions.get_sampleset', side_effect=self.get_sampleset):
+            client = app.test_client()
+            first = client.get('/oai?verb=ListRecords&metadataPrefix=oai_dc')
+            self.assertIn(b'AU00', first.data)
+
+            token = '2011-06-01T00:00:00Z,9999-12-31T23:59:59Z,2,oai_dc'
+            self.wait_for_prefetch(token)
+            self.assertEqual(self.fetched, [None, token])
+
+            second = client.get('/oai?verb=ListRecords&resumptionToken=' + token)
+            self.assertIn(b'AU10', second.data)
+            # the second page was given from the prefetch, not fetched again
+            self.assertEqual(self.fetched.count(token), 1)
+            self.assertEqual(oai_prefetch.stats()['hits'], hits + 1)
+
+
+    def test_stale_page_given_while_unavailable(self):
+        self.fetched = []
+        token = '2011-06-01T00:00:00Z,9999-12-31T23:59:59Z,2,oai_dc'
+        with mock.patch('_config.OAI_BATCH_SIZE', 2), \
+                mock.patch('_config.OAI_PREFETCH_MAX_CONCURRENT', 0), \
+                mock.patch('controller.oai_functions.get_complete_list_size', return_value=6), \
+                mock.patch('controller.oai_functions.get_sampleset', side_effect=self.get_sampleset):
+            client = app.test_client()
+            self.assertIn(b'AU10', client.get('/oai?verb=ListRecords&resumptionToken=' + token).data)
+            # the page expires and the API becomes unavailable
+            key = ('ListRecords', token)
+            oai_prefetch.PAGE_CACHE.set(key, oai_prefetch.PAGE_CACHE.get(key), ttl=-1)
+            with mock.patch('controller.oai_functions.get_sampleset', side_effect=CircuitOpenError('open')):
+                response = client.get('/oai?verb=ListRecords&resumptionToken=' + token)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(b'AU10', response.data)
+                # a page never given is still unavailable
+                response = client.get('/oai?verb=ListRecords&resumptionToken=' + token.replace(',2,', ',4,'))
+                self.assertEqual(response.status_code, 503)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import re
+import unittest
+from rdflib import URIRef, BNode, Literal, RDF, RDFS
+from app import app
+from model.sample import PROV, FOAF, _prov_visjs_triples
+from _tests.bench_prov_html import make_sample, sparql_visjs
+
+
+def _objects(javascript):
+    # vis.js node & edge objects, with blank node ids, which differ between Graphs, made the same
+    javascript = re.sub(r'(id|from|to): "(?!http)[^"]*"', r'\1: "_"', javascript)
+    return sorted(line.strip().rstrip(',') for line in javascript.split('\n') if line.strip().startswith('{'))
+
+
+class TestProvVisjs(unittest.TestCase):
+    """
+    Tests for the PROV view's vis.js network, drawn by walking a Sample's PROV triples
+    """
+
+    def test_same_as_sparql(self):
+        s = make_sample()
+        nodes, edges = sparql_visjs(s)
+        self.assertEqual(_objects(s._make_vsjs(s._rdf_triples('prov'))), _objects('\n'.join(nodes + edges)))
+
+    def test_simplified_triples(self):
+        activity = URIRef('http://example.org/activity')
+        entity = URIRef('http://example.org/entity')
+        person = BNode()
+        attribution = BNode()
+        triples = _prov_visjs_triples([
+            (activity, PROV.generated, entity),
+            (entity, PROV.qualifiedAttribution, attribution),
+            (attribution, PROV.agent, person),
+            (person, RDF.type, PROV.Person),
+            (person, FOAF.name, Literal('Jane Smith')),
+            (person, RDF.type, PROV.Person)
+        ])
+        self.assertNotIn((activity, PROV.generated, entity), triples)
+        self.assertIn((entity, PROV.wasGeneratedBy, activity), triples)
+        self.assertIn((entity, PROV.wasAttributedTo, person), triples)
+        self.assertIn((person, RDFS.label, Literal('Jane Smith')), triples)
+        self.assertIn((person, RDF.type, PROV.Agent), triples)
+        self.assertEqual(len(triples), len(set(triples)))
+
+    def test_html(self):
+        s = make_sample()
+        with app.test_request_context('/sample/AU239'):
+            html = s.export('prov', 'text/html', use_cache=False)
+        self.assertIn('label: "Jane Smith"', html)
+        self.assertIn('prov:Entity', html)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import json
+import unittest
+from rdflib import Graph
+from rdflib.compare import isomorphic
+import _config as conf
+from app import app
+from model.sample import Sample, SampleRecord, RDF_PREFIXES, VIEW_PREFIXES
+from _tests import static_xml
+
+
+class TestRDFWriter(unittest.TestCase):
+    """
+    Tests that Samples' RDF written directly is the same graph as rdflib would serialize
+    """
+
+    def setUp(self):
+        xml = static_xml()
+        self.samples = [
+            Sample(None, record=SampleRecord.from_xml(xml)),
+            Sample(None, record=SampleRecord.from_xml(
+                xml.replace(b'<ACQUIREDATE/>', b'<ACQUIREDATE>1998-03-12</ACQUIREDATE>')
+                   .replace(b'<REMARK/>', b'<REMARK>a "quoted"\nremark, with a \\ backslash</REMARK>')
+                   .replace(b'</ROW>', b'<ORIGINATOR>A. Collector</ORIGINATOR></ROW>')
+            ))
+        ]
+
+    def rdflib_graph(self, sample, view):
+        # as rdflib serialized Samples before, parsed back so that literals are normalised as they are when parsed
+        g = Graph()
+        for triple in sample._rdf_triples(view):
+            g.add(triple)
+        return Graph().parse(data=g.serialize(format='turtle'), format='turtle')
+
+    def test_isomorphic(self):
+        for sample in self.samples:
+            for view in ('igsn-o', 'dct', 'prov', 'sosa'):
+                for mimetype, rdf_format in (('text/turtle', 'turtle'), ('text/nt', 'nt')):
+                    written = Graph().parse(data=sample.export_rdf(view, mimetype), format=rdf_format)
+                    self.assertTrue(
+                        isomorphic(written, self.rdflib_graph(sample, view)),
+                        '{} {} {}'.format(sample.igsn, view, mimetype)
+                    )
+
+    def test_jsonld(self):
+        with open(conf.JSONLD_CONTEXT_PATH) as f:
+            context = json.load(f)['@context']
+        for sample in self.samples:
+            for view in ('igsn-o', 'dct', 'prov', 'sosa'):
+                document = json.loads(sample.export_rdf(view, 'application/rdf+json'))
+                self.assertEqual(document['@context'], conf.JSONLD_CONTEXT_URI)
+                # expanded with the @context inline, rather than fetched from its URL
+                document['@context'] = context
+                written = Graph().parse(data=json.dumps(document), format='json-ld')
+                self.assertTrue(isomorphic(written, self.rdflib_graph(sample, view)), '{} {}'.format(sample.igsn, view))
+
+    def test_jsonld_context_served(self):
+        response = app.test_client().get(conf.JSONLD_CONTEXT_URI.split('pid.geoscience.gov.au', 1)[1])
+        self.assertEqual(response.mimetype, 'application/ld+json')
+        response.close()
+
+    def test_rdflib_fallback(self):
+        sample = self.samples[0]
+        g = Graph().parse(data=sample.export_rdf('sosa', 'application/rdf+xml'), format='xml')
+        self.assertTrue(isomorphic(g, self.rdflib_graph(sample, 'sosa')))
+
+    def test_prebound_graphs(self):
+        bound = Graph()
+        for prefix, namespace in RDF_PREFIXES:
+            bound.bind(prefix, namespace)
+        g = VIEW_PREFIXES['dct'].graph()
+        self.assertEqual(list(g.namespaces()), list(bound.namespaces()))
+        # prefixes serializers bind to one Graph are not bound to the next
+        g.bind('example', 'http://example.org/')
+        self.assertNotIn('example', dict(VIEW_PREFIXES['dct'].graph().namespaces()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import json
+import unittest
+from io import BytesIO
+from unittest import mock
+from rdflib import Graph
+from rdflib.compare import isomorphic
+from app import app
+import _config as conf
+from model import rdf_writer, register
+from model.upstream import CircuitOpenError
+from _tests import static_row
+
+
+class TestRegister(unittest.TestCase):
+    """
+    Tests for the Register's RDF pages, streamed in Turtle, N-Triples & JSON-LD
+    """
+
+    def setUp(self):
+        row = static_row()
+        self.xml = b'<ROWSET>' + b''.join(
+            row.replace(b'AU239', 'AU{}'.format(i).encode()) for i in range(500)
+        ) + b'</ROWSET>'
+        register.COUNT_CACHE.purge()
+        register.PAGE_CACHE.purge()
+
+    def get(self, mimetype):
+        def fetch(url, parse=None):
+            return parse(BytesIO(self.xml))
+
+        with mock.patch('model.upstream.fetch', side_effect=fetch), \
+                mock.patch('model.register.get_register_size', return_value=1000):
+            return app.test_client().get('/sample/?_view=reg&per_page=500&page=2&_format=' + mimetype)
+
+    def test_streamed_formats(self):
+        expected = Graph().parse(data=self.get('application/rdf%2Bxml').data, format='xml')
+        self.assertEqual(len(expected), 2 + 6 + 3 * 500)
+        for mimetype, rdf_format in (('text/turtle', 'turtle'), ('text/nt', 'nt'),
+                                     ('application/rdf%2Bjson', 'json-ld')):
+            response = self.get(mimetype)
+            self.assertTrue(response.is_streamed, mimetype)
+            data = response.data
+            if rdf_format == 'json-ld':
+                # the @context inline, rather than fetched from its URL
+                document = json.loads(data)
+                with open(conf.JSONLD_CONTEXT_PATH) as f:
+                    document['@context'] = json.load(f)['@context']
+                data = json.dumps(document)
+            g = Graph().parse(data=data, format=rdf_format)
+            self.assertTrue(isomorphic(g, expected), mimetype)
+
+    def test_chunks(self):
+        response = self.get('text/turtle')
+        chunks = list(response.response)
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) >= rdf_writer.CHUNK_SIZE for chunk in chunks[:-1]))
+        self.assertTrue(chunks[0].startswith(b'@prefix'))
+
+
+    def test_page_past_last_rejected_before_fetching(self):
+        register.COUNT_CACHE.set('total', 1000)
+        with mock.patch('model.upstream.fetch') as fetch:
+            response = app.test_client().get('/sample/?_view=reg&per_page=500&page=4&_format=text/turtle')
+        self.assertEqual(response.status_code, 400)
+        fetch.assert_not_called()
+
+    def test_count_error(self):
+        def fetch(url, parse=None):
+            return parse(BytesIO(self.xml))
+
+        with mock.patch('model.upstream.fetch', side_effect=fetch), \
+                mock.patch('model.register.get_register_size', side_effect=ValueError('bad count')):
+            response = app.test_client().get('/sample/?_view=reg&per_page=500&page=2&_format=text/turtle')
+            self.assertIn(b'AU499', response.data)
+        self.assertIn('page=3>; rel="next"', response.headers['Link'])
+        self.assertNotIn('rel="last"', response.headers['Link'])
+
+
+    def test_stale_page_given_while_unavailable(self):
+        self.assertIn(b'AU499', self.get('text/nt').data)
+        # the page expires and the API becomes unavailable
+        register.PAGE_CACHE.set((2, 500), register.PAGE_CACHE.get((2, 500)), ttl=-1)
+        with mock.patch('model.upstream.fetch', side_effect=CircuitOpenError('open')), \
+                mock.patch('model.register.get_register_size', return_value=1000):
+            client = app.test_client()
+            response = client.get('/sample/?_view=reg&per_page=500&page=2&_format=text/nt')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'AU499', response.data)
+            self.assertEqual(client.get('/sample/?_view=reg&per_page=500&page=1&_format=text/nt').status_code, 503)
+
+
+    def test_error_page_is_not_an_empty_page(self):
+        def fetch(url, parse=None):
+            return parse(BytesIO(b'<html><body>Service Unavailable<br></body></html>'))
+
+        with mock.patch('model.upstream.fetch', side_effect=fetch), \
+                mock.patch('model.register.get_register_size', return_value=1000):
+            response = app.test_client().get('/sample/?_view=reg&per_page=500&page=2&_format=text/turtle')
+        self.assertEqual(response.status_code, 502)
+        self.assertIsNone(register.PAGE_CACHE.get((2, 500)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from unittest import mock
+from model import sample
+from model.sample import Sample, SampleRecord
+from _tests import SampleTestCase
+
+
+class TestRenderCache(SampleTestCase):
+    """
+    Tests for the cache of Samples' rendered views, shared by /sample/<igsn> and OAI-PMH GetRecord
+    """
+
+    def test_shared_by_sample_and_get_record(self):
+        with mock.patch.object(Sample, 'export_igsn_xml', autospec=True, side_effect=Sample.export_igsn_xml) as export:
+            first = self.get('/sample/AU239?_view=igsn&_format=text/xml')
+            second = self.get('/sample/AU239?_view=igsn&_format=text/xml')
+            self.assertEqual(first.data, second.data)
+            record = self.get('/oai?verb=GetRecord&identifier=AU239&metadataPrefix=igsn')
+            self.assertEqual(export.call_count, 1)
+        self.assertIn(first.data.split(b'\n', 1)[1], record.data)
+
+    def test_modified_sample_is_rendered_again(self):
+        modified = SampleRecord.from_xml(self.xml.replace(b'2017-04-07T15:10:48', b'2018-01-01T00:00:00'))
+        with mock.patch.object(Sample, 'export_rdf', autospec=True, side_effect=Sample.export_rdf) as export:
+            self.get('/sample/AU239?_view=dct&_format=text/turtle')
+            sample.SAMPLE_CACHE.purge()  # as if the Sample's cache entry had expired, and it was reloaded
+            self.get('/sample/AU239?_view=dct&_format=text/turtle', record=modified)
+            self.assertEqual(export.call_count, 2)
+            # Cache-Control: no-cache renders again too
+            self.get('/sample/AU239?_view=dct&_format=text/turtle', {'Cache-Control': 'no-cache'}, record=modified)
+            self.assertEqual(export.call_count, 3)
+
+    def test_html_per_host_and_mount_point(self):
+        uri = '/sample/AU239?_view=igsn-o&_format=text/html'
+        internal = self.get(uri).data
+        self.assertIn(b'href="http://localhost/sample/AU239/pingback"', internal)
+        proxied = self.get(uri, base_url='https://pid.geoscience.gov.au/api').data
+        self.assertIn(b'href="https://pid.geoscience.gov.au/api/sample/AU239/pingback"', proxied)
+        self.assertIn(b'href="/api/static/', proxied)
+        self.assertNotIn(b'localhost', proxied)
+        self.assertIn(b'href="http://localhost/sample/AU239/pingback"', self.get(uri).data)
+
+
+if __name__ == '__main__':
+    unittest.main()
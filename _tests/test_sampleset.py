@@ -0,0 +1,66 @@
+import math
+import unittest
+from datetime import date, datetime
+from io import BytesIO
+from lxml import etree
+from model.sample import SampleRecord
+from model.sampleset import SampleSet, NO_DATE
+from _tests import static_row
+
+
+class TestSampleSet(unittest.TestCase):
+    """
+    Tests for the columnar decoding of SampleSet pages
+    """
+
+    def setUp(self):
+        row = static_row()
+        rows = [
+            row,
+            row.replace(b'AU239', b'AU240').replace(b'<ACQUIREDATE/>', b'<ACQUIREDATE>1998-03-12</ACQUIREDATE>'),
+            row.replace(b'AU239', b'AU241').replace(b'<LITHNAME>granite</LITHNAME>', b'')
+                .replace(b'<MATERIAL_CLASS>rock</MATERIAL_CLASS>', b'<MATERIAL_CLASS>not a material</MATERIAL_CLASS>')
+        ]
+        self.xml = b'<ROWSET>' + b''.join(rows) + b'</ROWSET>'
+
+    def test_same_values_as_records(self):
+        sampleset = SampleSet.from_api_response(BytesIO(self.xml))
+        records = [
+            SampleRecord.from_xml(b'<ROWSET>' + etree.tostring(row) + b'</ROWSET>')
+            for row in etree.fromstring(self.xml)
+        ]
+        self.assertEqual(len(sampleset), 3)
+        self.assertEqual(sampleset.igsn, [r.igsn for r in records])
+        self.assertEqual(
+            [date.fromordinal(d) if d != NO_DATE else None for d in sampleset.date_acquired],
+            [r.date_acquired for r in records]
+        )
+        self.assertEqual(
+            [datetime.utcfromtimestamp(d) for d in sampleset.date_modified],
+            [r.date_modified for r in records]
+        )
+        for name in ('x', 'y', 'z'):
+            self.assertEqual(
+                [v if not math.isnan(v) else None for v in getattr(sampleset, name)],
+                [getattr(r, name) for r in records]
+            )
+        for name in ('sample_type', 'method_type', 'material_type', 'lith', 'entity_type'):
+            self.assertEqual(sampleset.vocab(name), [getattr(r, name) for r in records], name)
+
+    def test_categories(self):
+        sampleset = SampleSet.from_api_response(BytesIO(self.xml))
+        self.assertEqual(list(sampleset.codes['sample_type']), [0, 0, 0])
+        self.assertEqual(len(sampleset.categories['lith']), 2)  # granite & no LITHNAME
+
+    def test_slice_and_headers(self):
+        sampleset = SampleSet.from_api_response(BytesIO(self.xml))[1:]
+        self.assertEqual(sampleset.igsn, ['AU240', 'AU241'])
+        self.assertEqual(list(sampleset.headers()), [('AU240', date(1998, 3, 12)), ('AU241', None)])
+        self.assertEqual(sampleset.vocab('lith')[1], None)
+
+    def test_no_data(self):
+        self.assertEqual(len(SampleSet.from_api_response(BytesIO(b'No data'))), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from io import BytesIO
+from unittest import mock
+import requests
+from lxml import etree
+import _config as conf
+from app import app
+from model import upstream, sample
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b'<ROWSET/>'):
+        self.status_code = status_code
+        self.content = content
+        self.raw = BytesIO(content)
+
+    def close(self):
+        pass
+
+
+class TestUpstream(unittest.TestCase):
+    """
+    Tests for the shared Oracle XML API client
+    """
+
+    def setUp(self):
+        # a fresh circuit breaker so that failures in other tests don't open it
+        breaker = upstream.CircuitBreaker(conf.UPSTREAM_BREAKER_FAILURES, conf.UPSTREAM_BREAKER_RESET)
+        patcher = mock.patch('model.upstream.BREAKER', breaker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_session_is_shared(self):
+        self.assertIs(upstream.get_session(), upstream.get_session())
+
+    @mock.patch('model.upstream.time.sleep')
+    def test_retries_gateway_errors(self, sleep):
+        session = mock.Mock()
+        session.get.side_effect = [FakeResponse(503), FakeResponse(200)]
+        with mock.patch('model.upstream.get_session', return_value=session):
+            r = upstream.get('http://example.org/api')
+
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(session.get.call_count, 2)
+        self.assertEqual(sleep.call_count, 1)
+
+    @mock.patch('model.upstream.time.sleep')
+    def test_gives_up_after_retries(self, sleep):
+        session = mock.Mock()
+        session.get.side_effect = requests.ConnectionError('refused')
+        with mock.patch('model.upstream.get_session', return_value=session):
+            self.assertRaises(requests.ConnectionError, upstream.get, 'http://example.org/api')
+
+        self.assertEqual(session.get.call_count, conf.UPSTREAM_RETRIES + 1)
+
+    def test_backoff_is_bounded(self):
+        for attempt in range(10):
+            self.assertLessEqual(upstream._backoff(attempt), conf.UPSTREAM_BACKOFF_MAX)
+
+    @mock.patch('model.upstream.time.sleep')
+    def test_circuit_breaker(self, sleep):
+        breaker = upstream.CircuitBreaker(2, 30)
+        session = mock.Mock()
+        session.get.side_effect = requests.ConnectionError('refused')
+        with mock.patch('model.upstream.BREAKER', breaker), \
+                mock.patch('model.upstream.get_session', return_value=session):
+            for i in range(2):
+                self.assertRaises(requests.ConnectionError, upstream.get, 'http://example.org/api')
+            self.assertEqual(breaker.state, upstream.CircuitBreaker.OPEN)
+
+            # while open, the API is not called
+            calls = session.get.call_count
+            self.assertRaises(upstream.CircuitOpenError, upstream.get, 'http://example.org/api')
+            self.assertEqual(session.get.call_count, calls)
+
+            # after reset_after a trial call is let through and, if it succeeds, the breaker closes
+            session.get.side_effect = None
+            session.get.return_value = FakeResponse(200)
+            breaker.opened_at -= 31
+            self.assertEqual(upstream.get('http://example.org/api').status_code, 200)
+            self.assertEqual(breaker.state, upstream.CircuitBreaker.CLOSED)
+
+    def test_slow_responses_trip_the_breaker(self):
+        breaker = upstream.CircuitBreaker(1, 30)
+        session = mock.Mock()
+        session.get.return_value = FakeResponse(200)
+        with mock.patch('model.upstream.BREAKER', breaker), \
+                mock.patch('model.upstream.get_session', return_value=session), \
+                mock.patch('_config.UPSTREAM_BREAKER_SLOW', -1):
+            upstream.get('http://example.org/api')
+        self.assertEqual(breaker.state, upstream.CircuitBreaker.OPEN)
+
+    def test_submit_runs_in_background(self):
+        future = upstream.submit(threading.current_thread)
+        self.assertIsNot(future.result(timeout=5), threading.current_thread())
+
+    def test_fetch_coalesces_concurrent_requests(self):
+        calls = []
+
+        def slow_get(url, timeout=None, stream=False):
+            calls.append(url)
+            time.sleep(0.2)
+            return FakeResponse(200, b'<ROWSET><ROW/></ROWSET>')
+
+        def parse(stream):
+            return len(stream.read())
+
+        results = []
+        with mock.patch('model.upstream.get', side_effect=slow_get):
+            threads = [
+                threading.Thread(target=lambda: results.append(upstream.fetch('http://example.org/api', parse)))
+                for i in range(5)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [23] * 5)
+
+    def test_iter_rows(self):
+        xml = b'<ROWSET><ROW><IGSN>AU1</IGSN></ROW><ROW><IGSN>AU2</IGSN></ROW></ROWSET>'
+        self.assertEqual([row.findtext('IGSN') for row in upstream.iter_rows(BytesIO(xml))], ['AU1', 'AU2'])
+        self.assertEqual(list(upstream.iter_rows(BytesIO(b'<ROWSET><ROW>No data</ROW></ROWSET>'))), [])
+        self.assertEqual(list(upstream.iter_rows(BytesIO(b'No data found'))), [])
+        self.assertRaises(etree.XMLSyntaxError, list, upstream.iter_rows(BytesIO(xml[:-20])))
+        # an error page is not an empty result
+        error_page = b'<html><body><h1>Internal Server Error</h1><hr></body></html>'
+        self.assertRaises(upstream.UpstreamError, list, upstream.iter_rows(BytesIO(error_page)))
+        self.assertRaises(upstream.UpstreamError, list, upstream.iter_rows(BytesIO(b'ORA-06502: PL/SQL error')))
+
+    def test_error_page_gives_bad_gateway(self):
+        def fetch(url, parse=None):
+            return parse(BytesIO(b'<html><body>Proxy Error<br></body></html>'))
+
+        sample.SAMPLE_CACHE.purge()
+        with mock.patch('model.upstream.fetch', side_effect=fetch):
+            # not a 'no record' page for the Sample, nor noRecordsMatch for a harvester
+            self.assertEqual(app.test_client().get('/sample/AU239?_view=igsn-o&_format=text/turtle').status_code, 502)
+            self.assertEqual(app.test_client().get('/oai?verb=ListRecords&metadataPrefix=oai_dc').status_code, 502)
+
+    @mock.patch('model.upstream.time.sleep')
+    def test_error_statuses_raise(self, sleep):
+        for statuses in ([404], [500], [503] * (conf.UPSTREAM_RETRIES + 1)):
+            session = mock.Mock()
+            session.get.side_effect = [FakeResponse(status, b'<html>Error</html>') for status in statuses]
+            with mock.patch('model.upstream.get_session', return_value=session):
+                with self.assertRaises(upstream.UpstreamError) as raised:
+                    upstream.get('http://example.org/api', stream=True)
+            self.assertEqual(raised.exception.response.status_code, statuses[-1])
+
+    @unittest.skipIf(upstream.fcntl is None, 'no fcntl on this platform')
+    def test_fetch_shares_result_between_processes(self):
+        coalesce_dir = tempfile.mkdtemp()
+        try:
+            with mock.patch('_config.UPSTREAM_COALESCE_DIR', coalesce_dir), \
+                    mock.patch('model.upstream.get', return_value=FakeResponse(200)) as get:
+                self.assertEqual(upstream.fetch('http://example.org/api'), b'<ROWSET/>')
+                # as another process would find it, straight after the first fetch
+                self.assertEqual(upstream._fetch_between_processes('http://example.org/api'), b'<ROWSET/>')
+            self.assertEqual(get.call_count, 1)
+        finally:
+            shutil.rmtree(coalesce_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
 import logging
+import mimetypes
 import _config as conf
 from flask import Flask
-from controller import pages, classes, oai
+from controller import pages, classes, oai, compression
+
+# the JSON-LD @context, in static, is served as JSON-LD
+mimetypes.add_type('application/ld+json', '.jsonld')
 
 app = Flask(__name__, template_folder=conf.TEMPLATES_DIR, static_folder=conf.STATIC_DIR)
 
@@ -9,6 +13,9 @@ app.register_blueprint(pages.pages)
 app.register_blueprint(classes.classes)
 app.register_blueprint(oai.oai_)
 
+# responses are compressed, by Accept-Encoding, after they are made
+app.after_request(compression.compress_response)
+
 
 # run the Flask app
 if __name__ == '__main__':
@@ -1,15 +1,56 @@
 """
 This file contains all the HTTP routes for classes from the IGSN model, such as Samples and the Sample Register
 """
-from flask import Blueprint, render_template, request, Response
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from flask import Blueprint, render_template, request, Response, stream_with_context
 import _config as conf
 from _ldapi.__init__ import LDAPI, LdapiParameterError
+from controller.conditional import make_etag, not_modified, validators
 import urllib.parse as uriparse
-import requests
 
 classes = Blueprint('classes', __name__)
 
 
+def _last_page(no_of_samples, per_page):
+    return int(round(no_of_samples / per_page, 0)) + 1  # same as math.ceil()
+
+
+def _page_too_large_Response(last_page):
+    return Response(
+        'You must enter either no value for page or an integer <= {} which is the last page number.'.format(last_page),
+        status=400,
+        mimetype='text/plain'
+    )
+
+
+@classes.route('/sample/dump')
+def samples_dump():
+    """
+    Every Sample, streamed page by page in N-Triples (the default), Turtle or a gzip-compressed XML export
+
+    :return: HTTP Response
+    """
+    from model import dump
+
+    formats = dict((mimetype, (name, extension)) for name, (mimetype, extension) in dump.FORMATS.items())
+    mime_format = request.args.get('_format', 'text/nt')
+    view = request.args.get('_view', 'igsn-o')
+    if mime_format not in formats:
+        return LDAPI.client_error_Response(
+            'The _format parameter must be one of {}.'.format(', '.join(sorted(formats)))
+        )
+    if view not in dump.VIEWS:
+        return LDAPI.client_error_Response('The _view parameter must be one of {}.'.format(', '.join(dump.VIEWS)))
+
+    name, extension = formats[mime_format]
+    return Response(
+        stream_with_context(dump.dump(name, view)),
+        mimetype=mime_format,
+        headers={'Content-Disposition': 'attachment; filename=samples{}'.format(extension)}
+    )
+
+
 @classes.route('/sample/<string:igsn>')
 def sample(igsn):
     """
@@ -38,8 +79,23 @@ def sample(igsn):
         else:
             from model.sample import Sample
             try:
-                s = Sample(igsn)
-                return s.render(view, mime_format)
+                # a client may force a reload from the database, and re-rendering, with Cache-Control: no-cache
+                use_cache = not request.cache_control.no_cache
+                s = Sample(igsn, use_cache=use_cache)
+
+                # a client's copy that is still current is confirmed without rendering the Sample again
+                etag = make_etag(*s.export_key(view, mime_format))
+                weak = not s.export_is_stable(view, mime_format)
+                last_modified = s.export_last_modified(view, mime_format)
+                response = not_modified(etag, last_modified, weak)
+                if response is not None:
+                    return response
+
+                response = s.render(view, mime_format, use_cache=use_cache)
+                response.headers.extend(validators(etag, last_modified, weak))
+                # the same export is always given for the same key, so it need only be compressed once
+                response.compression_key = s.export_key(view, mime_format)
+                return response
             except ValueError:
                 return render_template('class_sample_no_record.html')
 
@@ -99,7 +155,7 @@ def samples():
                 request.args.get('_format')
             )
         else:
-            from model import register
+            from model import register, upstream
 
             # pagination
             page = int(request.args.get('page')) if request.args.get('page') is not None else 1
@@ -112,6 +168,15 @@ def samples():
                     mimetype='text/plain'
                 )
 
+            # a page past the last, by the cached number of samples, is rejected before it is fetched
+            no_of_samples = register.get_cached_register_size()
+            if no_of_samples is not None and page > _last_page(no_of_samples, per_page):
+                return _page_too_large_Response(_last_page(no_of_samples, per_page))
+
+            # get the number of samples while this page of them is fetched
+            count_deadline = time.time() + conf.REGISTER_COUNT_DEADLINE
+            no_of_samples_future = upstream.submit(register.get_register_size)
+
             links = list()
             links.append('<http://www.w3.org/ns/ldp#Resource>; rel="type"')
             # signalling that this is, in fact, a resource described in pages
@@ -137,20 +202,34 @@ def samples():
             else:
                 prev_page = None
 
+            class_uri_of_register_items = 'http://pid.geoscience.gov.au/def/ont/igsn#Sample'
+            renderer = register.RegisterRenderer(
+                request,
+                conf.REGISTER_BASE_URI,
+                class_uri_of_register_items,
+                None,
+                page,
+                per_page,
+                prev_page,
+                None,
+                None)
+
             # add a link to "next" and "last"
             try:
-                r = requests.get(conf.XML_API_URL_TOTAL_COUNT)
-                no_of_samples = int(r.content.decode('utf-8').split('<RECORD_COUNT>')[1].split('</RECORD_COUNT>')[0])
-                last_page = int(round(no_of_samples / per_page, 0)) + 1  # same as math.ceil()
+                no_of_samples = no_of_samples_future.result(timeout=max(0, count_deadline - time.time()))
+            except FutureTimeoutError:
+                # not back by the deadline: a late count still goes into the count cache for later requests
+                no_of_samples = None
+            except Exception as e:
+                print('Register size unavailable: {}'.format(e))
+                no_of_samples = None
+
+            if no_of_samples is not None:
+                last_page = _last_page(no_of_samples, per_page)
 
                 # if we've gotten the last page value successfully, we can choke if someone enters a larger value
                 if page > last_page:
-                    return Response(
-                        'You must enter either no value for page or an integer <= {} which is the last page number.'
-                        .format(last_page),
-                        status=400,
-                        mimetype='text/plain'
-                    )
+                    return _page_too_large_Response(last_page)
 
                 # add a link to "next"
                 if page != last_page:
@@ -163,8 +242,9 @@ def samples():
                 # add a link to "last"
                 links.append('<{}?per_page={}&page={}>; rel="last"'
                              .format(conf.URI_SAMPLE_INSTANCE_BASE, per_page, last_page))
-            except:
-                # if there's some error in getting the no of samples, add the "next" link but not the "last" link
+            else:
+                # without the number of samples, add the "next" link but not the "last" link
+                last_page = None
                 next_page = page + 1
                 links.append('<{}?per_page={}&page={}>; rel="next"'
                              .format(conf.URI_SAMPLE_INSTANCE_BASE, per_page, (page + 1)))
@@ -173,17 +253,21 @@ def samples():
                 'Link': ', '.join(links)
             }
 
-            class_uri_of_register_items = 'http://pid.geoscience.gov.au/def/ont/igsn#Sample'
-            return register.RegisterRenderer(
-                request,
-                conf.REGISTER_BASE_URI,
-                class_uri_of_register_items,
-                None,
-                page,
-                per_page,
-                prev_page,
-                next_page,
-                last_page).render(view, mime_format, extra_headers=headers)
+            renderer.next_page = next_page
+            renderer.last_page = last_page
+
+            # a page's IGSNs may shift, as Samples are added or removed before it, without any of them being modified,
+            # so only If-None-Match, not If-Modified-Since, is answered with 304. The ETag is made from what the page
+            # lists, not from its bytes: RDF/XML and the other formats still serialized by rdflib may be written
+            # differently each time, and the HTML's links depend on the host it was requested through, so it is weak.
+            etag = make_etag(view, mime_format, page, per_page, next_page, last_page, renderer.register)
+            response = not_modified(etag, weak=True)
+            if response is not None:
+                response.headers['Link'] = headers['Link']
+                return response
+            headers.update(validators(etag, renderer.last_modified, weak=True))
+
+            return renderer.render(view, mime_format, extra_headers=headers)
 
     except LdapiParameterError as e:
         return LDAPI.client_error_Response(str(e))
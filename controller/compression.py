@@ -0,0 +1,154 @@
+"""
+This file contains the compression of this web service's responses, negotiated by Accept-Encoding: brotli, if the
+brotli package is installed, or gzip
+
+A response is compressed whole or, if it is streamed, a chunk at a time as it is sent. The compressed bytes of a
+response with a strong ETag, which is byte-for-byte the same each time it is given, or with a compression_key, are
+cached so that, for instance, a Sample's view from RENDER_CACHE, HTML included, is compressed once and then served many
+times.
+"""
+import zlib
+from flask import request
+import _config as conf
+from model.cache import TTLCache
+try:
+    import brotli
+except ImportError:  # optional, without it only gzip is offered
+    brotli = None
+
+# the content codings offered, most preferred first for clients that accept more than one equally
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# media types, other than text/* and those with +xml or +json suffixes, that are worth compressing
+COMPRESSIBLE_TYPES = frozenset(['application/xml', 'application/json', 'application/javascript'])
+
+# compressed bodies, by (strong ETag or compression_key, content coding)
+COMPRESSED_CACHE = TTLCache(
+    conf.COMPRESSED_CACHE_MAX_ENTRIES,
+    conf.COMPRESSED_CACHE_TTL,
+    max_bytes=conf.COMPRESSED_CACHE_MAX_BYTES
+)
+
+
+class _GzipCompressor:
+    def __init__(self):
+        self._z = zlib.compressobj(conf.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._z.compress(data)
+
+    def flush(self):
+        return self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._z.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self):
+        self._c = brotli.Compressor(quality=conf.COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self._c.process(data)
+
+    def flush(self):
+        return self._c.flush()
+
+    def finish(self):
+        return self._c.finish()
+
+
+def _compressor(encoding):
+    return _BrotliCompressor() if encoding == 'br' else _GzipCompressor()
+
+
+def compress(data, encoding):
+    """
+    :param data: the bytes to compress
+    :param encoding: one of ENCODINGS
+    :return: the data compressed in that content coding
+    """
+    compressor = _compressor(encoding)
+    return compressor.compress(data) + compressor.finish()
+
+
+def _compress_stream(chunks, encoding, charset):
+    # compresses a streamed body, flushing after each chunk so that the client gets each chunk as it is made
+    compressor = _compressor(encoding)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode(charset)
+            data = compressor.compress(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def is_compressible(mimetype):
+    """
+    :param mimetype: a response's media type, without parameters
+    :return: True if responses of that media type are worth compressing
+    """
+    return mimetype.startswith('text/') or mimetype.endswith(('+xml', '+json')) or mimetype in COMPRESSIBLE_TYPES
+
+
+def negotiate():
+    """
+    :return: the content coding, of ENCODINGS, this request's client most prefers, or None if it accepts none of them
+    """
+    return request.accept_encodings.best_match(ENCODINGS)
+
+
+def compress_response(response):
+    """
+    Compresses a response in the content coding negotiated with the client, for use with Flask's after_request
+
+    Responses that are already encoded, such as the gzip-compressed XML dump, static files, responses without a body and
+    those of media types that don't compress are left as they are. A strong ETag is made weak, as the compressed body
+    is no longer the same bytes, but If-None-Match is still answered by it.
+
+    A view may set a response's compression_key to a hashable value that the same body is always given for, as a Sample
+    does with its export_key(), for its compressed bytes to be cached, as those of responses with strong ETags are.
+    A request with Cache-Control: no-cache compresses the body again, and re-caches it.
+
+    :param response: a Flask Response
+    :return: the Response
+    """
+    if not conf.COMPRESSION_ENABLED or response.direct_passthrough or response.status_code < 200 or \
+            response.status_code in (204, 206, 304) or 'Content-Encoding' in response.headers or \
+            response.mimetype is None or not is_compressible(response.mimetype):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate()
+    if encoding is None:
+        return response
+
+    etag, weak = response.get_etag()
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding, response.charset)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < conf.COMPRESSION_MIN_SIZE:
+            return response
+        key = getattr(response, 'compression_key', None)
+        if key is None and etag is not None and not weak:
+            key = etag
+        if key is not None and not request.cache_control.no_cache:
+            data = COMPRESSED_CACHE.get_or_compute((key, encoding), lambda: compress(data, encoding))
+        else:
+            data = compress(data, encoding)
+            if key is not None:
+                COMPRESSED_CACHE.set((key, encoding), data)
+        response.set_data(data)
+
+    response.headers['Content-Encoding'] = encoding
+    if etag is not None and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,61 @@
+"""
+This file contains the HTTP validators, ETag & Last-Modified, of this web service's responses and the answering of
+conditional GETs with 304 Not Modified before a response is rendered
+"""
+import calendar
+import hashlib
+from datetime import timezone
+from flask import Response, request
+from werkzeug.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """
+    :param parts: the values a response's body is made from, such that the same values always give the same body
+    :return: an entity tag, unquoted
+    """
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def _utc(last_modified):
+    # an aware datetime in UTC, to the second, as in HTTP dates; those without a timezone are taken to be in UTC
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def validators(etag, last_modified=None, weak=False):
+    """
+    :param etag: the response's entity tag, unquoted
+    :param last_modified: the datetime the response's content was last modified, or None if not known
+    :param weak: whether the entity tag is weak, i.e. the same tag may be given for bodies that are not byte-for-byte
+        the same, but are equivalent
+    :return: a dict of ETag & Last-Modified headers
+    """
+    headers = {'ETag': quote_etag(etag, weak)}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(calendar.timegm(_utc(last_modified).timetuple()))
+    return headers
+
+
+def not_modified(etag, last_modified=None, weak=False):
+    """
+    Answers a conditional GET: If-None-Match is compared with the entity tag or, if there is no If-None-Match,
+    If-Modified-Since with the last modified date.
+
+    :param etag: the entity tag the response would have, unquoted
+    :param last_modified: the datetime the response's content was last modified, or None if If-Modified-Since is not to
+        be answered
+    :param weak: whether the entity tag is weak
+    :return: a 304 Not Modified Response if the client's copy is current, else None
+    """
+    if request.if_none_match:
+        if not request.if_none_match.contains_weak(etag):
+            return None
+    elif request.if_modified_since is not None and last_modified is not None:
+        if _utc(last_modified) > _utc(request.if_modified_since):
+            return None
+    else:
+        return None
+
+    return Response(status=304, headers=validators(etag, last_modified, weak))
@@ -1,10 +1,37 @@
 from flask import Blueprint, render_template, request, Response
 from controller.oai_functions import *
 from controller.oai_errors import *
+from controller.conditional import make_etag, not_modified, validators
+from model.cache import TTLCache
 import _config as conf
 
 oai_ = Blueprint('oai', __name__)
 
+# Identify responses, rendered with RESPONSE_DATE_PLACEHOLDER in place of the responseDate, keyed by (base URL,
+# earliest datestamp) so that they are only re-rendered when the earliest datestamp changes
+IDENTIFY_RESPONSES = TTLCache(16, conf.EARLIEST_DATESTAMP_TTL)
+RESPONSE_DATE_PLACEHOLDER = '@@RESPONSE_DATE@@'
+
+
+def get_identify_xml(base_url):
+    earliest_date = get_earliest_datestamp()
+
+    def render():
+        values = {
+            'base_url': base_url,
+            'admin_email': conf.ADMIN_EMAIL,
+            'earliest_date': earliest_date
+        }
+
+        return render_template(
+            'oai_identify.xml',
+            response_date=RESPONSE_DATE_PLACEHOLDER,
+            request_uri=base_url,
+            values=values
+        )
+
+    return IDENTIFY_RESPONSES.get_or_compute((base_url, earliest_date), render)
+
 
 def render_error(response_date, request_uri, oai_code, message, http_status=400):
     return Response(
@@ -43,21 +70,29 @@ def oai():
     if request.values.get('verb') == 'GetRecord':
         try:
             from model.sample import Sample
-            s = Sample(request.values.get('identifier'))
+            use_cache = not request.cache_control.no_cache
+            s = Sample(request.values.get('identifier'), use_cache=use_cache)
 
             if s.date_modified is not None:
                 date_modified = datetime_to_datestamp(s.date_modified)
             else:
                 date_modified = '1900-01-01T00:00:00Z'
 
+            # the response's responseDate differs each time so the ETag is weak
+            etag = make_etag('GetRecord', s.igsn, request.values.get('metadataPrefix'), s.date_modified)
+            response = not_modified(etag, s.date_modified, weak=True)
+            if response is not None:
+                return response
+
+            # shares the exports of the views made for /sample/<igsn>
             if request.values.get('metadataPrefix') == 'igsn':
-                record_xml = s.export_igsn_xml()
+                record_xml = s.export('igsn', 'text/xml', use_cache)
             elif request.values.get('metadataPrefix') == 'igsn-r1':
-                record_xml = s.export_igsn_r1_xml()
+                record_xml = s.export('igsn-r1', 'text/xml', use_cache)
             elif request.values.get('metadataPrefix') == 'csirov3':
-                record_xml = s.export_csirov3_xml()
+                record_xml = s.export('csirov3', 'text/xml', use_cache)
             else:  # 'oai_dc':
-                record_xml = s.export_dct_xml()
+                record_xml = s.export('dct', 'text/xml', use_cache)
 
             return Response(
                 render_template(
@@ -69,7 +104,8 @@ def oai():
                     date_modified=date_modified,
                     record_xml=record_xml
                 ),
-                mimetype='text/xml'
+                mimetype='text/xml',
+                headers=validators(etag, s.date_modified, weak=True)
             )
 
         except IdDoesNotExistError as e:
@@ -77,26 +113,15 @@ def oai():
             return render_error(response_date, request.base_url, e.oainame(), message)
 
     elif request.values.get('verb') == 'Identify':
-        values = {
-            'base_url': request.base_url,
-            'admin_email': conf.ADMIN_EMAIL,
-            'earliest_date': get_earliest_datestamp()
-        }
-
         return Response(
-            render_template(
-                'oai_identify.xml',
-                response_date=response_date,
-                request_uri=request.base_url,
-                values=values
-            ),
+            get_identify_xml(request.base_url).replace(RESPONSE_DATE_PLACEHOLDER, response_date),
             mimetype='text/xml'
         )
 
     elif request.values.get('verb') == 'ListIdentifiers':
         # render_template
         try:
-            samples, resumption_token = list_records(
+            sampleset, resumption_token = list_records(
                 request.values.get('metadataPrefix'),
                 request.values.get('resumptionToken'),
                 request.values.get('from'),
@@ -109,7 +134,7 @@ def oai():
                     response_date=response_date,
                     request_uri=request.base_url,
                     metadataPrefix=request.values.get('metadataPrefix'),
-                    samples=samples,
+                    headers=sampleset.headers(),
                     resumptiontoken=resumption_token
                 ),
                 mimetype='text/xml'
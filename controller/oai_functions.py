@@ -1,13 +1,20 @@
 from datetime import datetime, timedelta
 from io import BytesIO
-import requests
 from lxml import etree
 import _config as conf
-from model import Sample
+from model import Sample, upstream, mirror
+from model.cache import TTLCache
+from model.sampleset import SampleSet
 from controller.oai_datestamp import *
 from controller.oai_errors import *
+from controller.oai_prefetch import get_page, prefetch
 import math
 
+# record counts keyed by (from, until) date range
+COUNT_CACHE = TTLCache(conf.COUNT_CACHE_MAX_ENTRIES, conf.COUNT_CACHE_TTL, stale_ttl=conf.COUNT_CACHE_STALE_TTL)
+# the earliest modified datestamp, under the key 'earliest'
+EARLIEST_DATESTAMP_CACHE = TTLCache(1, conf.EARLIEST_DATESTAMP_TTL, stale_ttl=conf.EARLIEST_DATESTAMP_STALE_TTL)
+
 
 # https://www.openarchives.org/OAI/openarchivesprotocol.html, 3.6 Error and Exception Conditions
 OAI_ARGS = {
@@ -90,59 +97,60 @@ def validate_oai_parameters(qsa_args):
 
 
 def list_records(metadataPrefix, resumptionToken=None, from_=None, until=None):
-    # if we don't have a resumption token, start at the beginning
-    if resumptionToken is None:
-        oracle_api_samples_url = conf.XML_API_URL_SAMPLESET.format(1, conf.OAI_BATCH_SIZE)
-    else:
-        oracle_api_samples_url = create_url_query_token(resumptionToken)
+    if resumptionToken is not None:
         [from_, until, batch_num, metadataPrefix] = resumptionToken.split(',')
 
-    r = requests.get(oracle_api_samples_url)
+    samples = get_page('ListIdentifiers', resumptionToken, lambda: _list_records_page(resumptionToken))
 
-    if "No data" in r.content.decode('utf-8'):
-        raise NoRecordsMatchError('No Data')
+    resumption_token = get_resumption_token(metadataPrefix, resumptionToken, from_, until)
+    prefetch('ListIdentifiers', resumption_token, _list_records_page)
 
-    samples = []
+    return samples, resumption_token
 
-    for event, elem in etree.iterparse(BytesIO(r.content), tag='ROW'):
-        samples.append(get_obj_vars_as_dict(Sample(None, '<root>{}</root>'.format(etree.tostring(elem)))))
 
-    resumption_token = get_resumption_token(metadataPrefix, resumptionToken, from_, until)
+def _list_records_page(resumptionToken):
+    # only the IGSN & datestamp of each Sample are given so the page is decoded as columns, not as Samples
+    sampleset = get_sampleset(resumptionToken, parse=SampleSet.from_api_response)
+    if len(sampleset) == 0:
+        raise NoRecordsMatchError('No Data')
 
-    return samples, resumption_token
+    return sampleset
 
 
 def list_records_xml(metadataPrefix, resumptionToken=None, from_=None, until=None):
-    no_per_page = conf.OAI_BATCH_SIZE
-    page_no = 1
-
-    if resumptionToken is None:
-        oracle_api_samples_url = conf.XML_API_URL_SAMPLESET.format(page_no, no_per_page)
-    else:
-        oracle_api_samples_url = create_url_query_token(resumptionToken)
+    if resumptionToken is not None:
         [from_, until, batch_num, metadataPrefix] = resumptionToken.split(',')
+    # for some reason, there's this odd whitespace character in the metadataPrefix
+    metadataPrefix = metadataPrefix.replace(u'\u200b', '')
+
+    samples = get_page(
+        'ListRecords', resumptionToken, lambda: _list_records_xml_page(metadataPrefix, resumptionToken), metadataPrefix
+    )
+
+    resumption_token = get_resumption_token(metadataPrefix, resumptionToken, from_, until)
+    prefetch(
+        'ListRecords', resumption_token, lambda token: _list_records_xml_page(token.split(',')[3], token)
+    )
+
+    return samples, resumption_token
 
-    print(oracle_api_samples_url)
-    r = requests.get(oracle_api_samples_url)
 
-    if "No data" in r.content.decode('utf-8'):
+def _list_records_xml_page(metadataPrefix, resumptionToken):
+    sampleset = get_sampleset(resumptionToken)
+    if len(sampleset) == 0:
         raise NoRecordsMatchError(
             'The combination of the values of the from, until, '
             'set and metadataPrefix arguments results in an empty list.')
 
     samples = []
 
-    for event, elem in etree.iterparse(BytesIO(r.content), tag='ROW'):
-        # create a Sample for each XML ROW
-        sample = Sample(None, '<root>{}</root>'.format(etree.tostring(elem)))
+    for sample in sampleset:
         if sample.date_modified is not None:
             datestamp = datetime_to_datestamp(sample.date_modified)
         else:
             datestamp = '1900-01-01T00:00:00Z'
 
         # make the record XML using the Sample export
-        # for some reason, there's this odd whitespace character in the metadataPrefix
-        metadataPrefix = metadataPrefix.replace(u'\u200b', '')
         if metadataPrefix == 'igsn':
             record_xml = sample.export_igsn_xml()
         elif metadataPrefix == 'igsn-r1':
@@ -183,9 +191,8 @@ def list_records_xml(metadataPrefix, resumptionToken=None, from_=None, until=Non
 
         # add the OAI record to the list of samples
         samples.append(oai_record)
-    resumption_token = get_resumption_token(metadataPrefix, resumptionToken, from_, until)
 
-    return samples, resumption_token
+    return samples
 
 
 def get_resumption_token(metadataPrefix, resumptionToken=None, from_=None, until=None):
@@ -238,12 +245,17 @@ def get_earliest_date():
     date from the samples table.
     :return: a date object
     """
-    r = requests.get(conf.XML_API_URL_MIN_DATE)
+    if conf.MIRROR_ENABLED:
+        min_date = mirror.get_earliest_date()
+        if min_date is None:
+            raise NoRecordsMatchError('No Data')
+        return min_date
+
+    xml = upstream.fetch(conf.XML_API_URL_MIN_DATE)
 
-    if "No data" in r.content.decode('utf-8'):
+    if "No data" in xml.decode('utf-8'):
         raise NoRecordsMatchError('No Data')
 
-    xml = r.content
     context = etree.iterparse(BytesIO(xml), tag='EARLIEST_MODIFIED_DATE')
     for event, elem in context:
         str_min_date = elem.text
@@ -254,17 +266,23 @@ def get_earliest_date():
 def get_earliest_datestamp():
     """
     returns an OAI-PMH format datestamp of the earliest modified_date in GA's
-    Samples database eg 2017-03-27T19:20:53Z
+    Samples database eg 2017-03-27T19:20:53Z. The value is cached for
+    the process & refreshed in the background.
     :param :
     :return: an OAI-PMH format datestamp
     """
-    return datetime_to_datestamp(get_earliest_date())
+    return EARLIEST_DATESTAMP_CACHE.get_or_compute(
+        'earliest',
+        lambda: datetime_to_datestamp(get_earliest_date()),
+        refresh_after=conf.EARLIEST_DATESTAMP_REFRESH_AFTER
+    )
 
 
 def get_complete_list_size(str_from_date=None, str_until_date=None):
     """
     queries GA's ORACLE DB and gets the number of records the query
-    matches from the samples table.
+    matches from the samples table. Counts are cached per date range,
+    computed once for concurrent requests & refreshed in the background.
     :return: an integer
     """
 
@@ -277,24 +295,75 @@ def get_complete_list_size(str_from_date=None, str_until_date=None):
     else:
         str_until_date = convert_datestamp_to_oracle(str_until_date)
 
-    r = requests.get(conf.XML_API_URL_TOTAL_COUNT_DATE_RANGE.format(str_from_date, str_until_date))
+    return COUNT_CACHE.get_or_compute(
+        (str_from_date, str_until_date),
+        lambda: _count_records(str_from_date, str_until_date),
+        refresh_after=conf.COUNT_CACHE_REFRESH_AFTER
+    )
+
+
+def _count_records(str_from_date, str_until_date):
+    if conf.MIRROR_ENABLED:
+        return mirror.get_count(str_from_date, str_until_date)
 
-    if "No data" in r.content.decode('utf-8'):
+    xml = upstream.fetch(conf.XML_API_URL_TOTAL_COUNT_DATE_RANGE.format(str_from_date, str_until_date))
+
+    if "No data" in xml.decode('utf-8'):
         raise NoRecordsMatchError('No Data')
 
-    context = etree.iterparse(BytesIO(r.content), tag='RECORD_COUNT')
+    context = etree.iterparse(BytesIO(xml), tag='RECORD_COUNT')
     for event, elem in context:
         str_record_count = elem.text
 
     return int(str_record_count)
 
 
-def create_url_query_token(token):
+def get_sampleset(resumptionToken=None, parse=None):
     """
-    returns the url to query GA's Samples database based
-    on a resumption token.
+    returns the page of samples for a ListIdentifiers or ListRecords
+    request from GA's Samples database, or its local mirror if enabled.
+    :param resumptionToken: a resumption token, or None for the first page
+    :param parse: function to parse the SampleSet API response with, _samples_from_api_response() by default
+    :return: the parsed page, by default a list of Samples, empty if there are no matching samples
+    """
+    if parse is None:
+        parse = _samples_from_api_response
+
+    if conf.MIRROR_ENABLED:
+        if resumptionToken is None:
+            xml = mirror.get_sampleset_xml(1, conf.OAI_BATCH_SIZE)
+        else:
+            xml = mirror.get_sampleset_xml(*parse_query_token(resumptionToken))
+        return parse(BytesIO(xml if xml is not None else b'<ROWSET/>'))
+
+    # if we don't have a resumption token, start at the beginning
+    if resumptionToken is None:
+        oracle_api_samples_url = conf.XML_API_URL_SAMPLESET.format(1, conf.OAI_BATCH_SIZE)
+    else:
+        oracle_api_samples_url = create_url_query_token(resumptionToken)
+
+    # concurrent requests for the same page, e.g. from a harvester's retries, share the one API call and parse
+    return upstream.fetch(oracle_api_samples_url, parse)
+
+
+def _samples_from_api_response(stream):
+    """
+    parses a SampleSet API response as it is read.
+    :param stream: binary file-like object of the response XML
+    :return: a list of Samples, one for each ROW
+    """
+    samples = []
+    for row in upstream.iter_rows(stream, objectified=True):
+        # create a Sample for each XML ROW, straight from the parsed element
+        samples.append(Sample.from_element(row))
+    return samples
+
+
+def parse_query_token(token):
+    """
+    returns the SampleSet query parameters for a resumption token.
     :param token: a resumption token
-    :return: A url for querying the samples DB
+    :return: page number, number per page, from date & until date
     """
     no_per_page = conf.OAI_BATCH_SIZE
 
@@ -304,14 +373,17 @@ def create_url_query_token(token):
 
     page_no = str(math.floor(int(cursor) / int(no_per_page)))
 
-    oracle_api_samples_url = conf.XML_API_URL_SAMPLESET_DATE_RANGE.format(
-        page_no, no_per_page, from_date, until_date
-    )
-    return oracle_api_samples_url
+    return page_no, no_per_page, from_date, until_date
 
 
-def get_obj_vars_as_dict(x):
-    return dict((key, getattr(x, key)) for key in dir(x) if key not in dir(x.__class__))
+def create_url_query_token(token):
+    """
+    returns the url to query GA's Samples database based
+    on a resumption token.
+    :param token: a resumption token
+    :return: A url for querying the samples DB
+    """
+    return conf.XML_API_URL_SAMPLESET_DATE_RANGE.format(*parse_query_token(token))
 
 
 def calc_expiration_datestamp():
@@ -0,0 +1,126 @@
+"""
+This file contains the speculative prefetching of the next page of OAI-PMH ListIdentifiers & ListRecords results
+
+Harvesters page through results strictly in sequence using resumption tokens so, once a page has been given, the next
+page is fetched from the Oracle XML API and parsed in the background, ready for the harvester's next request.
+
+Pages given are kept too and, once past their TTL, still given, while they are fetched again in the background, for up
+to OAI_PAGE_STALE_TTL, so that a harvester retrying a page while the API is unavailable is given its last copy.
+"""
+import threading
+from flask import current_app
+import _config as conf
+from model.cache import TTLCache
+
+# pages of results, given or prefetched, keyed by (verb, resumption token) or, for first pages, (verb, None,
+# metadataPrefix)
+PAGE_CACHE = TTLCache(
+    conf.OAI_PREFETCH_MAX_PAGES,
+    conf.OAI_PREFETCH_TTL,
+    max_bytes=conf.OAI_PREFETCH_MAX_BYTES,
+    stale_ttl=conf.OAI_PAGE_STALE_TTL
+)
+
+_slots = threading.BoundedSemaphore(max(conf.OAI_PREFETCH_MAX_CONCURRENT, 1))
+_stats = {
+    'hits': 0,  # requests given a prefetched page, or one still being prefetched
+    'misses': 0,  # requests with a resumption token whose page was not prefetched
+    'started': 0,
+    'skipped': 0,  # prefetches not started as OAI_PREFETCH_MAX_CONCURRENT were already running
+    'failed': 0
+}
+_stats_lock = threading.Lock()
+
+
+def _count(stat):
+    with _stats_lock:
+        _stats[stat] += 1
+
+
+def token_string(resumption_token):
+    """
+    :param resumption_token: a resumption token dict, as made by get_resumption_token()
+    :return: the resumption token as given to harvesters, and so as they will send it back
+    """
+    return '{from_},{until},{cursor_next},{metadataPrefix}'.format(**resumption_token)
+
+
+def _in_app_context(fn):
+    # Samples' exports use templates so need the app context, including in background threads
+    app = current_app._get_current_object()
+
+    def run(*args):
+        with app.app_context():
+            return fn(*args)
+    return run
+
+
+def get_page(verb, resumptionToken, make_page, metadataPrefix=None):
+    """
+    Returns a page of results, the prefetched or cached one if there is one, else by calling make_page, and caches it
+
+    :param verb: ListIdentifiers or ListRecords
+    :param resumptionToken: the resumption token given by the harvester, or None for the first page
+    :param make_page: function, with no arguments, that fetches & parses the page
+    :param metadataPrefix: the metadataPrefix of a first page, for ListRecords
+    :return: the page of results
+    """
+    if resumptionToken is None:
+        key = (verb, None, metadataPrefix)
+    else:
+        key = (verb, resumptionToken.strip())
+        if PAGE_CACHE.get(key, count=False) is None and not PAGE_CACHE.in_flight(key):
+            _count('misses')
+        else:
+            _count('hits')
+
+    # waits for the prefetch if it is still running
+    return PAGE_CACHE.get_or_compute(key, _in_app_context(make_page))
+
+
+def prefetch(verb, resumption_token, make_page):
+    """
+    Starts fetching the page for the next resumption token in a background thread, unless it has been already, or
+    OAI_PREFETCH_MAX_CONCURRENT prefetches are already running
+
+    :param verb: ListIdentifiers or ListRecords
+    :param resumption_token: the next resumption token dict, or None if there are no more pages
+    :param make_page: function, taking the resumption token string, that fetches & parses the page
+    :return: None
+    """
+    if resumption_token is None or conf.OAI_PREFETCH_MAX_CONCURRENT < 1:
+        return
+
+    token = token_string(resumption_token)
+    key = (verb, token)
+    if PAGE_CACHE.get(key, count=False) is not None or PAGE_CACHE.in_flight(key):
+        return
+
+    if not _slots.acquire(blocking=False):
+        _count('skipped')
+        return
+    _count('started')
+    make_page = _in_app_context(make_page)
+
+    def run():
+        try:
+            PAGE_CACHE.get_or_compute(key, lambda: make_page(token))
+        except Exception as e:
+            _count('failed')
+            print('prefetch of {} {} failed: {}'.format(verb, token, e))
+        finally:
+            _slots.release()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def stats():
+    """
+    :return: a dict of prefetch counters, the prefetch hit rate and the page cache's statistics, for monitoring
+    """
+    with _stats_lock:
+        s = dict(_stats)
+    requests = s['hits'] + s['misses']
+    s['hit_rate'] = s['hits'] / requests if requests > 0 else None
+    s['cache'] = PAGE_CACHE.stats()
+    return s
@@ -1,7 +1,8 @@
 """
 This file contains all the HTTP routes for basic pages (usually HTML)
 """
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, jsonify, Response
+from model.upstream import BREAKER, CircuitOpenError, UpstreamError
 
 
 pages = Blueprint('controller', __name__)
@@ -24,3 +25,59 @@ def about():
     return render_template(
         'page_about.html'
     )
+
+
+@pages.route('/health')
+def health():
+    """
+    The state of this web service's connection to the Oracle XML API and of its caches, for monitoring
+
+    :return: HTTP Response (JSON only)
+    """
+    from model.sample import SAMPLE_CACHE, RENDER_CACHE
+    from model.register import COUNT_CACHE as REGISTER_COUNT_CACHE, PAGE_CACHE as REGISTER_PAGE_CACHE
+    from controller import compression, oai_functions, oai_prefetch
+
+    return jsonify({
+        'upstream': BREAKER.stats(),
+        'caches': {
+            'samples': SAMPLE_CACHE.stats(),
+            'rendered_samples': RENDER_CACHE.stats(),
+            'register_count': REGISTER_COUNT_CACHE.stats(),
+            'register_pages': REGISTER_PAGE_CACHE.stats(),
+            'oai_counts': oai_functions.COUNT_CACHE.stats(),
+            'oai_earliest_datestamp': oai_functions.EARLIEST_DATESTAMP_CACHE.stats(),
+            'compressed_responses': compression.COMPRESSED_CACHE.stats()
+        },
+        'oai_prefetch': oai_prefetch.stats()
+    })
+
+
+@pages.app_errorhandler(CircuitOpenError)
+def upstream_unavailable(e):
+    """
+    Responds to requests needing data that is not cached while the Oracle XML API is unavailable
+
+    :return: HTTP Response (plain text only)
+    """
+    return Response(
+        'The Samples database is temporarily unavailable. Please try again later.',
+        status=503,
+        mimetype='text/plain',
+        headers={'Retry-After': str(BREAKER.retry_after())}
+    )
+
+
+@pages.app_errorhandler(UpstreamError)
+def upstream_error(e):
+    """
+    Responds to requests for which the Oracle XML API gave an error, rather than data or its 'No data' message
+
+    :return: HTTP Response (plain text only)
+    """
+    print(e)
+    return Response(
+        'The Samples database gave an error. Please try again later.',
+        status=502,
+        mimetype='text/plain'
+    )
@@ -0,0 +1,252 @@
+"""
+This file contains the in-process caches used to avoid repeated calls to GA's Oracle XML API
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def approximate_sizeof(value):
+    """
+    Returns a rough size, in bytes, of a cached value: the value itself plus, for dicts, lists, tuples & objects with
+    __slots__, its members
+
+    :param value: any Python value
+    :return: an int number of bytes
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += sys.getsizeof(k) + approximate_sizeof(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            size += approximate_sizeof(v)
+    elif hasattr(value, '__slots__'):
+        for name in value.__slots__:
+            size += approximate_sizeof(getattr(value, name, None))
+    return size
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into a single call whose result, or exception, is shared by all callers
+    """
+
+    class _Flight:
+        def __init__(self):
+            self.done = threading.Event()
+            self.value = None
+            self.error = None
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def in_flight(self, key):
+        return key in self._flights
+
+    def do(self, key, fn):
+        """
+        Calls fn, unless a call for key is already in flight in which case that call's result is waited for
+
+        :param key: identifies calls that would return the same result
+        :param fn: the function to call, with no arguments
+        :return: the result of fn
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = SingleFlight._Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = fn()
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+class TTLCache:
+    """
+    A thread-safe, bounded cache whose entries expire after a time-to-live and which evicts the least recently used
+    entries once either max_entries or max_bytes is exceeded
+
+    Values should be plain Python values (str, int, float, datetime, dict, list etc.) so that their size can be
+    estimated and so that they don't keep large object graphs, such as parsed XML trees, alive.
+
+    If stale_ttl is given, expired entries are kept for that many more seconds during which get_or_compute() still
+    returns them, while refreshing them in the background, so that callers don't wait on, or fail with, a slow or
+    unavailable API.
+    """
+
+    def __init__(self, max_entries, ttl, max_bytes=None, sizeof=approximate_sizeof, stale_ttl=0):
+        """
+        :param max_entries: the maximum number of entries held
+        :param ttl: the number of seconds an entry is fresh for
+        :param max_bytes: optional maximum total (approximate) size of all values held
+        :param sizeof: function returning the size of a value, in bytes
+        :param stale_ttl: the number of seconds after expiry that get_or_compute() may still return an entry
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.stale_ttl = stale_ttl
+        self.current_bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (stored, expires, size, value), least recently used first
+        self._lock = threading.RLock()
+        self._flights = SingleFlight()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def in_flight(self, key):
+        """
+        :param key: the cache key
+        :return: True if the value for key is being computed by get_or_compute
+        """
+        return self._flights.in_flight(key)
+
+    def get(self, key, default=None, count=True):
+        """
+        Returns the cached value for key if it is present and has not expired, else default
+
+        :param key: the cache key
+        :param default: value to return on a miss
+        :param count: whether or not to count this lookup in the hit/miss statistics
+        :return: the cached value or default
+        """
+        entry = self._lookup(key, count)
+        return entry[3] if entry is not None else default
+
+    def get_or_compute(self, key, compute, refresh_after=None):
+        """
+        Returns the cached value for key, calling compute to get and cache it on a miss. Concurrent misses for the same
+        key make only one call to compute. A value of None is returned but not cached.
+
+        If refresh_after is given, a value older than that is still returned but is also recomputed in a background
+        thread, so that frequently used values are kept fresh without callers waiting. Expired values still within
+        stale_ttl are treated the same way.
+
+        :param key: the cache key
+        :param compute: function, with no arguments, returning the value for key
+        :param refresh_after: optional age, in seconds, after which a value is refreshed in the background
+        :return: the cached or computed value
+        """
+        entry = self._lookup(key, allow_stale=True)
+        if entry is not None:
+            now = time.time()
+            if (entry[1] <= now or (refresh_after is not None and now - entry[0] > refresh_after)) \
+                    and not self._flights.in_flight(key):
+                threading.Thread(target=self._refresh, args=(key, compute), daemon=True).start()
+            return entry[3]
+
+        return self._flights.do(key, lambda: self._compute_and_set(key, compute))
+
+    def set(self, key, value, ttl=None):
+        """
+        Caches value against key, evicting least recently used entries if the cache is over its limits
+
+        :param key: the cache key
+        :param value: the value to cache
+        :param ttl: optional time-to-live for this entry, in seconds, overriding the cache's default
+        :return: None
+        """
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # would evict everything else and still not fit
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            now = time.time()
+            self._entries[key] = (now, now + (self.ttl if ttl is None else ttl), size, value)
+            self.current_bytes += size
+
+            while len(self._entries) > self.max_entries or \
+                    (self.max_bytes is not None and self.current_bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def purge(self, key=None):
+        """
+        Removes the entry for key or, if no key is given, all entries
+
+        :param key: optional cache key
+        :return: None
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self.current_bytes = 0
+            elif key in self._entries:
+                self._remove(key)
+
+    def stats(self):
+        """
+        :return: a dict of this cache's size and hit/miss counters, for monitoring
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def _lookup(self, key, count=True, allow_stale=False):
+        with self._lock:
+            now = time.time()
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] + self.stale_ttl <= now:
+                self._remove(key)
+                entry = None
+
+            stale = entry is not None and entry[1] <= now
+            if entry is None or (stale and not allow_stale):
+                if count:
+                    self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            if count:
+                if stale:
+                    self.stale_hits += 1
+                else:
+                    self.hits += 1
+            return entry
+
+    def _compute_and_set(self, key, compute):
+        value = compute()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def _refresh(self, key, compute):
+        try:
+            self._flights.do(key, lambda: self._compute_and_set(key, compute))
+        except Exception as e:
+            # keep serving the existing value until it expires, or is too stale
+            print('background refresh of {} failed: {}'.format(key, e))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.current_bytes -= entry[2]
@@ -0,0 +1,121 @@
+"""
+This file contains a bulk dump of every sample, in N-Triples, Turtle or a gzip-compressed XML export
+
+Samples are read page by page, from the paged SampleSet API or from the local mirror if MIRROR_ENABLED is set, and
+written a sample at a time, so that a dump of any number of samples is made in bounded memory. It is served at
+/sample/dump and may be written to a file from the command line.
+
+Usage:
+    python -m model.dump nt -o samples.nt                 # every sample in N-Triples, in the igsn-o view
+    python -m model.dump turtle --view dct -o samples.ttl
+    python -m model.dump xml -o samples.xml.gz            # every sample's ROW, as given by the API, gzip-compressed
+"""
+import argparse
+import sys
+import zlib
+from io import BytesIO
+from lxml import etree
+import _config as conf
+from . import upstream, mirror, rdf_writer
+from .sample import Sample, VIEW_PREFIXES
+
+# the dump formats, by name, as (mimetype, file extension) tuples
+FORMATS = {
+    'nt': ('text/nt', '.nt'),
+    'turtle': ('text/turtle', '.ttl'),
+    'xml': ('application/gzip', '.xml.gz')
+}
+# the Sample views a dump may be made in
+VIEWS = ('igsn-o', 'dct', 'prov', 'sosa')
+
+XML_HEADER = b'<?xml version="1.0" encoding="UTF-8"?>\n<ROWSET>\n'
+XML_FOOTER = b'</ROWSET>\n'
+
+
+def iter_sample_rows(objectified=False, per_page=None):
+    """
+    Reads every sample's ROW element, page by page, until a page comes back short or empty. Each ROW is cleared once
+    the next is asked for, as by upstream.iter_rows(), so it must be used before then.
+
+    :param objectified: whether or not to make the ROWs lxml objectify elements
+    :param per_page: the number of samples per page, defaults to DUMP_PAGE_SIZE
+    :return: a generator of ROW elements
+    """
+    per_page = per_page or conf.DUMP_PAGE_SIZE
+    page = 1
+    while True:
+        count = 0
+        if conf.MIRROR_ENABLED:
+            xml = mirror.get_sampleset_xml(page, per_page)
+            if xml is None:
+                return
+            for row in upstream.iter_rows(BytesIO(xml), objectified=objectified):
+                count += 1
+                yield row
+        else:
+            r = upstream.get(conf.XML_API_URL_SAMPLESET.format(page, per_page), stream=True)
+            try:
+                for row in upstream.iter_rows(r.raw, objectified=objectified):
+                    count += 1
+                    yield row
+            finally:
+                r.close()
+        if count < per_page:
+            return
+        page += 1
+
+
+def iter_rdf(rdf_format, view='igsn-o', per_page=None):
+    """
+    :param rdf_format: 'nt' or 'turtle'
+    :param view: one of VIEWS
+    :param per_page: the number of samples per page read, defaults to DUMP_PAGE_SIZE
+    :return: a generator of every sample, in the view, in the format, as str chunks
+    """
+    graphs = (
+        Sample.from_element(row)._rdf_triples(view) for row in iter_sample_rows(objectified=True, per_page=per_page)
+    )
+    return rdf_writer.iter_graphs(graphs, rdf_format, VIEW_PREFIXES[view])
+
+
+def iter_xml_gz(per_page=None):
+    """
+    :param per_page: the number of samples per page read, defaults to DUMP_PAGE_SIZE
+    :return: a generator of a gzip-compressed ROWSET of every sample's ROW, as given by the API, as bytes chunks
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)  # a gzip member
+    yield compressor.compress(XML_HEADER)
+    for row in iter_sample_rows(per_page=per_page):
+        chunk = compressor.compress(etree.tostring(row, encoding='UTF-8', xml_declaration=False) + b'\n')
+        if chunk:
+            yield chunk
+    yield compressor.compress(XML_FOOTER) + compressor.flush()
+
+
+def dump(dump_format, view='igsn-o', per_page=None):
+    """
+    :param dump_format: one of FORMATS
+    :param view: one of VIEWS, for the RDF formats
+    :param per_page: the number of samples per page read, defaults to DUMP_PAGE_SIZE
+    :return: a generator of every sample in the format, as str chunks for the RDF formats and bytes for xml
+    """
+    if dump_format == 'xml':
+        return iter_xml_gz(per_page)
+    return iter_rdf(dump_format, view, per_page)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Dump every sample, page by page, from the API or the local mirror')
+    parser.add_argument('format', choices=sorted(FORMATS))
+    parser.add_argument('-o', '--output', help='the file to write to, defaults to standard output')
+    parser.add_argument('--view', choices=VIEWS, default='igsn-o', help='the Sample view of the RDF formats')
+    parser.add_argument('--per-page', type=int, default=conf.DUMP_PAGE_SIZE, help='samples per page read')
+    args = parser.parse_args()
+
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for chunk in dump(args.format, args.view, args.per_page):
+            out.write(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8'))
+    finally:
+        if args.output:
+            out.close()
@@ -0,0 +1,154 @@
+"""
+This file contains the geometry of a Sample, from the GEOM column of GA's Oracle XML API, and its WKT, GML and Google
+Maps representations
+"""
+from array import array
+
+CRS_WKT = '<http://www.opengis.net/def/crs/EPSG/0/4283>'
+
+
+class Ordinates(array):
+    """
+    A polygon's float ordinates, alternately longitude & latitude, remembering which the API gave as integers, e.g. 138
+    rather than 138.0, so that they are written as it gave them
+    """
+    __slots__ = ('integers',)
+
+
+def _numbers(ordinates):
+    # each ordinate as the API gave it: integers without a decimal point, others as Python writes floats
+    integers = getattr(ordinates, 'integers', None)
+    if integers is None:
+        return [str(value) for value in ordinates]
+    return [str(int(value)) if integer else str(value) for value, integer in zip(ordinates, integers)]
+
+
+class Geometry:
+    """
+    A Sample's point, from SDO_POINT, and polygon, from SDO_ORDINATES, in GDA94.
+
+    Each representation is worked out the first time it is asked for and then kept, so a Sample's, which may be a large
+    survey polygon, is only worked out once however many times the Sample is rendered. Geometries are shared, by their
+    SampleRecords, so must not be modified once made.
+    """
+    __slots__ = ('x', 'y', 'z', 'srid', 'ordinates', '_centroid', '_bbox', '_wkt', '_gml', '_gmap_bbox')
+
+    def __init__(self, x=None, y=None, z=None, srid=None, ordinates=None):
+        """
+        :param x: the point's longitude, or None
+        :param y: the point's latitude, or None
+        :param z: the point's elevation, or None
+        :param srid: the spatial reference system's identifier, or None
+        :param ordinates: the polygon's Ordinates, or None if there is no polygon
+        """
+        self.x = x
+        self.y = y
+        self.z = z
+        self.srid = srid
+        self.ordinates = ordinates
+        self._centroid = None
+        self._bbox = None
+        self._wkt = None
+        self._gml = None
+        self._gmap_bbox = None
+
+    def _number_pairs(self):
+        numbers = _numbers(self.ordinates)
+        return zip(numbers[0::2], numbers[1::2])
+
+    def centroid(self):
+        """
+        :return: a (latitude, longitude) tuple, rounded to 2 decimal places, of the polygon's centre, to centre a map
+        on, or (None, None) if there isn't a polygon
+        """
+        if self._centroid is None:
+            lat = lon = None
+            if self.ordinates is not None:
+                longitudes = self.ordinates[:-2:2]
+                latitudes = self.ordinates[1:-2:2]
+                if len(longitudes) > 0:
+                    lat = round(sum(latitudes) / len(longitudes), 2)
+                if len(latitudes) > 0:
+                    lon = round(sum(longitudes) / len(latitudes), 2)
+            self._centroid = (lat, lon)
+        return self._centroid
+
+    def bbox(self):
+        """
+        :return: a (min longitude, min latitude, max longitude, max latitude) tuple of the polygon, or of the point if
+        there isn't a polygon, or None if there is neither
+        """
+        if self._bbox is None:
+            if self.ordinates is not None and len(self.ordinates) > 1:
+                longitudes = self.ordinates[0::2]
+                latitudes = self.ordinates[1::2]
+                self._bbox = (min(longitudes), min(latitudes), max(longitudes), max(latitudes))
+            elif self.x is not None and self.y is not None:
+                self._bbox = (self.x, self.y, self.x, self.y)
+            else:
+                self._bbox = ()
+        return self._bbox if self._bbox != () else None
+
+    def wkt(self):
+        """
+        :return: the point, or else the polygon, as WKT with its CRS, or '' if there is neither
+        """
+        if self._wkt is None:
+            if self.z is not None:
+                self._wkt = '{} POINTZ({} {} {})'.format(CRS_WKT, self.x, self.y, self.z)
+            elif self.srid is not None and self.x is not None and self.y is not None:
+                self._wkt = '{} POINT({} {})'.format(CRS_WKT, self.x, self.y)
+            elif self.ordinates is not None:
+                self._wkt = '{} POLYGON(({}))'.format(
+                    CRS_WKT,
+                    ', '.join(x + ' ' + y for x, y in self._number_pairs())
+                )
+            else:
+                self._wkt = ''
+        return self._wkt
+
+    def gml(self):
+        """
+        :return: the point as a GML Point, or '' if there isn't one
+        """
+        if self._gml is None:
+            if self.z is not None:
+                self._gml = '<gml:Point srsDimension="3" srsName="https://epsg.io/{}">' \
+                            '<gml:pos>{} {} {}</gml:pos>' \
+                            '</gml:Point>'.format(self.srid, self.x, self.y, self.z)
+            elif self.srid is not None and self.x is not None and self.y is not None:
+                self._gml = '<gml:Point srsDimension="2" srsName="https://epsg.io/{}">' \
+                            '<gml:pos>{} {}</gml:pos>' \
+                            '</gml:Point>'.format(self.srid, self.x, self.y)
+            else:
+                self._gml = ''
+        return self._gml
+
+    def gmap_bbox(self):
+        """
+        :return: the polygon as the body of a JavaScript array of Google Maps LatLngLiterals, or None if there isn't one
+        """
+        if self._gmap_bbox is None and self.ordinates is not None:
+            self._gmap_bbox = ',\n                '.join(
+                '{lat: ' + y + ', lng: ' + x + '}' for x, y in self._number_pairs()
+            )
+        return self._gmap_bbox
+
+
+def ordinates_array(values):
+    """
+    :param values: an iterable of ordinates, as ints, floats or number strings
+    :return: the Ordinates for a Geometry
+    """
+    ordinates = Ordinates('d')
+    integers = array('b')
+    for value in values:
+        if isinstance(value, str):
+            try:
+                value = int(value)
+            except ValueError:
+                value = float(value)
+        ordinates.append(value)
+        integers.append(isinstance(value, int))
+    ordinates.integers = integers if any(integers) else None
+    return ordinates
@@ -0,0 +1,237 @@
+"""
+This file contains a local SQLite mirror of the Oracle Samples table
+
+The mirror holds each sample's ROW element, exactly as given by the Oracle XML API, keyed by IGSN and indexed by
+modified date. It is filled by a backfill through the paged SampleSet API and then kept up to date by syncing windows
+of modified dates. When MIRROR_ENABLED is set in the config module, Samples, the Samples Register and the OAI-PMH
+functions read from it rather than calling the API.
+
+Rows are only ever inserted or replaced: a sample deleted from the Samples table is not removed from the mirror by a
+backfill or sync, so while MIRROR_ENABLED is set it is still served, indefinitely. To drop deleted samples, remove the
+mirror's database file and backfill again.
+
+Usage:
+    python -m model.mirror backfill   # load every sample, page by page
+    python -m model.mirror sync       # load samples modified since the last backfill or sync
+"""
+import argparse
+import datetime
+import sqlite3
+import threading
+from io import BytesIO
+from lxml import etree
+import _config as conf
+from controller.oai_datestamp import fast_str2datetime
+from . import upstream
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS samples (
+        igsn TEXT PRIMARY KEY,
+        modified_date TEXT,
+        row_xml BLOB NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS samples_modified_date ON samples (modified_date, igsn);
+    CREATE TABLE IF NOT EXISTS sync_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+'''
+
+# the date format used by the Oracle XML API's date range parameters and stored in samples.modified_date
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+_local = threading.local()
+
+
+def get_connection():
+    """
+    Returns this thread's connection to the mirror database, creating the database if needed
+
+    :return: an sqlite3 Connection
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(conf.MIRROR_PATH)
+        conn.execute('PRAGMA journal_mode=WAL')  # readers are not blocked by a running sync
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+def _rowset(rows):
+    return b'<ROWSET>' + b''.join(rows) + b'</ROWSET>'
+
+
+def _date_range_clause(from_date, until_date):
+    """
+    :param from_date: optional datetime string in DATE_FORMAT
+    :param until_date: optional datetime string in DATE_FORMAT
+    :return: an SQL WHERE clause (possibly empty) and its parameters
+    """
+    if from_date is None and until_date is None:
+        return '', ()
+    return 'WHERE modified_date BETWEEN ? AND ?', (from_date or '0000', until_date or '9999')
+
+
+def get_sample_xml(igsn):
+    """
+    Returns a single sample from the mirror as XML in the form given by the XML_API_URL_SAMPLE API
+
+    :param igsn: the IGSN of the sample
+    :return: XML bytes, or None if the sample is not in the mirror
+    """
+    row = get_connection().execute('SELECT row_xml FROM samples WHERE igsn = ?', (igsn,)).fetchone()
+    if row is None:
+        return None
+    return _rowset([row[0]])
+
+
+def get_sampleset_xml(page, per_page, from_date=None, until_date=None):
+    """
+    Returns a page of samples, ordered by IGSN, in the form given by the XML_API_URL_SAMPLESET (or, if from_date &
+    until_date are given, the XML_API_URL_SAMPLESET_DATE_RANGE) API
+
+    :param page: the page number, starting at 1
+    :param per_page: the number of samples per page
+    :param from_date: optional earliest modified date, in DATE_FORMAT
+    :param until_date: optional latest modified date, in DATE_FORMAT
+    :return: XML bytes, or None if the page is empty
+    """
+    where, params = _date_range_clause(from_date, until_date)
+    rows = get_connection().execute(
+        'SELECT row_xml FROM samples {} ORDER BY igsn LIMIT ? OFFSET ?'.format(where),
+        params + (int(per_page), (max(int(page), 1) - 1) * int(per_page))
+    ).fetchall()
+    if len(rows) == 0:
+        return None
+    return _rowset(r[0] for r in rows)
+
+
+def get_count(from_date=None, until_date=None):
+    """
+    :param from_date: optional earliest modified date, in DATE_FORMAT
+    :param until_date: optional latest modified date, in DATE_FORMAT
+    :return: the number of samples in the mirror, modified within the given dates if given
+    """
+    where, params = _date_range_clause(from_date, until_date)
+    return get_connection().execute('SELECT COUNT(*) FROM samples {}'.format(where), params).fetchone()[0]
+
+
+def get_earliest_date():
+    """
+    :return: the earliest sample modified date in the mirror, as a datetime, or None if the mirror is empty
+    """
+    row = get_connection().execute('SELECT MIN(modified_date) FROM samples').fetchone()
+    if row[0] is None:
+        return None
+    return datetime.datetime.strptime(row[0], DATE_FORMAT)
+
+
+def _get_state(key):
+    row = get_connection().execute('SELECT value FROM sync_state WHERE key = ?', (key,)).fetchone()
+    return row[0] if row is not None else None
+
+
+def _set_state(key, value):
+    get_connection().execute('INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)', (key, value))
+
+
+def store_rows(xml):
+    """
+    Inserts or replaces the samples in a SampleSet API response in the mirror
+
+    :param xml: XML bytes from the SampleSet API
+    :return: the number of samples stored
+    """
+    records = []
+    for event, elem in etree.iterparse(BytesIO(xml), tag='ROW'):
+        igsn = elem.findtext('IGSN')
+        if igsn is not None:
+            modified_date = fast_str2datetime(elem.findtext('MODIFIED_DATE'), 'MODIFIED_DATE')
+            records.append((
+                igsn,
+                modified_date.strftime(DATE_FORMAT) if modified_date is not None else None,
+                etree.tostring(elem, with_tail=False)
+            ))
+        elem.clear()
+
+    conn = get_connection()
+    with conn:
+        conn.executemany('INSERT OR REPLACE INTO samples (igsn, modified_date, row_xml) VALUES (?, ?, ?)', records)
+    return len(records)
+
+
+def _load_pages(url_template, *args, first_page=1):
+    """
+    Stores successive pages from a paged SampleSet API URL until a page comes back short or empty
+
+    :param url_template: XML_API_URL_SAMPLESET or XML_API_URL_SAMPLESET_DATE_RANGE
+    :param args: any further URL template arguments, after the page number and number per page
+    :param first_page: the page to start from
+    :return: the total number of samples stored
+    """
+    per_page = conf.MIRROR_SYNC_BATCH_SIZE
+    page = first_page
+    total = 0
+    while True:
+        r = upstream.get(url_template.format(page, per_page, *args))
+        if "No data" in r.content.decode('utf-8'):
+            break
+        stored = store_rows(r.content)
+        total += stored
+        print('page {}: {} samples'.format(page, stored))
+        if stored < per_page:
+            break
+        page += 1
+    return total
+
+
+def backfill(first_page=1):
+    """
+    Loads every sample into the mirror through the paged SampleSet API
+
+    :param first_page: the page to start from, to resume an interrupted backfill
+    :return: the number of samples stored
+    """
+    started = datetime.datetime.now().strftime(DATE_FORMAT)
+    total = _load_pages(conf.XML_API_URL_SAMPLESET, first_page=first_page)
+    with get_connection():
+        _set_state('last_synced', started)
+    return total
+
+
+def sync():
+    """
+    Loads samples modified since the last backfill or sync into the mirror. Windows overlap by MIRROR_SYNC_OVERLAP
+    seconds so that no modification is missed due to clock differences with the database.
+
+    :return: the number of samples stored
+    """
+    last_synced = _get_state('last_synced')
+    if last_synced is None:
+        raise ValueError('The mirror has not been backfilled yet')
+
+    from_date = datetime.datetime.strptime(last_synced, DATE_FORMAT) - \
+        datetime.timedelta(seconds=conf.MIRROR_SYNC_OVERLAP)
+    until_date = datetime.datetime.now()
+    total = _load_pages(
+        conf.XML_API_URL_SAMPLESET_DATE_RANGE,
+        from_date.strftime(DATE_FORMAT),
+        until_date.strftime(DATE_FORMAT)
+    )
+    with get_connection():
+        _set_state('last_synced', until_date.strftime(DATE_FORMAT))
+    return total
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Maintain the local SQLite mirror of the Oracle Samples table')
+    parser.add_argument('command', choices=['backfill', 'sync'])
+    parser.add_argument('--first-page', type=int, default=1, help='the page to resume a backfill from')
+    args = parser.parse_args()
+
+    if args.command == 'backfill':
+        n = backfill(args.first_page)
+    else:
+        n = sync()
+    print('{} samples stored in {}'.format(n, conf.MIRROR_PATH))
@@ -0,0 +1,401 @@
+"""
+This file contains a writer of RDF triples straight to Turtle or N-Triples, without adding them to an rdflib Graph
+
+Samples have only a few dozen triples each so building a Graph of them, and then having rdflib's serializers analyse it,
+costs far more than writing the triples out. Formats other than Turtle & N-Triples are still serialized by rdflib.
+
+Blank nodes are labelled b0, b1, ... in the order they first appear, so the same triples are always written the same,
+byte for byte, as strong ETags need.
+
+JSON-LD is written compacted against the published, versioned, @context at JSONLD_CONTEXT_URI, which documents refer to
+rather than include.
+
+Large documents, such as Register pages, may be streamed, in Turtle, N-Triples or JSON-LD, as their triples are
+generated, with iterate(), rather than written whole.
+"""
+import json
+from rdflib import Graph, BNode, Literal, RDF, RDFS, XSD, OWL
+import _config as conf
+
+# the rdflib format names, as LDAPI.get_rdf_parser_for_mimetype() gives, this writes
+FORMATS = ('turtle', 'nt', 'json-ld')
+# the rdflib format names this streams
+STREAM_FORMATS = ('turtle', 'nt', 'json-ld')
+# the least number of characters in each chunk of a stream, bar the last
+CHUNK_SIZE = 16 * 1024
+
+_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '"': '\\"',
+    '\n': '\\n',
+    '\r': '\\r'
+})
+
+# characters that may be in a Turtle prefixed name's local part, as written here; others are written as full IRIs
+_LOCAL_NAME_CHARS = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_-')
+
+
+def _quote(lexical):
+    return '"' + lexical.translate(_ESCAPES) + '"'
+
+
+class Prefixes:
+    """
+    The prefixes of a Turtle document, with its header of @prefix statements made once, and of the Graphs of formats
+    rdflib serializes
+    """
+
+    def __init__(self, prefixes):
+        """
+        :param prefixes: a list of (prefix, namespace) tuples, as would be bound to a Graph. rdf, rdfs, owl & xsd are
+            always added.
+        """
+        prefixes = [('rdf', RDF), ('rdfs', RDFS), ('owl', OWL), ('xsd', XSD)] + list(prefixes)
+        self.namespaces = {}
+        for prefix, namespace in prefixes:
+            self.namespaces[str(namespace)] = prefix
+        self.header = ''.join(
+            '@prefix {}: <{}> .\n'.format(prefix, namespace)
+            for namespace, prefix in sorted(self.namespaces.items(), key=lambda item: item[1])
+        ) + '\n'
+
+        # the namespace bindings of a Graph with the prefixes bound, after rdflib's own, which binding each of them,
+        # with the checks Graph.bind() makes, is ten times as slow as making a Graph
+        g = Graph()
+        for prefix, namespace in prefixes:
+            g.bind(prefix, namespace)
+        self.bindings = list(g.namespaces())
+
+    def graph(self):
+        """
+        :return: a new, empty, Graph with the prefixes bound, as they would be by Graph.bind(). Each Graph has its own
+            bindings as rdflib's serializers bind prefixes of their own to them.
+        """
+        g = Graph(bind_namespaces='none')
+        bind = g.store.bind
+        for prefix, namespace in self.bindings:
+            bind(prefix, namespace)
+        return g
+
+    @classmethod
+    def from_jsonld_context(cls, path):
+        """
+        :param path: the path of a JSON-LD context document of prefixes only
+        :return: Prefixes of the context's prefixes
+        """
+        with open(path) as f:
+            return cls(json.load(f)['@context'].items())
+
+    def compact(self, iri):
+        """
+        :param iri: an IRI str
+        :return: the IRI as a prefixed name, or compact IRI, if it is in one of the namespaces, else None
+        """
+        iri = str(iri)  # not a URIRef, which would make a URIRef of each str added to it
+        i = max(iri.rfind('#'), iri.rfind('/')) + 1
+        prefix = self.namespaces.get(iri[:i])
+        local = iri[i:]
+        if prefix is not None and local and not local[0].isdigit() and local[0] != '-' and \
+                all(c in _LOCAL_NAME_CHARS for c in local):
+            return prefix + ':' + local
+        return None
+
+    def iri(self, iri):
+        """
+        :param iri: an IRI str
+        :return: the IRI as a Turtle prefixed name if it is in one of the namespaces, else as <IRI>
+        """
+        name = self.compact(iri)
+        return name if name is not None else '<' + str(iri) + '>'
+
+
+# the prefixes of the @context of JSON-LD, which refers to it by its URL
+JSONLD_CONTEXT_URI = conf.JSONLD_CONTEXT_URI
+JSONLD_PREFIXES = Prefixes.from_jsonld_context(conf.JSONLD_CONTEXT_PATH)
+
+
+class BNodeLabels:
+    """
+    The labels of a document's blank nodes: _:b0, _:b1, ... in the order they are first written. The nodes of one graph
+    of a document of many, such as a dump of every Sample, may be forgotten once it is written, so that the labels take
+    bounded memory, without their numbers being used again.
+    """
+    __slots__ = ('labels', 'count')
+
+    def __init__(self):
+        self.labels = {}
+        self.count = 0
+
+    def label(self, term):
+        """
+        :param term: an rdflib BNode
+        :return: its label
+        """
+        label = self.labels.get(term)
+        if label is None:
+            label = self.labels[term] = '_:b' + str(self.count)
+            self.count += 1
+        return label
+
+    def forget(self):
+        """
+        Forgets the nodes labelled so far, which must not be written again
+        """
+        self.labels.clear()
+
+
+def nt_term(term, labels):
+    """
+    :param term: an rdflib URIRef, BNode or Literal
+    :param labels: the document's BNodeLabels
+    :return: the term in N-Triples
+    """
+    if isinstance(term, Literal):
+        if term.language is not None:
+            return _quote(str(term)) + '@' + term.language
+        if term.datatype is not None:
+            return _quote(str(term)) + '^^<' + str(term.datatype) + '>'
+        return _quote(str(term))
+    if isinstance(term, BNode):
+        return labels.label(term)
+    return '<' + str(term) + '>'
+
+
+def turtle_term(term, prefixes, labels):
+    """
+    :param term: an rdflib URIRef, BNode or Literal
+    :param prefixes: the document's Prefixes
+    :param labels: the document's BNodeLabels
+    :return: the term in Turtle
+    """
+    if isinstance(term, Literal):
+        if term.language is not None:
+            return _quote(str(term)) + '@' + term.language
+        if term.datatype is not None:
+            return _quote(str(term)) + '^^' + prefixes.iri(term.datatype)
+        return _quote(str(term))
+    if isinstance(term, BNode):
+        return labels.label(term)
+    return prefixes.iri(term)
+
+
+def write_nt(triples):
+    """
+    :param triples: an iterable of (subject, predicate, object) rdflib term tuples
+    :return: the triples in N-Triples, each once
+    """
+    seen = set()
+    labels = BNodeLabels()
+    lines = []
+    for triple in triples:
+        if triple not in seen:
+            seen.add(triple)
+            lines.append('{} {} {} .\n'.format(
+                nt_term(triple[0], labels), nt_term(triple[1], labels), nt_term(triple[2], labels)
+            ))
+    return ''.join(lines)
+
+
+def _by_subject(triples):
+    # groups the triples by subject, in the order subjects first appear, as a dict of subject to dict of predicate to
+    # list of objects
+    subjects = {}
+    for s, p, o in triples:
+        objects = subjects.setdefault(s, {}).setdefault(p, [])
+        if o not in objects:
+            objects.append(o)
+    return subjects
+
+
+def _turtle_statement(subject, predicates, prefixes, labels):
+    statements = []
+    for p, objects in predicates.items():
+        statements.append('    {} {}'.format(
+            'a' if p == RDF.type else turtle_term(p, prefixes, labels),
+            ',\n        '.join(turtle_term(o, prefixes, labels) for o in objects)
+        ))
+    return '{}\n{} .\n\n'.format(turtle_term(subject, prefixes, labels), ' ;\n'.join(statements))
+
+
+def write_turtle(triples, prefixes):
+    """
+    :param triples: an iterable of (subject, predicate, object) rdflib term tuples
+    :param prefixes: the Prefixes to use
+    :return: the triples in Turtle, grouped by subject, in the order subjects first appear, and by predicate
+    """
+    labels = BNodeLabels()
+    out = [prefixes.header]
+    for s, predicates in _by_subject(triples).items():
+        out.append(_turtle_statement(s, predicates, prefixes, labels))
+    return ''.join(out)
+
+
+def write(triples, rdf_format, prefixes):
+    """
+    :param triples: an iterable of (subject, predicate, object) rdflib term tuples
+    :param rdf_format: one of FORMATS
+    :param prefixes: the Prefixes to use for Turtle, JSON-LD always uses the @context's
+    :return: the triples in the format, as a str
+    """
+    if rdf_format == 'turtle':
+        return write_turtle(triples, prefixes)
+    if rdf_format == 'json-ld':
+        return write_jsonld(triples)
+    return write_nt(triples)
+
+
+def _runs(triples):
+    # groups each run of triples with the same subject, as (subject, dict of predicate to list of objects) tuples
+    subject = None
+    predicates = None
+    for s, p, o in triples:
+        if predicates is None or s != subject:
+            if predicates is not None:
+                yield subject, predicates
+            subject = s
+            predicates = {}
+        objects = predicates.setdefault(p, [])
+        if o not in objects:
+            objects.append(o)
+    if predicates is not None:
+        yield subject, predicates
+
+
+def iter_turtle(triples, prefixes):
+    """
+    :param triples: an iterable of (subject, predicate, object) rdflib term tuples, with each subject's together
+    :param prefixes: the Prefixes to use
+    :return: a generator of the triples in Turtle: the prefixes' header and then a statement per subject
+    """
+    labels = BNodeLabels()
+    yield prefixes.header
+    for s, predicates in _runs(triples):
+        yield _turtle_statement(s, predicates, prefixes, labels)
+
+
+def iter_nt(triples):
+    """
+    :param triples: an iterable of (subject, predicate, object) rdflib term tuples, each given once
+    :return: a generator of the triples in N-Triples, a line per triple
+    """
+    labels = BNodeLabels()
+    for s, p, o in triples:
+        yield '{} {} {} .\n'.format(nt_term(s, labels), nt_term(p, labels), nt_term(o, labels))
+
+
+def _jsonld_iri(term, labels):
+    if isinstance(term, BNode):
+        return labels.label(term)
+    return JSONLD_PREFIXES.compact(term) or str(term)
+
+
+def _jsonld_value(term, labels):
+    if isinstance(term, Literal):
+        if term.language is not None:
+            return {'@value': str(term), '@language': term.language}
+        if term.datatype is not None:
+            return {'@value': str(term), '@type': _jsonld_iri(term.datatype, labels)}
+        return str(term)
+    return {'@id': str(term) if not isinstance(term, BNode) else labels.label(term)}
+
+
+def _jsonld_node(subject, predicates, labels):
+    node = {'@id': str(subject) if not isinstance(subject, BNode) else labels.label(subject)}
+    for p, objects in predicates.items():
+        if p == RDF.type and not any(isinstance(o, Literal) for o in objects):
+            values = [_jsonld_iri(o, labels) for o in objects]
+            node['@type'] = values[0] if len(values) == 1 else values
+        else:
+            values = [_jsonld_value(o, labels) for o in objects]
+            node[_jsonld_iri(p, labels)] = values[0] if len(values) == 1 else values
+    return json.dumps(node, ensure_ascii=False)
+
+
+def write_jsonld(triples):
+    """
+    :param triples: an iterable of (subject, predicate, object) rdflib term tuples
+    :return: the triples in JSON-LD, compacted against the @context at JSONLD_CONTEXT_URI, with a node object per
+        subject, in the order subjects first appear
+    """
+    labels = BNodeLabels()
+    return ''.join(iter_jsonld_nodes(
+        _jsonld_node(s, predicates, labels) for s, predicates in _by_subject(triples).items()
+    ))
+
+
+def iter_jsonld(triples):
+    """
+    :param triples: an iterable of (subject, predicate, object) rdflib term tuples, with each subject's together
+    :return: a generator of the triples in JSON-LD, compacted against the @context at JSONLD_CONTEXT_URI, with a node
+        object per subject
+    """
+    labels = BNodeLabels()
+    return iter_jsonld_nodes(_jsonld_node(s, predicates, labels) for s, predicates in _runs(triples))
+
+
+def iter_jsonld_nodes(nodes):
+    # a JSON-LD document, referring to the @context, of the node objects' @graph
+    yield '{"@context": ' + json.dumps(JSONLD_CONTEXT_URI) + ', "@graph": ['
+    separator = '\n'
+    for node in nodes:
+        yield separator + node
+        separator = ',\n'
+    yield '\n]}\n'
+
+
+def iterate(triples, rdf_format, prefixes):
+    """
+    :param triples: an iterable of (subject, predicate, object) rdflib term tuples, each given once and with each
+        subject's together
+    :param rdf_format: one of STREAM_FORMATS
+    :param prefixes: the Prefixes to use for Turtle, JSON-LD always uses the @context's
+    :return: a generator of the triples in the format, in chunks of at least CHUNK_SIZE characters
+    """
+    if rdf_format == 'turtle':
+        pieces = iter_turtle(triples, prefixes)
+    elif rdf_format == 'nt':
+        pieces = iter_nt(triples)
+    else:
+        pieces = iter_jsonld(triples)
+    return _chunks(pieces)
+
+
+def _chunks(pieces):
+    # joins the pieces of a document into chunks of at least CHUNK_SIZE characters, but the last
+    chunk = []
+    size = 0
+    for piece in pieces:
+        chunk.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE:
+            yield ''.join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _graph_pieces(graphs, rdf_format, prefixes):
+    labels = BNodeLabels()
+    if rdf_format == 'turtle':
+        yield prefixes.header
+    for triples in graphs:
+        if rdf_format == 'turtle':
+            for s, predicates in _by_subject(triples).items():
+                yield _turtle_statement(s, predicates, prefixes, labels)
+        else:
+            for s, p, o in dict.fromkeys(triples):
+                yield '{} {} {} .\n'.format(nt_term(s, labels), nt_term(p, labels), nt_term(o, labels))
+        labels.forget()  # no blank node is shared between graphs
+
+
+def iter_graphs(graphs, rdf_format, prefixes):
+    """
+    Writes many graphs, such as every Sample's, as one document, holding only one graph's triples at a time
+
+    :param graphs: an iterable of lists of (subject, predicate, object) rdflib term tuples, sharing no blank nodes
+    :param rdf_format: 'turtle' or 'nt'
+    :param prefixes: the Prefixes to use for Turtle
+    :return: a generator of the graphs in the format, in chunks of at least CHUNK_SIZE characters
+    """
+    return _chunks(_graph_pieces(graphs, rdf_format, prefixes))
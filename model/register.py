@@ -1,11 +1,87 @@
 from .renderer import Renderer
-from flask import Response, render_template
+from flask import Response, render_template, stream_with_context
 from rdflib import Graph, URIRef, RDF, RDFS, XSD, Namespace, Literal
 from _ldapi.__init__ import LDAPI
 from lxml import etree
-import requests
 from io import StringIO, BytesIO
 import _config as conf
+from controller.oai_datestamp import fast_str2datetime
+from . import upstream, mirror, rdf_writer
+from .cache import TTLCache
+
+REG = Namespace('http://purl.org/linked-data/registry#')
+LDP = Namespace('http://www.w3.org/ns/ldp#')
+XHV = Namespace('https://www.w3.org/1999/xhtml/vocab#')
+# the prefixes bound in the Register's RDF
+REGISTER_PREFIXES = rdf_writer.Prefixes([('reg', REG), ('ldp', LDP), ('xhv', XHV)])
+
+# the total number of samples, under the key 'total'
+COUNT_CACHE = TTLCache(1, conf.COUNT_CACHE_TTL, stale_ttl=conf.COUNT_CACHE_STALE_TTL)
+# pages of the Register, as (list of IGSNs, latest modified date) tuples, keyed by (page, per_page)
+PAGE_CACHE = TTLCache(
+    conf.REGISTER_PAGE_CACHE_MAX_ENTRIES,
+    conf.REGISTER_PAGE_CACHE_TTL,
+    stale_ttl=conf.REGISTER_PAGE_CACHE_STALE_TTL
+)
+
+
+def get_register_size():
+    """
+    Returns the total number of samples in the Samples table. The count is cached, computed once for concurrent requests
+    and refreshed in the background.
+
+    :return: an int
+    """
+    return COUNT_CACHE.get_or_compute('total', _count_samples, refresh_after=conf.COUNT_CACHE_REFRESH_AFTER)
+
+
+def get_cached_register_size():
+    """
+    :return: the total number of samples, if it is cached and fresh, else None. Nothing is fetched.
+    """
+    return COUNT_CACHE.get('total', count=False)
+
+
+def _count_samples():
+    if conf.MIRROR_ENABLED:
+        return mirror.get_count()
+
+    xml = upstream.fetch(conf.XML_API_URL_TOTAL_COUNT)
+    return int(xml.decode('utf-8').split('<RECORD_COUNT>')[1].split('</RECORD_COUNT>')[0])
+
+
+def get_page(page, per_page):
+    """
+    Returns a page of the Register from the Oracle XML API. Pages are cached, fetched once for concurrent requests and,
+    once past their TTL, given while they are fetched again in the background, so that a page seen recently is still
+    given while the API is unavailable.
+
+    :param page: the page number, starting at 1
+    :param per_page: the number of samples per page
+    :return: a (list of IGSNs, latest modified date or None) tuple, which must not be modified
+    """
+    return PAGE_CACHE.get_or_compute(
+        (page, per_page),
+        lambda: upstream.fetch(conf.XML_API_URL_SAMPLESET.format(page, per_page), _page_from_api_response)
+    )
+
+
+def _page_from_api_response(stream):
+    """
+    :param stream: binary file-like object of a response from the XML_API_URL_SAMPLESET API
+    :return: a (list of the IGSNs of the Samples in the response, latest modified date of them or None) tuple, parsed
+        as it is read
+    """
+    igsns = []
+    last_modified = None
+    for row in upstream.iter_rows(stream):
+        igsns.append(row.findtext('IGSN'))
+        modified = row.findtext('MODIFIED_DATE')
+        if modified:
+            modified = fast_str2datetime(modified, 'MODIFIED_DATE')
+            if last_modified is None or modified > last_modified:
+                last_modified = modified
+    return igsns, last_modified
 
 
 class RegisterRenderer(Renderer):
@@ -25,6 +101,7 @@ class RegisterRenderer(Renderer):
         self.prev_page = prev_page
         self.next_page = next_page
         self.last_page = last_page
+        self.last_modified = None  # the latest modified date of this page's Samples
 
         self._get_details_from_oracle_api(page, per_page)
 
@@ -32,9 +109,18 @@ class RegisterRenderer(Renderer):
         if view == 'reg':
             # is an RDF format requested?
             if mimetype in LDAPI.get_rdf_mimetypes_list():
-                # it is an RDF format so make the graph for serialization
-                self._make_reg_graph(view)
                 rdflib_format = LDAPI.get_rdf_parser_for_mimetype(mimetype)
+                if rdflib_format in rdf_writer.STREAM_FORMATS:
+                    # streamed as the triples are made, so large pages start, and take no more memory, than small
+                    return Response(
+                        stream_with_context(rdf_writer.iterate(self._reg_triples(), rdflib_format, REGISTER_PREFIXES)),
+                        status=200,
+                        mimetype=mimetype,
+                        headers=extra_headers
+                    )
+
+                # it is an RDF format rdflib serializes so make the graph for serialization
+                self._make_reg_graph(view)
                 return Response(
                     self.g.serialize(format=rdflib_format),
                     status=200,
@@ -94,69 +180,74 @@ class RegisterRenderer(Renderer):
 
     def _get_details_from_oracle_api(self, page, per_page):
         """
-        Populates this instance with data from the Oracle Samples table API
+        Populates this instance with data from the Oracle Samples table API, by way of PAGE_CACHE, or its local mirror
+        if enabled
 
         :param page: the page number of the total resultset from the Samples Set API
         :return: None
         """
-        #os.environ['NO_PROXY'] = 'ga.gov.au'
-        r = requests.get(conf.XML_API_URL_SAMPLESET.format(page, per_page), timeout=3)
-        xml = r.content
-
-        if self.validate_xml(xml):
-            self._get_details_from_file(xml_content=xml)
-            return True
+        if conf.MIRROR_ENABLED:
+            xml = mirror.get_sampleset_xml(page, per_page)
+            if xml is None:
+                return False
+            igsns, self.last_modified = _page_from_api_response(BytesIO(xml))
         else:
-            return False
+            #os.environ['NO_PROXY'] = 'ga.gov.au'
+            igsns, self.last_modified = get_page(page, per_page)
 
-    def _make_reg_graph(self, model_view):
-        self.g = Graph()
+        self.register.extend(igsns)
+        return True
 
+    def _make_reg_graph(self, model_view):
         if model_view == 'reg':  # reg is default
-            # make the static part of the graph
-            REG = Namespace('http://purl.org/linked-data/registry#')
-            self.g.bind('reg', REG)
-
-            LDP = Namespace('http://www.w3.org/ns/ldp#')
-            self.g.bind('ldp', LDP)
-
-            XHV = Namespace('https://www.w3.org/1999/xhtml/vocab#')
-            self.g.bind('xhv', XHV)
-
-            register_uri = URIRef(self.request.base_url)
-            self.g.add((register_uri, RDF.type, REG.Register))
-            self.g.add((register_uri, RDFS.label, Literal('Samples Register', datatype=XSD.string)))
-
-            page_uri_str = self.request.base_url
-            if self.per_page is not None:
-                page_uri_str += '?per_page=' + str(self.per_page)
-            else:
-                page_uri_str += '?per_page=100'
-            page_uri_str_no_page_no = page_uri_str + '&page='
-            if self.page is not None:
-                page_uri_str += '&page=' + str(self.page)
-            else:
-                page_uri_str += '&page=1'
-            page_uri = URIRef(page_uri_str)
-
-            # pagination
-            # this page
-            self.g.add((page_uri, RDF.type, LDP.Page))
-            self.g.add((page_uri, LDP.pageOf, register_uri))
-
-            # links to other pages
-            self.g.add((page_uri, XHV.first, URIRef(page_uri_str_no_page_no + '1')))
-            self.g.add((page_uri, XHV.last, URIRef(page_uri_str_no_page_no + str(self.last_page))))
-
-            if self.page != 1:
-                self.g.add((page_uri, XHV.prev, URIRef(page_uri_str_no_page_no + str(self.page - 1))))
-
-            if self.page != self.last_page:
-                self.g.add((page_uri, XHV.next, URIRef(page_uri_str_no_page_no + str(self.page + 1))))
-
-            # add all the items
-            for item in self.register:
-                item_uri = URIRef(self.request.base_url + item)
-                self.g.add((item_uri, RDF.type, URIRef(self.uri)))
-                self.g.add((item_uri, RDFS.label, Literal('Sample igsn:' + item, datatype=XSD.string)))
-                self.g.add((item_uri, REG.register, page_uri))
+            self.g = REGISTER_PREFIXES.graph()
+            for triple in self._reg_triples():
+                self.g.add(triple)
+        else:
+            self.g = Graph()
+
+    def _reg_triples(self):
+        """
+        :return: a generator of this page's triples in the 'reg' view: the Register's, the page's and then each item's,
+            with each subject's together
+        """
+        # the static part of the graph
+        register_uri = URIRef(self.request.base_url)
+        yield register_uri, RDF.type, REG.Register
+        yield register_uri, RDFS.label, Literal('Samples Register', datatype=XSD.string)
+
+        page_uri_str = self.request.base_url
+        if self.per_page is not None:
+            page_uri_str += '?per_page=' + str(self.per_page)
+        else:
+            page_uri_str += '?per_page=100'
+        page_uri_str_no_page_no = page_uri_str + '&page='
+        if self.page is not None:
+            page_uri_str += '&page=' + str(self.page)
+        else:
+            page_uri_str += '&page=1'
+        page_uri = URIRef(page_uri_str)
+
+        # pagination
+        # this page
+        yield page_uri, RDF.type, LDP.Page
+        yield page_uri, LDP.pageOf, register_uri
+
+        # links to other pages
+        yield page_uri, XHV.first, URIRef(page_uri_str_no_page_no + '1')
+        if self.last_page is not None:  # not known if the Register size wasn't got in time
+            yield page_uri, XHV.last, URIRef(page_uri_str_no_page_no + str(self.last_page))
+
+        if self.page != 1:
+            yield page_uri, XHV.prev, URIRef(page_uri_str_no_page_no + str(self.page - 1))
+
+        if self.page != self.last_page:
+            yield page_uri, XHV.next, URIRef(page_uri_str_no_page_no + str(self.page + 1))
+
+        # all the items
+        item_class = URIRef(self.uri)
+        for item in self.register:
+            item_uri = URIRef(self.request.base_url + item)
+            yield item_uri, RDF.type, item_class
+            yield item_uri, RDFS.label, Literal('Sample igsn:' + item, datatype=XSD.string)
+            yield item_uri, REG.register, page_uri
@@ -1,14 +1,398 @@
 from datetime import datetime
-from io import StringIO
-import requests
-from flask import Response, render_template
+from io import StringIO, BytesIO
+from flask import Response, render_template, request
 from lxml import etree
 from lxml import objectify
-from rdflib import Graph, URIRef, RDF, RDFS, XSD, OWL, Namespace, Literal, BNode
+from rdflib import URIRef, RDF, RDFS, XSD, OWL, Namespace, Literal, BNode
 import _config as conf
 from _ldapi.__init__ import LDAPI
 from controller.oai_datestamp import *
 from .lookups import TERM_LOOKUP
+from . import upstream, mirror, rdf_writer
+from .cache import TTLCache
+from .geometry import Geometry, ordinates_array
+
+# SampleRecords keyed by IGSN
+SAMPLE_CACHE = TTLCache(
+    conf.SAMPLE_CACHE_MAX_ENTRIES,
+    conf.SAMPLE_CACHE_TTL,
+    max_bytes=conf.SAMPLE_CACHE_MAX_BYTES,
+    stale_ttl=conf.SAMPLE_CACHE_STALE_TTL
+)
+# Samples' exports keyed by (IGSN, view, mimetype, modified date), see Sample.export()
+RENDER_CACHE = TTLCache(conf.RENDER_CACHE_MAX_ENTRIES, conf.RENDER_CACHE_TTL, max_bytes=conf.RENDER_CACHE_MAX_BYTES)
+
+PROV = Namespace('http://www.w3.org/ns/prov#')
+SKOS = Namespace('http://www.w3.org/2004/02/skos/core#')
+ADMS = Namespace('http://www.w3.org/ns/adms#')
+DCT = Namespace('http://purl.org/dc/terms/')
+SAMFL = Namespace('http://def.seegrid.csiro.au/ontology/om/sam-lite#')
+GEOSP = Namespace('http://www.opengis.net/ont/geosparql#')
+AUROLE = Namespace('http://communications.data.gov.au/def/role/')
+FOAF = Namespace('http://xmlns.com/foaf/0.1/')
+ORG = Namespace('http://www.w3.org/ns/org#')
+IGSN = Namespace('http://pid.geoscience.gov.au/def/ont/igsn#')
+SOSA = Namespace('http://www.w3.org/ns/sosa/')
+SAMP = Namespace('http://www.w3.org/ns/sosa/sampling/')
+
+# the constant terms of Samples' RDF
+GA = URIRef('http://pid.geoscience.gov.au/org/ga/geoscienceaustralia')
+IGSN_ORG = URIRef('http://igsn.org')
+EPSG_4283 = URIRef('http://spatialreference.org/ref/epsg/4283/')
+EPSG_4283_LITERAL = Literal('http://spatialreference.org/ref/epsg/4283/', datatype=XSD.anyUri)
+BOREHOLE = URIRef('http://pid.geoscience.gov.au/def/voc/featureofinteresttype/borehole')
+DCT_FORMAT = DCT['format']  # DCT.format is str.format
+PUBLIC_ACCESS = URIRef(TERM_LOOKUP['access_rights']['public'])
+SUBSAMPLE = URIRef('http://example.org/sampling/relationship/subsample')
+LITHOSPHERE = URIRef('http://registry.it.csiro.au/sandbox/csiro/oznome/feature/earth-realm/lithosphere')
+SWEET_LITHOSPHERE = URIRef('http://sweet.jpl.nasa.gov/2.3/realmGeol.owl#Lithosphere')
+
+# the prefixes bound in Samples' RDF in all views, and in particular views
+RDF_PREFIXES = [
+    ('prov', PROV),
+    ('skos', SKOS),
+    ('adms', ADMS),
+    ('dct', DCT),
+    ('samfl', SAMFL),
+    ('geosp', GEOSP),
+    ('aurole', AUROLE),
+    ('foaf', FOAF),
+    ('org', ORG)
+]
+RDF_VIEW_PREFIXES = {
+    'igsn-o': [('igsn', IGSN)],
+    'sosa': [('sosa', SOSA), ('sampling', SAMP)]
+}
+# the Prefixes, for Turtle and Graphs, by view
+VIEW_PREFIXES = dict(
+    (view, rdf_writer.Prefixes(RDF_PREFIXES + RDF_VIEW_PREFIXES.get(view, [])))
+    for view in ('igsn-o', 'dct', 'prov', 'sosa')
+)
+
+# the vis.js nodes of the PROV view's classes, as (class, label if the node has no rdfs:label, node JavaScript)
+_VISJS_NODES = [
+    (PROV.Entity, 'Entity',
+     '\t\t\t\t{id: "%(node_id)s", label: "%(label)s", shape: "ellipse", color:{background:"#FFFC87", border:"#808080"}},\n'),
+    (PROV.Activity, 'Activity',
+     '\t\t\t\t{id: "%(node_id)s", label: "%(label)s", shape: "box", color:{background:"#9FB1FC", border:"blue"}},\n'),
+    (PROV.Agent, 'Agent',
+     '\t\t\t\t{id: "%(node_id)s", label: "%(label)s", image: "/static/img/ga/agent.png", shape: "image"},\n')
+]
+_VISJS_CLASSES = [prov_class for prov_class, label, template in _VISJS_NODES]
+# the relationships drawn as vis.js edges, labelled with each predicate between their nodes
+_VISJS_RELATIONSHIPS = (PROV.wasAttributedTo, PROV.wasGeneratedBy, PROV.used, PROV.wasDerivedFrom, PROV.wasInformedBy)
+_VISJS_EDGE = '\t\t\t\t{from: "%(from)s", to: "%(to)s", arrows:"to", font: {align: "bottom"}, ' \
+              'color:{color:"black"}, label: "%(relationship)s"},\n'
+
+
+def _prov_visjs_triples(triples):
+    """
+    Simplifies PROV triples for drawing: prov:generated is inverted to prov:wasGeneratedBy, qualified attributions of
+    agents with foaf:names are simplified to prov:wasAttributedTo, with the names as the agents' rdfs:labels, and
+    foaf:Organizations & prov:Persons are classed as prov:Agents
+
+    :param triples: a list of (subject, predicate, object) rdflib term tuples
+    :return: a list of the simplified triples, each once, in the order given and then the order made
+    """
+    graph = dict.fromkeys(triple for triple in triples if triple[1] != PROV.generated)
+    for s, p, o in triples:
+        if p == PROV.generated:
+            graph[(o, PROV.wasGeneratedBy, s)] = None
+
+    objects = {}
+    for s, p, o in graph:
+        objects.setdefault((s, p), []).append(o)
+    for s, p, attribution in list(graph):
+        if p == PROV.qualifiedAttribution:
+            for agent in objects.get((attribution, PROV.agent), []):
+                for name in objects.get((agent, FOAF.name), []):
+                    graph[(s, PROV.wasAttributedTo, agent)] = None
+                    graph[(agent, RDFS.label, name)] = None
+
+    for s, p, o in list(graph):
+        if p == RDF.type and (o == FOAF.Organization or o == PROV.Person):
+            graph[(s, RDF.type, PROV.Agent)] = None
+
+    return list(graph)
+
+
+def _visjs_id(node, bnode_ids):
+    # blank nodes are numbered in the order they are drawn, so the same Sample is always drawn the same
+    if isinstance(node, BNode):
+        return bnode_ids.setdefault(node, 'b' + str(len(bnode_ids)))
+    return str(node)
+
+
+def _plain(element):
+    # the plain Python value of an lxml objectify element
+    if isinstance(element, objectify.ObjectifiedDataElement):
+        return element.pyval
+    return element.text
+
+
+def _text(element):
+    return element.text if element.text is not None else ''
+
+
+def _remark(element):
+    remark = _text(element)
+    return remark.strip() if len(remark) > 5 else None
+
+
+def _date(element):
+    date_time = fast_str2datetime(element, element.tag)
+    return date_time.date() if date_time is not None else None
+
+
+def _datetime(element):
+    return fast_str2datetime(element, element.tag)
+
+
+def _ordinates(element):
+    return ordinates_array(_plain(ordinate) for ordinate in element.iterchildren())
+
+
+def _entity_uri(element):
+    return 'http://pid.geoscience.gov.au/site/' + _text(element)
+
+
+# custodians, other than GA, by ORIGINATOR
+CUSTODIANS = {
+    'GSSA': (
+        'Geological Survey of South Australia',
+        'http://www.minerals.statedevelopment.sa.gov.au/about_us#gssa'
+    ),
+    'GSV': (
+        'Geological Survey of Victoria',
+        'http://earthresources.vic.gov.au/earth-resources/geology-of-victoria/geological-survey-of-victoria'
+    )
+}
+
+
+def _custodian_label(element):
+    return CUSTODIANS.get(_text(element), ('Geoscience Australia', None))[0]
+
+
+def _custodian_uri(element):
+    return CUSTODIANS.get(_text(element), (None, Sample.URI_GA))[1]
+
+
+def _collector(element):
+    # only samples with custodians other than GA have no collector
+    originator = _text(element)
+    return None if originator in CUSTODIANS else originator
+
+
+"""
+The ROW columns from GA's Oracle XML API that give a SampleRecord's values, as (column path, value name, converter,
+vocab type). The converter is given the column's lxml objectify element and, if None, the element's plain value is
+used. If a vocab type is given, the converted value is looked up in TERM_LOOKUP to give a vocab URI.
+
+A column may give several values. Columns not in a ROW leave their values as None.
+"""
+ROW_COLUMNS = [
+    ('IGSN', 'igsn', _text, None),
+    ('SAMPLEID', 'sample_id', None, None),
+    ('SAMPLENO', 'sample_no', None, None),
+    ('REMARK', 'remark', _remark, None),
+    ('SAMPLE_TYPE_NEW', 'sample_type', None, 'sample_type'),
+    ('SAMPLING_METHOD', 'method_type', None, 'method_type'),
+    ('SAMPLING_METHOD', 'method_type_non_uri', None, None),
+    ('MATERIAL_CLASS', 'material_type', None, 'material_type'),
+    # ('SAMPLE_MIN_LONGITUDE', 'long_min', None, None),
+    # ('SAMPLE_MAX_LONGITUDE', 'long_max', None, None),
+    # ('SAMPLE_MIN_LATITUDE', 'lat_min', None, None),
+    # ('SAMPLE_MAX_LATITUDE', 'lat_max', None, None),
+    ('GEOM/SDO_GTYPE', 'gtype', None, None),
+    ('GEOM/SDO_POINT/X', 'x', None, None),
+    ('GEOM/SDO_POINT/Y', 'y', None, None),
+    ('GEOM/SDO_POINT/Z', 'z', None, None),
+    ('GEOM/SDO_ELEM_INFO', 'elem_info', None, None),
+    ('GEOM/SDO_ORDINATES', 'ordinates', _ordinates, None),
+    ('STATEID', 'state', None, None),
+    ('COUNTRY', 'country', None, None),
+    ('TOP_DEPTH', 'depth_top', None, None),
+    ('BASE_DEPTH', 'depth_base', None, None),
+    ('STRATNAME', 'strath', None, None),
+    ('AGE', 'age', None, None),
+    ('LITHNAME', 'lith', None, 'lithology'),
+    ('ACQUIREDATE', 'date_acquired', _date, None),
+    ('MODIFIED_DATE', 'date_modified', _datetime, None),
+    ('ENO', 'entity_uri', _entity_uri, None),
+    ('ENTITYID', 'entity_name', None, None),
+    ('ENTITY_TYPE', 'entity_type', None, 'entity_type'),
+    ('HOLE_MIN_LONGITUDE', 'hole_long_min', None, None),
+    ('HOLE_MAX_LONGITUDE', 'hole_long_max', None, None),
+    ('HOLE_MIN_LATITUDE', 'hole_lat_min', None, None),
+    ('HOLE_MAX_LATITUDE', 'hole_lat_max', None, None),
+    ('ORIGINATOR', 'custodian_label', _custodian_label, None),
+    ('ORIGINATOR', 'custodian_uri', _custodian_uri, None),
+    ('ORIGINATOR', 'collector', _collector, None)
+]
+
+
+def _vocab_uri(value, vocab_type):
+    uri = TERM_LOOKUP[vocab_type].get(value)
+    return uri if uri is not None else TERM_LOOKUP[vocab_type].get('unknown')
+
+
+def _with_vocab_lookup(convert, vocab_type):
+    def to_vocab_uri(element):
+        return _vocab_uri(convert(element), vocab_type)
+    return to_vocab_uri
+
+
+def compile_columns(columns):
+    """
+    Compiles a list of columns, like ROW_COLUMNS, into a tree of dicts, keyed by column tag, that can be applied to a
+    ROW's children in a single pass
+
+    :param columns: a list of (column path, value name, converter, vocab type) tuples
+    :return: a dict of tag to either a dict, for columns with children, or a list of (value name, converter)
+    """
+    tree = {}
+    for path, name, convert, vocab_type in columns:
+        tags = path.split('/')
+        node = tree
+        for tag in tags[:-1]:
+            node = node.setdefault(tag, {})
+        convert = convert or _plain
+        if vocab_type is not None:
+            convert = _with_vocab_lookup(convert, vocab_type)
+        node.setdefault(tags[-1], []).append((name, convert))
+    return tree
+
+
+_ROW_TREE = compile_columns(ROW_COLUMNS)
+
+
+class SampleRecord:
+    """
+    The values of a Sample, as loaded from GA's Oracle XML API, converted to plain Python values (str, int, float, date,
+    datetime and, for ordinates, a float array, Ordinates) and without any of the Sample's rendering methods, other than
+    its Geometry's.
+
+    Records hold no references to the parsed XML and are small so many thousands can be held by caches, OAI-PMH pages
+    and batch exports. They are shared, by SAMPLE_CACHE, so must not be modified once made.
+    """
+    __slots__ = (
+        'igsn',
+        'sample_id',
+        'access_rights',
+        'sample_type',
+        'method_type',
+        'method_type_non_uri',
+        'material_type',
+        'long_min',
+        'long_max',
+        'lat_min',
+        'lat_max',
+        'gtype',
+        'srid',
+        'x',
+        'y',
+        'z',
+        'elem_info',
+        'ordinates',
+        'state',
+        'country',
+        'depth_top',
+        'depth_base',
+        'strath',
+        'age',
+        'remark',
+        'lith',
+        'date_acquired',
+        'entity_uri',
+        'entity_name',
+        'entity_type',
+        'hole_long_min',
+        'hole_long_max',
+        'hole_lat_min',
+        'hole_lat_max',
+        'date_modified',
+        'sample_no',
+        'custodian_uri',
+        'custodian_label',
+        'collector',
+        '_geometry'
+    )
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+        if self.custodian_uri is None:
+            self.custodian_uri = Sample.URI_GA  # default
+            self.custodian_label = 'Geoscience Australia'  # default
+
+    @classmethod
+    def from_element(cls, row):
+        """
+        Makes a record from an already parsed ROW element
+
+        :param row: an lxml objectify ROW element from GA's Oracle XML API
+        :return: a SampleRecord
+        """
+        record = cls()
+        record._populate_from_element(row)
+        return record
+
+    @classmethod
+    def from_xml(cls, xml):
+        """
+        Makes a record from an XML file.
+
+        :param xml: XML according to GA's Oracle XML API from the Samples DB
+        :return: a SampleRecord
+        """
+        try:
+            row = objectify.fromstring(xml).ROW
+        except Exception as e:
+            print(e)
+            return cls()
+
+        return cls.from_element(row)
+
+    def as_dict(self):
+        """
+        :return: a dict of this record's value names and values
+        """
+        return dict((name, getattr(self, name)) for name in self.__slots__ if not name.startswith('_'))
+
+    @property
+    def geometry(self):
+        """
+        :return: this record's Geometry, made the first time it is asked for
+        """
+        if self._geometry is None:
+            self._geometry = Geometry(self.x, self.y, self.z, self.srid, self.ordinates)
+        return self._geometry
+
+    def _populate_from_element(self, row):
+        """
+        Populates this record with data from a ROW element, in one pass over its children, according to ROW_COLUMNS
+
+        :param row: an lxml objectify ROW element from GA's Oracle XML API
+        :return: None
+        """
+        self.access_rights = _vocab_uri('public', 'access_rights')  # statically 'public' for all samples
+        self.srid = 'GDA94'  # if row.GEOM.SDO_SRID == '8311' else row.GEOM.SDO_SRID
+        self._apply_columns(row, _ROW_TREE)
+
+    def _apply_columns(self, element, columns):
+        for child in element.iterchildren():
+            column = columns.get(child.tag)
+            if column is None:
+                continue
+            if isinstance(column, dict):
+                self._apply_columns(child, column)
+                continue
+            for name, convert in column:
+                # a bad value only loses its own value, not those of the rest of the ROW
+                try:
+                    setattr(self, name, convert(child))
+                except Exception as e:
+                    print('{} {}: {}'.format(self.igsn, child.tag, e))
 
 
 class Sample:
@@ -40,91 +424,146 @@ class Sample:
     """
 
     URI_MISSSING = 'http://www.opengis.net/def/nil/OGC/0/missing'
-    URI_GA = 'http://pid.geoscience.gov.au/org/ga/geoscienceaustralia'
-
-    def __init__(self, igsn, xml=None):
-        self.igsn = igsn
-        self.sample_id = None
-        self.access_rights = None
-        self.sample_type = None
-        self.method_type = None
-        self.material_type = None
-        self.long_min = None
-        self.long_max = None
-        self.lat_min = None
-        self.lat_max = None
-        self.gtype = None
-        self.srid = None
-        self.x = None
-        self.y = None
-        self.z = None
-        self.elem_info = None
-        self.ordinates = None
-        self.state = None
-        self.country = None
-        self.depth_top = None
-        self.depth_base = None
-        self.strath = None
-        self.age = None
-        self.remark = None
-        self.lith = None
-        self.date_acquired = None
-        self.entity_uri = None
-        self.entity_name = None
-        self.entity_type = None
-        self.hole_long_min = None
-        self.hole_long_max = None
-        self.hole_lat_min = None
-        self.hole_lat_max = None
-        self.date_modified = None
-        self.sample_no = None
-        self.custodian_uri = self.URI_GA  # default
-        self.custodian_label = 'Geoscience Australia'  # default
-        self.collector = None
-
-        if xml is not None:  # even if there are values for Oracle API URI and IGSN, load from XML file if present
-            self._populate_from_xml_file(xml)
+    URI_GA = str(GA)
+
+    def __init__(self, igsn, xml=None, use_cache=True, element=None, record=None):
+        if record is not None:
+            self.record = record
+        elif element is not None:  # an already parsed ROW
+            self.record = SampleRecord.from_element(element)
+        elif xml is not None:  # even if there are values for Oracle API URI and IGSN, load from XML file if present
+            self.record = SampleRecord.from_xml(xml)
         else:
-            self._populate_from_oracle_api()
+            self.record = SampleRecord(igsn=igsn)
+            self._populate_from_oracle_api(use_cache=use_cache)
 
-    def render(self, view, mimetype):
+    def __getattr__(self, name):
+        # a Sample's values are held in its SampleRecord
+        if name == 'record':
+            raise AttributeError(name)
+        return getattr(self.record, name)
+
+    @classmethod
+    def from_element(cls, row):
+        """
+        Makes a Sample from an already parsed ROW element, such as one from upstream.iter_rows(), without serialising
+        and re-parsing it. The Sample holds plain Python values so the ROW may be cleared, or discarded, afterwards.
+
+        :param row: an lxml objectify ROW element from GA's Oracle XML API
+        :return: a Sample
+        """
+        return cls(None, element=row)
+
+    def render(self, view, mimetype, use_cache=True):
+        """
+        :param view: the model view to render this Sample in
+        :param mimetype: the format to render it in
+        :param use_cache: if False, the view is rendered again, rather than taken from RENDER_CACHE, and re-cached
+        :return: HTTP Response
+        """
         # if self.sample_no is None:
         #     return Response('Sample with IGSN {} not found.'.format(self.igsn), status=404, mimetype='text/plain')
 
         if view == 'igsn-o':
             if mimetype == 'text/html':
-                return self.export_html(model_view=view)
+                return Response(self.export(view, mimetype, use_cache), headers=self._make_pingback_headers())
             else:
-                return Response(self.export_rdf(view, mimetype), mimetype=mimetype)
+                return Response(self.export(view, mimetype, use_cache), mimetype=mimetype)
         elif view == 'dct':
             if mimetype == 'text/html':
-                return self.export_html(model_view=view)
-            elif mimetype == 'text/xml':
-                return Response(self.export_dct_xml(), mimetype=mimetype)
+                return Response(self.export(view, mimetype, use_cache), headers=self._make_pingback_headers())
             else:
-                return Response(self.export_rdf(view, mimetype), mimetype=mimetype)
-        elif view == 'igsn':  # only XML for this view
+                return Response(self.export(view, mimetype, use_cache), mimetype=mimetype)
+        elif view in ['igsn', 'igsn-r1', 'csirov3']:  # only XML for these views
             return Response(
-                '<?xml version="1.0" encoding="utf-8"?>\n' + self.export_igsn_xml(),
-                mimetype='text/xml'
-            )
-        elif view == 'igsn-r1':  # only XML for this view
-            return Response(
-                '<?xml version="1.0" encoding="utf-8"?>\n' + self.export_igsn_r1_xml(),
-                mimetype='text/xml'
-            )
-        elif view == 'csirov3':  # only XML for this view
-            return Response(
-                '<?xml version="1.0" encoding="utf-8"?>\n' + self.export_csirov3_xml(),
+                '<?xml version="1.0" encoding="utf-8"?>\n' + self.export(view, 'text/xml', use_cache),
                 mimetype='text/xml'
             )
         elif view == 'prov':
             if mimetype == 'text/html':
-                return self.export_html(model_view=view)
+                return Response(self.export(view, mimetype, use_cache), headers=self._make_pingback_headers())
             else:
-                return Response(self.export_rdf(view, mimetype), mimetype=mimetype)
+                return Response(self.export(view, mimetype, use_cache), mimetype=mimetype)
         elif view == 'sosa':  # RDF only for this view
-            return Response(self.export_rdf(view, mimetype), mimetype=mimetype)
+            return Response(self.export(view, mimetype, use_cache), mimetype=mimetype)
+
+    def export(self, view, mimetype, use_cache=True):
+        """
+        Exports this Sample in a view & format, as render() gives it but without an XML declaration, from RENDER_CACHE
+        if it has been exported in that view & format since it was last modified. OAI-PMH records are the 'igsn',
+        'igsn-r1', 'csirov3' and 'dct' views in text/xml.
+
+        :param view: the model view to export this Sample in
+        :param mimetype: the format to export it in
+        :param use_cache: if False, the export is made again, rather than taken from RENDER_CACHE, and re-cached
+        :return: the export, as a string
+        """
+        key = self.export_key(view, mimetype)
+        if use_cache:
+            return RENDER_CACHE.get_or_compute(key, lambda: self._export(view, mimetype))
+
+        export = self._export(view, mimetype)
+        RENDER_CACHE.set(key, export)
+        return export
+
+    def export_key(self, view, mimetype):
+        """
+        :param view: the model view to export this Sample in
+        :param mimetype: the format to export it in
+        :return: the export's key in RENDER_CACHE, as a tuple: the same key always gives the same export, so it is also
+            what render()'s ETags are made from
+        """
+        if view in ['igsn', 'igsn-r1', 'csirov3']:
+            mimetype = 'text/xml'  # as render() exports them
+        key = (self.igsn, view, mimetype, self.date_modified)
+        if mimetype == 'text/html':
+            # HTML citations give the date they were accessed and its links are to the host, and the mount point, the
+            # page was requested through
+            key += (datetime.date.today(), request.host_url, request.script_root)
+        return key
+
+    def export_is_stable(self, view, mimetype):
+        """
+        :param view: the model view to export this Sample in
+        :param mimetype: the format to export it in
+        :return: True if exports with the same export_key() are the same byte for byte, so may have strong ETags. RDF
+            serialized by rdflib labels blank nodes afresh each time so is only equivalent. HTML is rendered from
+            templates that may read more of the request than export_key() covers.
+        """
+        if mimetype == 'text/html':
+            return False
+        if view in ['igsn', 'igsn-r1', 'csirov3'] or (view == 'dct' and mimetype == 'text/xml'):
+            return True
+        return LDAPI.get_rdf_parser_for_mimetype(mimetype) in rdf_writer.FORMATS
+
+    def export_last_modified(self, view, mimetype):
+        """
+        :param view: the model view to export this Sample in
+        :param mimetype: the format to export it in
+        :return: the naive UTC datetime the export last changed, or None if not known: when this Sample was last
+            modified or, for HTML, whose citations give the date they were accessed, the start of today if that is later
+        """
+        if mimetype != 'text/html':
+            return self.date_modified
+        today = datetime.datetime.combine(datetime.date.today(), datetime.time()) \
+            .astimezone().astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        if self.date_modified is None or self.date_modified < today:
+            return today
+        return self.date_modified
+
+    def _export(self, view, mimetype):
+        if view in ['igsn-o', 'dct', 'prov'] and mimetype == 'text/html':
+            return self._export_html_page(model_view=view)
+        elif view == 'dct' and mimetype == 'text/xml':
+            return self.export_dct_xml()
+        elif view == 'igsn':
+            return self.export_igsn_xml()
+        elif view == 'igsn-r1':
+            return self.export_igsn_r1_xml()
+        elif view == 'csirov3':
+            return self.export_csirov3_xml()
+        else:
+            return self.export_rdf(view, mimetype)
 
     def validate_xml(self, xml):
         parser = etree.XMLParser(dtd_validation=False)
@@ -136,129 +575,54 @@ class Sample:
             print('not valid xml')
             return False
 
-    def _populate_from_oracle_api(self):
+    def _populate_from_oracle_api(self, use_cache=True):
         """
-        Populates this instance with data from the Oracle Samples table API
+        Populates this instance with data from the Oracle Samples table API (or its local mirror, if enabled), or from
+        SAMPLE_CACHE if this IGSN has been loaded recently. A cached Sample past its TTL, but within its stale TTL, is
+        used while it is reloaded in the background.
 
-        :param oracle_api_samples_url: the Oracle XML API URL string for a single sample
-        :param igsn: the IGSN of the sample desired
+        :param use_cache: if False, SAMPLE_CACHE is bypassed and the Sample is reloaded from the API (and re-cached)
         :return: None
         """
+        igsn = self.igsn
+        if use_cache:
+            self.record = SAMPLE_CACHE.get_or_compute(igsn, lambda: Sample._load_record(igsn))
+        else:
+            self.record = Sample._load_record(igsn)
+            SAMPLE_CACHE.set(igsn, self.record)
+        return True
+
+    @staticmethod
+    def _load_record(igsn):
+        """
+        Loads a Sample's values from the Oracle Samples table API, or its local mirror if enabled
+
+        :param igsn: the IGSN of the sample
+        :return: a SampleRecord
+        """
         # internal URI
         # os.environ['NO_PROXY'] = 'ga.gov.au'
         # call API
-        r = requests.get(conf.XML_API_URL_SAMPLE.format(self.igsn))
-        if "No data" in r.content.decode('utf-8'):
-            raise ParameterError('No Data')
-
-        if self.validate_xml(r.content):
-            self._populate_from_xml_file(r.content)
-            return True
+        if conf.MIRROR_ENABLED:
+            xml = mirror.get_sample_xml(igsn)
+            if xml is None:
+                raise ParameterError('No Data')
+            return Sample._record_from_api_response(BytesIO(xml))
         else:
-            return False
+            # concurrent requests for the same sample share the one API call and parse
+            return upstream.fetch(conf.XML_API_URL_SAMPLE.format(igsn), Sample._record_from_api_response)
 
-    def _populate_from_xml_file(self, xml):
+    @staticmethod
+    def _record_from_api_response(stream):
         """
-        Populates this instance with data from an XML file.
+        Parses a response from the XML_API_URL_SAMPLE API, in a single pass as it is read, into a Sample's values
 
-        :param xml: XML according to GA's Oracle XML API from the Samples DB
-        :return: None
+        :param stream: binary file-like object of the response XML
+        :return: a SampleRecord
         """
-        try:
-            root = objectify.fromstring(xml)
-
-            self.igsn = str(root.ROW.IGSN)
-            if hasattr(root.ROW, 'SAMPLEID'):
-                self.sample_id = root.ROW.SAMPLEID
-            self.sample_no = root.ROW.SAMPLENO if hasattr(root.ROW, 'SAMPLENO') else None
-            self.access_rights = self._make_vocab_uri('public', 'access_rights')  # statically 'public' for all samples
-            if hasattr(root.ROW, 'REMARK'):
-                self.remark = str(root.ROW.REMARK).strip() if len(str(root.ROW.REMARK)) > 5 else None
-            if hasattr(root.ROW, 'SAMPLE_TYPE_NEW'):
-                self.sample_type = self._make_vocab_uri(root.ROW.SAMPLE_TYPE_NEW, 'sample_type')
-            if hasattr(root.ROW, 'SAMPLING_METHOD'):
-                self.method_type = self._make_vocab_uri(root.ROW.SAMPLING_METHOD, 'method_type')
-                self.method_type_non_uri = root.ROW.SAMPLING_METHOD
-            if hasattr(root.ROW, 'MATERIAL_CLASS'):
-                self.material_type = self._make_vocab_uri(root.ROW.MATERIAL_CLASS, 'material_type')
-            # self.long_min = root.ROW.SAMPLE_MIN_LONGITUDE
-            # self.long_max = root.ROW.SAMPLE_MAX_LONGITUDE
-            # self.lat_min = root.ROW.SAMPLE_MIN_LATITUDE
-            # self.lat_max = root.ROW.SAMPLE_MAX_LATITUDE
-            if hasattr(root.ROW, 'SDO_GTYPE'):
-                self.gtype = root.ROW.GEOM.SDO_GTYPE
-
-            self.srid = 'GDA94'  # if root.ROW.GEOM.SDO_SRID == '8311' else root.ROW.GEOM.SDO_SRID
-
-            if hasattr(root.ROW, 'GEOM'):
-                if hasattr(root.ROW.GEOM, 'SDO_POINT'):
-                    if hasattr(root.ROW.GEOM.SDO_POINT, 'X'):
-                        self.x = root.ROW.GEOM.SDO_POINT.X
-                    if hasattr(root.ROW.GEOM.SDO_POINT, 'Y'):
-                        self.y = root.ROW.GEOM.SDO_POINT.Y
-                    if hasattr(root.ROW.GEOM.SDO_POINT, 'Z'):
-                        self.z = root.ROW.GEOM.SDO_POINT.Z
-                if hasattr(root.ROW.GEOM, 'SDO_ELEM_INFO'):
-                    self.elem_info = root.ROW.GEOM.SDO_ELEM_INFO
-                if hasattr(root.ROW.GEOM, 'SDO_ORDINATES'):
-                    self.ordinates = root.ROW.GEOM.SDO_ORDINATES.getchildren()
-                    # calculate centroid values to centre a map
-                    self.centroid_lat = round(sum(self.ordinates[1:-2:2])/len(self.ordinates[:-2:2]), 2)
-                    self.centroid_lon = round(sum(self.ordinates[:-2:2])/len(self.ordinates[1:-2:2]), 2)
-                    # self.ordinates = zip(*[iter(raw_ordinates)]*2)
-            if hasattr(root.ROW, 'STATEID'):
-                self.state = root.ROW.STATEID  # self._make_vocab_uri(root.ROW.STATEID, 'state')
-            if hasattr(root.ROW, 'COUNTRY'):
-                self.country = root.ROW.COUNTRY
-            if hasattr(root.ROW, 'TOP_DEPTH'):
-                self.depth_top = root.ROW.TOP_DEPTH
-            if hasattr(root.ROW, 'BASE_DEPTH'):
-                self.depth_base = root.ROW.BASE_DEPTH
-            if hasattr(root.ROW, 'STRATNAME'):
-                self.strath = root.ROW.STRATNAME
-            if hasattr(root.ROW, 'AGE'):
-                self.age = root.ROW.AGE
-            if hasattr(root.ROW, 'LITHNAME'):
-                self.lith = self._make_vocab_uri(root.ROW.LITHNAME, 'lithology')
-            if hasattr(root.ROW, 'ACQUIREDATE'):
-                self.date_acquired = str2datetime(root.ROW.ACQUIREDATE).date()
-            if hasattr(root.ROW, 'MODIFIED_DATE'):
-                self.date_modified = str2datetime(root.ROW.MODIFIED_DATE)
-            if hasattr(root.ROW, 'ENO'):
-                self.entity_uri = 'http://pid.geoscience.gov.au/site/' + str(root.ROW.ENO)
-            if hasattr(root.ROW, 'ENTITYID'):
-                self.entity_name = root.ROW.ENTITYID
-            if hasattr(root.ROW, 'ENTITYID'):
-                self.entity_type = self._make_vocab_uri(root.ROW.ENTITY_TYPE, 'entity_type')
-            if hasattr(root.ROW, 'HOLE_MIN_LONGITUDE'):
-                self.hole_long_min = root.ROW.HOLE_MIN_LONGITUDE
-            if hasattr(root.ROW, 'HOLE_MAX_LONGITUDE'):
-                self.hole_long_max = root.ROW.HOLE_MAX_LONGITUDE
-            if hasattr(root.ROW, 'HOLE_MIN_LATITUDE'):
-                self.hole_lat_min = root.ROW.HOLE_MIN_LATITUDE
-            if hasattr(root.ROW, 'HOLE_MAX_LATITUDE'):
-                self.hole_lat_max = root.ROW.HOLE_MAX_LATITUDE
-            if hasattr(root.ROW, 'ORIGINATOR'):
-                if str(root.ROW.ORIGINATOR) == 'GSSA':
-                    self.custodian_label = 'Geological Survey of South Australia'
-                    self.custodian_uri = 'http://www.minerals.statedevelopment.sa.gov.au/about_us#gssa'
-                elif str(root.ROW.ORIGINATOR) == 'GSV':
-                    self.custodian_label = 'Geological Survey of Victoria'
-                    self.custodian_uri = 'http://earthresources.vic.gov.au/earth-resources/geology-of-victoria/' \
-                                         'geological-survey-of-victoria'
-                else:
-                    # custodian_uri & custodian_label set to GA by default
-                    self.collector = str(root.ROW.ORIGINATOR)
-        except Exception as e:
-            print(e)
-
-        return True
-
-    def _make_vocab_uri(self, xml_value, vocab_type):
-        if TERM_LOOKUP[vocab_type].get(xml_value) is not None:
-            return TERM_LOOKUP[vocab_type].get(xml_value)
-        else:
-            return TERM_LOOKUP[vocab_type].get('unknown')
+        for row in upstream.iter_rows(stream, objectified=True):
+            return SampleRecord.from_element(row)
+        raise ParameterError('No Data')
 
     def _make_vocab_alink(self, vocab_uri):
         if vocab_uri is not None:
@@ -268,43 +632,13 @@ class Sample:
                 return '<a href="{}">{}</a>'.format(vocab_uri, vocab_uri.split('/')[-1])
 
     def _generate_sample_wkt(self):
-        if self.z is not None:
-            return '<http://www.opengis.net/def/crs/EPSG/0/4283> POINTZ({} {} {})'.format(self.x, self.y, self.z)
-        elif self.srid is not None and self.x is not None and self.y is not None:
-            return '<http://www.opengis.net/def/crs/EPSG/0/4283> POINT({} {})'.format(self.x, self.y)
-        elif self.ordinates is not None:
-            s = []
-            for x, y in zip(*[iter(self.ordinates)] * 2):
-                s.append(str(x) + ' ' + str(y))
-            return '<http://www.opengis.net/def/crs/EPSG/0/4283> POLYGON(({}))'.format(
-                ', '.join(s)
-            )
-        else:
-            return ''
+        return self.geometry.wkt()
 
     def _generate_sample_gmap_bbox(self):
-        if self.ordinates is not None:
-            s = []
-            for x, y in zip(*[iter(self.ordinates)] * 2):
-                s.append('{lat: ' + str(y) + ', lng: ' + str(x) + '}')
-            return ',\n                '.join(s)
-        else:
-            return None
+        return self.geometry.gmap_bbox()
 
     def _generate_sample_gml(self):
-        if self.z is not None:
-            gml = '<gml:Point srsDimension="3" srsName="https://epsg.io/{}">' \
-                  '<gml:pos>{} {} {}</gml:pos>' \
-                  '</gml:Point>'.format(self.srid, self.x, self.y, self.z)
-        else:
-            if self.srid is not None and self.x is not None and self.y is not None:
-                gml = '<gml:Point srsDimension="2" srsName="https://epsg.io/{}">' \
-                      '<gml:pos>{} {}</gml:pos>' \
-                      '</gml:Point>'.format(self.srid, self.x, self.y)
-            else:
-                gml = ''
-
-        return gml
+        return self.geometry.gml()
 
     def _generate_parent_wkt(self):
         if self.hole_long_min is not None and self.hole_long_max is not None:
@@ -360,122 +694,6 @@ class Sample:
     def _generate_google_maps_coords(self):
         return '{},{}'.format(self.y, self.x)
 
-    def __graph_preconstruct(self, g):
-        u = '''
-            PREFIX prov: <http://www.w3.org/ns/prov#>
-            DELETE {
-                ?a prov:generated ?e .
-            }
-            INSERT {
-                ?e prov:wasGeneratedBy ?a .
-            }
-            WHERE {
-                ?a prov:generated ?e .
-            }
-        '''
-        g.update(u)
-
-        # simplifying qualified relationships
-        u = '''
-            PREFIX prov: <http://www.w3.org/ns/prov#>
-            PREFIX foaf: <http://xmlns.com/foaf/0.1/>
-            INSERT {
-                ?e prov:wasAttributedTo ?a .
-                ?a rdfs:label ?n .
-            }
-            WHERE {
-                ?e prov:qualifiedAttribution/prov:agent ?a .
-                ?a foaf:name ?n .
-            }
-        '''
-        g.update(u)
-
-        # up classing all prov:Person & org:Org as prov:Agent
-        u = '''
-            PREFIX prov: <http://www.w3.org/ns/prov#>
-            PREFIX foaf: <http://xmlns.com/foaf/0.1/>
-            INSERT {
-                ?a a prov:Agent
-            }
-            WHERE {
-                {?a a foaf:Organization}
-                UNION
-                {?a a prov:Person}
-            }
-        '''
-        g.update(u)
-
-        return g
-
-    def __gen_visjs_nodes(self, g):
-        nodes = ''
-
-        q = '''
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            PREFIX prov: <http://www.w3.org/ns/prov#>
-            SELECT *
-            WHERE {
-                ?s a ?o .
-                {?s a prov:Entity .}
-                UNION
-                {?s a prov:Activity .}
-                UNION
-                {?s a prov:Agent .}
-                OPTIONAL {?s rdfs:label ?label .}
-            }
-            '''
-        for row in g.query(q):
-            if str(row['o']) == 'http://www.w3.org/ns/prov#Entity':
-                if row['label'] is not None:
-                    label = row['label']
-                else:
-                    label = 'Entity'
-                nodes += '\t\t\t\t{id: "%(node_id)s", label: "%(label)s", shape: "ellipse", color:{background:"#FFFC87", border:"#808080"}},\n' % {
-                    'node_id': row['s'],
-                    'label': label
-                }
-            elif str(row['o']) == 'http://www.w3.org/ns/prov#Activity':
-                if row['label'] is not None:
-                    label = row['label']
-                else:
-                    label = 'Activity'
-                nodes += '\t\t\t\t{id: "%(node_id)s", label: "%(label)s", shape: "box", color:{background:"#9FB1FC", border:"blue"}},\n' % {
-                    'node_id': row['s'],
-                    'label': label
-                }
-            elif str(row['o']) == 'http://www.w3.org/ns/prov#Agent':
-                if row['label'] is not None:
-                    label = row['label']
-                else:
-                    label = 'Agent'
-                nodes += '\t\t\t\t{id: "%(node_id)s", label: "%(label)s", image: "/static/img/ga/agent.png", shape: "image"},\n' % {
-                    'node_id': row['s'],
-                    'label': label
-                }
-
-        return nodes
-
-    def __gen_visjs_edges(self, g):
-        edges = ''
-
-        q = '''
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            PREFIX prov: <http://www.w3.org/ns/prov#>
-            SELECT *
-            WHERE {
-                ?s ?p ?o .
-                ?s prov:wasAttributedTo|prov:wasGeneratedBy|prov:used|prov:wasDerivedFrom|prov:wasInformedBy ?o .
-            }
-            '''
-        for row in g.query(q):
-            edges += '\t\t\t\t{from: "%(from)s", to: "%(to)s", arrows:"to", font: {align: "bottom"}, color:{color:"black"}, label: "%(relationship)s"},\n' % {
-                'from': row['s'],
-                'to': row['o'],
-                'relationship': str(row['p']).split('#')[1]
-            }
-
-        return edges
-
     def _make_citation(self):
         return '{} {}"Sample {}". A digital catalogue record of ' \
                'a physical sample managed by {}. Accessed {}. <a href="{}">igsn:{}</a>'\
@@ -489,15 +707,44 @@ class Sample:
                 self.igsn
             )
 
-    def _make_vsjs(self, g):
-        g = self.__graph_preconstruct(g)
+    def _make_vsjs(self, triples):
+        """
+        :param triples: this Sample's triples in the PROV view
+        :return: the JavaScript of the vis.js network of this Sample's provenance
+        """
+        triples = _prov_visjs_triples(triples)
+        types = {}
+        labels = {}
+        predicates = {}
+        for s, p, o in triples:
+            if p == RDF.type:
+                types.setdefault(s, []).append(o)
+            elif p == RDFS.label:
+                labels.setdefault(s, []).append(o)
+            predicates.setdefault((s, o), []).append(p)
+        ids = {}
 
         nodes = 'var nodes = new vis.DataSet([\n'
-        nodes += self.__gen_visjs_nodes(g)
+        for node, classes in types.items():
+            # a row per PROV class the node has, per type of the node that is a PROV class, per label
+            for prov_class in _VISJS_CLASSES:
+                if prov_class in classes:
+                    for node_class, default_label, template in _VISJS_NODES:
+                        if node_class in classes:
+                            for label in labels.get(node, [default_label]):
+                                nodes += template % {'node_id': _visjs_id(node, ids), 'label': label}
         nodes = nodes.rstrip().rstrip(',') + '\n\t\t\t]);\n'
 
         edges = 'var edges = new vis.DataSet([\n'
-        edges += self.__gen_visjs_edges(g)
+        for s, relationship, o in triples:
+            if relationship in _VISJS_RELATIONSHIPS:
+                # a row per predicate between the nodes, per relationship between them
+                for p in predicates[(s, o)]:
+                    edges += _VISJS_EDGE % {
+                        'from': _visjs_id(s, ids),
+                        'to': _visjs_id(o, ids),
+                        'relationship': str(p).split('#')[1]
+                    }
         edges = edges.rstrip().rstrip(',') + '\n\t\t\t]);\n'
 
         visjs = '''
@@ -521,7 +768,7 @@ class Sample:
     def export_rdf(self, model_view='igsn-o', rdf_mime='text/turtle'):
         """
         Exports this instance in RDF, according to a given model from the list of supported models,
-        in a given rdflib RDF format
+        in a given rdflib RDF format. Turtle & N-Triples are written directly, others are serialized by rdflib.
 
         :param model_view: string of one of the model view names available for Sample objects ['igsn', 'dct', '',
             'default']
@@ -529,37 +776,33 @@ class Sample:
             'trix', 'turtle', 'xml'], from http://rdflib3.readthedocs.io/en/latest/plugin_serializers.html
         :return: RDF string
         """
+        rdf_format = LDAPI.get_rdf_parser_for_mimetype(rdf_mime)
+        triples = self._rdf_triples(model_view)
+        if rdf_format in rdf_writer.FORMATS:
+            return rdf_writer.write(triples, rdf_format, VIEW_PREFIXES.get(model_view, VIEW_PREFIXES['dct']))
 
-        # things that are applicable to all model views; the graph and some namespaces
-        g = Graph()
+        g = VIEW_PREFIXES.get(model_view, VIEW_PREFIXES['dct']).graph()
+        for triple in triples:
+            g.add(triple)
+        return g.serialize(format=rdf_format)
+
+    def _rdf_triples(self, model_view):
+        """
+        :param model_view: string of one of the model view names available for Sample objects in RDF
+        :return: a list of this instance's (subject, predicate, object) triples, as rdflib terms, in that view
+        """
+        triples = []
+        add = triples.append
 
         # URI for this sample
         this_sample = URIRef(conf.REGISTER_BASE_URI + self.igsn)
-        g.add((this_sample, RDFS.label, Literal('Sample igsn:' + self.igsn, datatype=XSD.string)))
+        add((this_sample, RDFS.label, Literal('Sample igsn:' + self.igsn, datatype=XSD.string)))
 
         # define GA
-        ga = URIRef(Sample.URI_GA)
+        ga = GA
 
         # pingback endpoint
-        PROV = Namespace('http://www.w3.org/ns/prov#')
-        g.bind('prov', PROV)
-        g.add((this_sample, PROV.pingback, URIRef(conf.REGISTER_BASE_URI + self.igsn + '/pingback')))
-        SKOS = Namespace('http://www.w3.org/2004/02/skos/core#')
-        g.bind('skos', SKOS)
-        ADMS = Namespace('http://www.w3.org/ns/adms#')
-        g.bind('adms', ADMS)
-        DCT = Namespace('http://purl.org/dc/terms/')
-        g.bind('dct', DCT)
-        SAMFL = Namespace('http://def.seegrid.csiro.au/ontology/om/sam-lite#')
-        g.bind('samfl', SAMFL)
-        GEOSP = Namespace('http://www.opengis.net/ont/geosparql#')
-        g.bind('geosp', GEOSP)
-        AUROLE = Namespace('http://communications.data.gov.au/def/role/')
-        g.bind('aurole', AUROLE)
-        FOAF = Namespace('http://xmlns.com/foaf/0.1/')
-        g.bind('foaf', FOAF)
-        ORG = Namespace('http://www.w3.org/ns/org#')
-        g.bind('org', ORG)
+        add((this_sample, PROV.pingback, URIRef(conf.REGISTER_BASE_URI + self.igsn + '/pingback')))
 
         # sample location in GML & WKT, formulation from GeoSPARQL
         wkt = Literal(self._generate_sample_wkt(), datatype=GEOSP.wktLiteral)
@@ -568,258 +811,244 @@ class Sample:
         # select model view
         if model_view == 'igsn-o':
             # default model is the IGSN model
-            # IGSN model required namespaces
-            IGSN = Namespace('http://pid.geoscience.gov.au/def/ont/igsn#')
-            g.bind('igsn', IGSN)
-
             # classing the sample
-            g.add((this_sample, RDF.type, SAMFL.Specimen))
+            add((this_sample, RDF.type, SAMFL.Specimen))
 
             # AlternateIdentifier
             alternate_identifier = BNode()
-            g.add((alternate_identifier, RDF.type, ADMS.Identifier))
-            g.add((alternate_identifier, SKOS.notation, Literal(self.igsn, datatype=XSD.string)))
-            g.add((alternate_identifier, ADMS.schemeAgency, URIRef('http://igsn.org')))
+            add((alternate_identifier, RDF.type, ADMS.Identifier))
+            add((alternate_identifier, SKOS.notation, Literal(self.igsn, datatype=XSD.string)))
+            add((alternate_identifier, ADMS.schemeAgency, IGSN_ORG))
             # TODO: add in a schema identifier, as per ADMS documentation
-            g.add((this_sample, DCT.identifier, alternate_identifier))
+            add((this_sample, DCT.identifier, alternate_identifier))
 
             # Geometry
             geometry = BNode()
-            g.add((this_sample, SAMFL.samplingLocation, geometry))
-            g.add((geometry, RDF.type, SAMFL.Point))
-            g.add((geometry, GEOSP.asGML, gml))
-            g.add((geometry, GEOSP.asWKT, wkt))
+            add((this_sample, SAMFL.samplingLocation, geometry))
+            add((geometry, RDF.type, SAMFL.Point))
+            add((geometry, GEOSP.asGML, gml))
+            add((geometry, GEOSP.asWKT, wkt))
 
             # Elevation
             elevation = BNode()
-            g.add((this_sample, SAMFL.samplingElevation, elevation))
-            g.add((elevation, RDF.type, SAMFL.Elevation))
+            add((this_sample, SAMFL.samplingElevation, elevation))
+            add((elevation, RDF.type, SAMFL.Elevation))
             if self.z is None:
                 z = 'NaN'
             else:
                 z = self.z
-            g.add((elevation, SAMFL.elevation, Literal(z, datatype=XSD.float)))
-            g.add((elevation, SAMFL.verticalDatum, URIRef('http://spatialreference.org/ref/epsg/4283/')))
+            add((elevation, SAMFL.elevation, Literal(z, datatype=XSD.float)))
+            add((elevation, SAMFL.verticalDatum, EPSG_4283))
 
             # properties
-            g.add((this_sample, SAMFL.currentLocation, Literal('GA Services building', datatype=XSD.string)))
+            add((this_sample, SAMFL.currentLocation, Literal('GA Services building', datatype=XSD.string)))
 
             if self.material_type is not None:
-                g.add((this_sample, SAMFL.materialClass, URIRef(self.material_type)))
+                add((this_sample, SAMFL.materialClass, URIRef(self.material_type)))
             if self.method_type != 'http://www.opengis.net/def/nil/OGC/0/missing':
-                g.add((this_sample, SAMFL.samplingMethod, URIRef(self.method_type)))
+                add((this_sample, SAMFL.samplingMethod, URIRef(self.method_type)))
             if self.date_acquired is not None:
-                g.add((this_sample, SAMFL.samplingTime, Literal(self.date_acquired.isoformat(), datatype=XSD.datetime)))
+                add((this_sample, SAMFL.samplingTime, Literal(self.date_acquired.isoformat(), datatype=XSD.datetime)))
 
-            g.add((this_sample, DCT.accessRights, URIRef(TERM_LOOKUP['access_rights']['public'])))
+            add((this_sample, DCT.accessRights, PUBLIC_ACCESS))
             # TODO: make a register of Entities
             if self.entity_uri is not None:
                 site = URIRef(self.entity_uri)
 
-                g.add((this_sample, SAMFL.relatedSamplingFeature, site))  # could be OM.featureOfInterest
+                add((this_sample, SAMFL.relatedSamplingFeature, site))  # could be OM.featureOfInterest
 
                 # parent
                 if self.entity_type is not None:
-                    g.add((site, RDF.type, URIRef(self.entity_type)))
+                    add((site, RDF.type, URIRef(self.entity_type)))
                 else:
-                    g.add((
-                        site,
-                        RDF.type,
-                        URIRef('http://pid.geoscience.gov.au/def/voc/featureofinteresttype/borehole')
-                    ))
+                    add((site, RDF.type, BOREHOLE))
 
                 site_geometry = BNode()
-                g.add((site, GEOSP.hasGeometry, site_geometry))
-                g.add((site_geometry, RDF.type, SAMFL.Point))  # TODO: extend this for other geometry types
-                g.add((site_geometry, GEOSP.asWKT, Literal(self._generate_parent_wkt(), datatype=GEOSP.wktLiteral)))
-                g.add((site_geometry, GEOSP.asGML, Literal(self._generate_parent_gml(), datatype=GEOSP.wktLiteral)))
+                add((site, GEOSP.hasGeometry, site_geometry))
+                add((site_geometry, RDF.type, SAMFL.Point))  # TODO: extend this for other geometry types
+                add((site_geometry, GEOSP.asWKT, Literal(self._generate_parent_wkt(), datatype=GEOSP.wktLiteral)))
+                add((site_geometry, GEOSP.asGML, Literal(self._generate_parent_gml(), datatype=GEOSP.wktLiteral)))
 
                 site_elevation = BNode()
-                g.add((site, SAMFL.samplingElevation, site_elevation))
-                g.add((site_elevation, RDF.type, SAMFL.Elevation))
+                add((site, SAMFL.samplingElevation, site_elevation))
+                add((site_elevation, RDF.type, SAMFL.Elevation))
                 if self.z is None:
                     z = 'NaN'
                 else:
                     z = self.z
-                g.add((site_elevation, SAMFL.elevation, Literal(z, datatype=XSD.float)))
-                g.add((site_elevation, SAMFL.verticalDatum, URIRef('http://spatialreference.org/ref/epsg/4283/')))
-                g.add((site, SAMFL.sampledFeature, this_sample))
+                add((site_elevation, SAMFL.elevation, Literal(z, datatype=XSD.float)))
+                add((site_elevation, SAMFL.verticalDatum, EPSG_4283))
+                add((site, SAMFL.sampledFeature, this_sample))
 
             # Agents
             # define custodian as an PROV Org with an ISO19115 role of custodian
             custodian_uri = URIRef(self.custodian_uri)
-            g.add((custodian_uri, RDF.type, ORG.Organization))
-            g.add((custodian_uri, FOAF.name, Literal(self.custodian_label, datatype=XSD.string)))
+            add((custodian_uri, RDF.type, ORG.Organization))
+            add((custodian_uri, FOAF.name, Literal(self.custodian_label, datatype=XSD.string)))
             qualified_attribution = BNode()
-            g.add((qualified_attribution, RDF.type, PROV.Attribution))
-            g.add((qualified_attribution, PROV.agent, custodian_uri))
-            g.add((qualified_attribution, PROV.hadRole, AUROLE.custodian))
-            g.add((this_sample, PROV.qualifiedAttribution, qualified_attribution))
+            add((qualified_attribution, RDF.type, PROV.Attribution))
+            add((qualified_attribution, PROV.agent, custodian_uri))
+            add((qualified_attribution, PROV.hadRole, AUROLE.custodian))
+            add((this_sample, PROV.qualifiedAttribution, qualified_attribution))
 
             # if a collector is known, term then a principalInvestigator
             if self.collector is not None:
                 collector = BNode()
-                g.add((collector, RDF.type, PROV.Person))
-                g.add((collector, FOAF.name, Literal(self.collector, datatype=XSD.string)))
+                add((collector, RDF.type, PROV.Person))
+                add((collector, FOAF.name, Literal(self.collector, datatype=XSD.string)))
                 qualified_attribution2 = BNode()
-                g.add((qualified_attribution2, RDF.type, PROV.Attribution))
-                g.add((qualified_attribution2, PROV.agent, collector))
-                g.add((qualified_attribution2, PROV.hadRole, AUROLE.principalInvestigator))
-                g.add((this_sample, PROV.qualifiedAttribution, qualified_attribution2))
+                add((qualified_attribution2, RDF.type, PROV.Attribution))
+                add((qualified_attribution2, PROV.agent, collector))
+                add((qualified_attribution2, PROV.hadRole, AUROLE.principalInvestigator))
+                add((this_sample, PROV.qualifiedAttribution, qualified_attribution2))
         elif model_view == 'dct':
             # this is the cut-down IGSN --> Dublin core mapping describe at http://igsn.github.io/oai/
-            g.add((this_sample, RDF.type, DCT.PhysicalResource))
-            g.add((this_sample, DCT.coverage, wkt))
-            # g.add((this_sample, DCT.creator, Literal('Unknown', datatype=XSD.string)))
+            add((this_sample, RDF.type, DCT.PhysicalResource))
+            add((this_sample, DCT.coverage, wkt))
+            # add((this_sample, DCT.creator, Literal('Unknown', datatype=XSD.string)))
             if self.date_acquired is not None:
-                g.add((this_sample, DCT.date, Literal(self.date_acquired.isoformat(), datatype=XSD.date)))
+                add((this_sample, DCT.date, Literal(self.date_acquired.isoformat(), datatype=XSD.date)))
             if self.remark is not None:
-                g.add((this_sample, DCT.description, Literal(self.remark, datatype=XSD.string)))
+                add((this_sample, DCT.description, Literal(self.remark, datatype=XSD.string)))
             if self.material_type is not None:
-                g.add((this_sample, URIRef('http://purl.org/dc/terms/format'), URIRef(self.material_type)))
-            g.add((this_sample, DCT.identifier, Literal(self.igsn, datatype=XSD.string)))
+                add((this_sample, DCT_FORMAT, URIRef(self.material_type)))
+            add((this_sample, DCT.identifier, Literal(self.igsn, datatype=XSD.string)))
             # define GA as a dct:Agent
-            g.add((ga, RDF.type, DCT.Agent))
-            g.add((this_sample, DCT.publisher, ga))
-            # g.add((this_sample, DCT.relation, ga)) -- no value yet in GA DB
-            # g.add((this_sample, DCT.subject, ga)) -- how is this different to type?
-            # g.add((this_sample, DCT.title, ga)) -- no value at GA
+            add((ga, RDF.type, DCT.Agent))
+            add((this_sample, DCT.publisher, ga))
+            # add((this_sample, DCT.relation, ga)) -- no value yet in GA DB
+            # add((this_sample, DCT.subject, ga)) -- how is this different to type?
+            # add((this_sample, DCT.title, ga)) -- no value at GA
             if self.sample_type is not None:
-                g.add((this_sample, DCT.type, URIRef(self.sample_type)))
+                add((this_sample, DCT.type, URIRef(self.sample_type)))
         elif model_view == 'prov':
-            g.add((this_sample, RDF.type, PROV.Entity))
+            add((this_sample, RDF.type, PROV.Entity))
             # Agents
             # define custodian as an PROV Org with an ISO19115 role of custodian
             custodian_uri = URIRef(self.custodian_uri)
-            g.add((custodian_uri, RDF.type, FOAF.Organization))
-            g.add((custodian_uri, FOAF.name, Literal(self.custodian_label, datatype=XSD.string)))
+            add((custodian_uri, RDF.type, FOAF.Organization))
+            add((custodian_uri, FOAF.name, Literal(self.custodian_label, datatype=XSD.string)))
             qualified_attribution = BNode()
-            g.add((qualified_attribution, RDF.type, PROV.Attribution))
-            g.add((qualified_attribution, PROV.agent, custodian_uri))
-            g.add((qualified_attribution, PROV.hadRole, AUROLE.custodian))
-            g.add((this_sample, PROV.qualifiedAttribution, qualified_attribution))
+            add((qualified_attribution, RDF.type, PROV.Attribution))
+            add((qualified_attribution, PROV.agent, custodian_uri))
+            add((qualified_attribution, PROV.hadRole, AUROLE.custodian))
+            add((this_sample, PROV.qualifiedAttribution, qualified_attribution))
 
             # if a collector is known, term then a principalInvestigator
             if self.collector is not None:
                 collector = BNode()
-                g.add((collector, RDF.type, PROV.Person))
-                g.add((collector, FOAF.name, Literal(self.collector, datatype=XSD.string)))
+                add((collector, RDF.type, PROV.Person))
+                add((collector, FOAF.name, Literal(self.collector, datatype=XSD.string)))
                 qualified_attribution2 = BNode()
-                g.add((qualified_attribution2, RDF.type, PROV.Attribution))
-                g.add((qualified_attribution2, PROV.agent, collector))
-                g.add((qualified_attribution2, PROV.hadRole, AUROLE.principalInvestigator))
-                g.add((this_sample, PROV.qualifiedAttribution, qualified_attribution2))
+                add((qualified_attribution2, RDF.type, PROV.Attribution))
+                add((qualified_attribution2, PROV.agent, collector))
+                add((qualified_attribution2, PROV.hadRole, AUROLE.principalInvestigator))
+                add((this_sample, PROV.qualifiedAttribution, qualified_attribution2))
         elif model_view == 'sosa':
-            SOSA = Namespace('http://www.w3.org/ns/sosa/')
-            g.bind('sosa', SOSA)
             # Sample
-            g.add((this_sample, RDF.type, SOSA.Sample))
+            add((this_sample, RDF.type, SOSA.Sample))
 
             #
             #   Sampling
             #
             # Sampling declaration
             sampling = BNode()
-            g.add((sampling, RDF.type, SOSA.Sampling))
+            add((sampling, RDF.type, SOSA.Sampling))
             if self.date_acquired is not None:
-                g.add((sampling, SOSA.resultTime, Literal(self.date_acquired.isoformat(), datatype=XSD.date)))
-            g.add((this_sample, SOSA.isResultOf, sampling))  # associate
+                add((sampling, SOSA.resultTime, Literal(self.date_acquired.isoformat(), datatype=XSD.date)))
+            add((this_sample, SOSA.isResultOf, sampling))  # associate
 
             #
             #   Sampler
             #
             # Sampler declaration
             sampler = BNode()
-            g.add((sampler, RDF.type, SOSA.Sampler))
-            g.add((sampler, RDF.type, URIRef(self.method_type)))
-            g.add((sampling, SOSA.madeBySampler, sampler))  # associate Sampler (with Sampling)
+            add((sampler, RDF.type, SOSA.Sampler))
+            add((sampler, RDF.type, URIRef(self.method_type)))
+            add((sampling, SOSA.madeBySampler, sampler))  # associate Sampler (with Sampling)
 
             # #
             # #   Procedure
             # #
             # # Procedure declaration
             # procedure = BNode()
-            # g.add((procedure, RDF.type, SOSA.Procedure))
-            # # g.add((this_sample, RDF.type, SOSA.Procedure))
+            # add((procedure, RDF.type, SOSA.Procedure))
+            # # add((this_sample, RDF.type, SOSA.Procedure))
             #  TODO: domsthing about missing if any method info is not known
             # # associate Procedure
-            # g.add((this_sample, SOSA.usedProcedure, procedure))
-
-            SAMP = Namespace('http://www.w3.org/ns/sosa/sampling/')
-            g.bind('sampling', SAMP)
+            # add((this_sample, SOSA.usedProcedure, procedure))
 
             # SampleRelationship to Site
             if self.entity_uri is not None:
                 site = URIRef(self.entity_uri)
                 sr = BNode()
-                g.add((sr, RDF.type, SAMP.SampleRelationship))
-                g.add((sr, SAMP.relatedSample, site))
+                add((sr, RDF.type, SAMP.SampleRelationship))
+                add((sr, SAMP.relatedSample, site))
                 # TODO: replace with a real Concept URI
-                g.add((sr, SAMP.natureOfRelationship, URIRef('http://example.org/sampling/relationship/subsample')))
-                g.add((this_sample, SAMP.hasSampleRelationship, sr))  # associate
+                add((sr, SAMP.natureOfRelationship, SUBSAMPLE))
+                add((this_sample, SAMP.hasSampleRelationship, sr))  # associate
 
                 # Site details
-                g.add((site, RDF.type, OWL.NamedIndividual))
+                add((site, RDF.type, OWL.NamedIndividual))
                 # specific type of Site
                 if self.entity_type is not None:
                     site_type = URIRef(self.entity_type)
                 else:
-                    site_type = URIRef('http://pid.geoscience.gov.au/def/voc/featureofinteresttype/borehole')
-                g.add((site, RDF.type, site_type))
-                g.add((site_type, RDFS.subClassOf, SOSA.Sample))
+                    site_type = BOREHOLE
+                add((site, RDF.type, site_type))
+                add((site_type, RDFS.subClassOf, SOSA.Sample))
 
                 # FOI geometry
                 site_geometry = BNode()
-                g.add((site, GEOSP.hasGeometry, site_geometry))
-                g.add((site_geometry, RDF.type, GEOSP.Geometry))
-                g.add((site_geometry, GEOSP.asWKT, Literal(self._generate_parent_wkt(), datatype=GEOSP.wktLiteral)))
-                # g.add((site_geometry, GEOSP.asGML, Literal(self._generate_parent_gml(), datatype=GEOSP.wktLiteral)))
+                add((site, GEOSP.hasGeometry, site_geometry))
+                add((site_geometry, RDF.type, GEOSP.Geometry))
+                add((site_geometry, GEOSP.asWKT, Literal(self._generate_parent_wkt(), datatype=GEOSP.wktLiteral)))
+                # add((site_geometry, GEOSP.asGML, Literal(self._generate_parent_gml(), datatype=GEOSP.wktLiteral)))
                 # FOI elevation
                 site_elevation = BNode()
-                g.add((site, SAMFL.samplingElevation, site_elevation))
-                g.add((site_elevation, RDF.type, SAMFL.Elevation))
+                add((site, SAMFL.samplingElevation, site_elevation))
+                add((site_elevation, RDF.type, SAMFL.Elevation))
                 if self.z is None:
                     z = 'NaN'
                 else:
                     z = self.z
-                g.add((site_elevation, SAMFL.elevation, Literal(z, datatype=XSD.float)))
-                g.add((site_elevation, SAMFL.verticalDatum,
-                       Literal("http://spatialreference.org/ref/epsg/4283/", datatype=XSD.anyUri)))
+                add((site_elevation, SAMFL.elevation, Literal(z, datatype=XSD.float)))
+                add((site_elevation, SAMFL.verticalDatum, EPSG_4283_LITERAL))
 
             #
             #   Feature of Interest
             #
             # domain feature, same for all Samples
-            domain_feature = URIRef('http://registry.it.csiro.au/sandbox/csiro/oznome/feature/earth-realm/lithosphere')
-            g.add((domain_feature, RDF.type, SOSA.FeatureOfInterest))
-            g.add((domain_feature, SKOS.exactMatch, URIRef('http://sweet.jpl.nasa.gov/2.3/realmGeol.owl#Lithosphere')))
-            g.add((this_sample, SOSA.isSampleOf, domain_feature))  # associate
+            domain_feature = LITHOSPHERE
+            add((domain_feature, RDF.type, SOSA.FeatureOfInterest))
+            add((domain_feature, SKOS.exactMatch, SWEET_LITHOSPHERE))
+            add((this_sample, SOSA.isSampleOf, domain_feature))  # associate
 
-            g.add((this_sample, RDF.type, PROV.Entity))
+            add((this_sample, RDF.type, PROV.Entity))
 
             # Provenance Agents
             # define custodian as an PROV Org with an ISO19115 role of custodian
             custodian_uri = URIRef(self.custodian_uri)
-            g.add((custodian_uri, RDF.type, FOAF.Organization))
-            g.add((custodian_uri, FOAF.name, Literal(self.custodian_label, datatype=XSD.string)))
+            add((custodian_uri, RDF.type, FOAF.Organization))
+            add((custodian_uri, FOAF.name, Literal(self.custodian_label, datatype=XSD.string)))
             qualified_attribution = BNode()
-            g.add((qualified_attribution, RDF.type, PROV.Attribution))
-            g.add((qualified_attribution, PROV.agent, custodian_uri))
-            g.add((qualified_attribution, PROV.hadRole, AUROLE.custodian))
-            g.add((this_sample, PROV.qualifiedAttribution, qualified_attribution))
+            add((qualified_attribution, RDF.type, PROV.Attribution))
+            add((qualified_attribution, PROV.agent, custodian_uri))
+            add((qualified_attribution, PROV.hadRole, AUROLE.custodian))
+            add((this_sample, PROV.qualifiedAttribution, qualified_attribution))
 
             # if a collector is known, term then a principalInvestigator
             if self.collector is not None:
                 collector = BNode()
-                g.add((collector, RDF.type, PROV.Person))
-                g.add((collector, FOAF.name, Literal(self.collector, datatype=XSD.string)))
+                add((collector, RDF.type, PROV.Person))
+                add((collector, FOAF.name, Literal(self.collector, datatype=XSD.string)))
                 qualified_attribution2 = BNode()
-                g.add((qualified_attribution2, RDF.type, PROV.Attribution))
-                g.add((qualified_attribution2, PROV.agent, collector))
-                g.add((qualified_attribution2, PROV.hadRole, AUROLE.principalInvestigator))
-                g.add((this_sample, PROV.qualifiedAttribution, qualified_attribution2))
+                add((qualified_attribution2, RDF.type, PROV.Attribution))
+                add((qualified_attribution2, PROV.agent, collector))
+                add((qualified_attribution2, PROV.hadRole, AUROLE.principalInvestigator))
+                add((this_sample, PROV.qualifiedAttribution, qualified_attribution2))
 
-        return g.serialize(format=LDAPI.get_rdf_parser_for_mimetype(rdf_mime))
+        return triples
 
     def _is_xml_export_valid(self, xml_string):
         """
@@ -948,6 +1177,20 @@ class Sample:
 
         :param model_view: string of one of the model view names available for Sample objects ['igsn', 'dct', '',
             'default']
+        :return: HTTP Response
+        """
+        return Response(self._export_html_page(model_view), headers=self._make_pingback_headers())
+
+    def _make_pingback_headers(self):
+        # the Pingback header links, as they are valid for all HTML views
+        pingback_uri = conf.URI_SAMPLE_INSTANCE_BASE + self.igsn + "/pingback"
+        return {
+            'Link': '<{}>;rel = "http://www.w3.org/ns/prov#pingback"'.format(pingback_uri)
+        }
+
+    def _export_html_page(self, model_view='default'):
+        """
+        :param model_view: string of one of the model view names available for Sample objects in HTML
         :return: HTML string
         """
         if model_view == 'igsn-o':
@@ -973,13 +1216,12 @@ class Sample:
             )
         elif model_view == 'prov':
             view_title = 'PROV Ontology view'
-            prov_turtle = self.export_rdf('prov', 'text/turtle')
-            g = Graph().parse(data=prov_turtle, format='turtle')
+            triples = self._rdf_triples('prov')
 
             sample_table_html = render_template(
                 'class_sample_prov.html',
-                visjs=self._make_vsjs(g),
-                prov_turtle=prov_turtle.decode('utf-8'),
+                visjs=self._make_vsjs(triples),
+                prov_turtle=rdf_writer.write_turtle(triples, VIEW_PREFIXES['prov']),
             )
         else:  # elif model_view == 'dct':
             view_title = 'Dublin Core view'
@@ -1003,28 +1245,19 @@ class Sample:
         else:
             year_acquired = ''
 
-        # add in the Pingback header links as they are valid for all HTML views
-        pingback_uri = conf.URI_SAMPLE_INSTANCE_BASE + self.igsn + "/pingback"
-        headers = {
-            'Link': '<{}>;rel = "http://www.w3.org/ns/prov#pingback"'.format(pingback_uri)
-        }
-
-        return Response(
-            render_template(
-                'page_sample.html',
-                organisation_branding=TERM_LOOKUP['custodian'].get(self.custodian_uri) if TERM_LOOKUP['custodian'].get(self.custodian_uri) is not None else 'ga',
-                view=model_view,
-                igsn=self.igsn,
-                year_acquired=year_acquired,
-                view_title=view_title,
-                sample_table_html=sample_table_html,
-                gm_key=conf.GOOGLE_MAPS_API_KEY,
-                lat=self.y if self.y is not None else self.centroid_lat,
-                lon=self.x if self.x is not None else self.centroid_lon,
-                gmap_bbox=self._generate_sample_gmap_bbox(),
-                citation=self._make_citation()
-            ),
-            headers=headers
+        return render_template(
+            'page_sample.html',
+            organisation_branding=TERM_LOOKUP['custodian'].get(self.custodian_uri) if TERM_LOOKUP['custodian'].get(self.custodian_uri) is not None else 'ga',
+            view=model_view,
+            igsn=self.igsn,
+            year_acquired=year_acquired,
+            view_title=view_title,
+            sample_table_html=sample_table_html,
+            gm_key=conf.GOOGLE_MAPS_API_KEY,
+            lat=self.y if self.y is not None else self.geometry.centroid()[0],
+            lon=self.x if self.x is not None else self.geometry.centroid()[1],
+            gmap_bbox=self._generate_sample_gmap_bbox(),
+            citation=self._make_citation()
         )
 
 
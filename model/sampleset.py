@@ -0,0 +1,158 @@
+"""
+This file contains the columnar decoding of pages of Samples from GA's Oracle XML API's SampleSet responses
+
+A page is decoded straight into a column per value, rather than a Sample per ROW, so renderers of whole pages, such
+as OAI-PMH ListIdentifiers, can iterate over or slice the page without making a Python object for each Sample.
+"""
+import calendar
+from array import array
+from datetime import date
+from controller.oai_datestamp import fast_str2datetime
+from . import upstream
+from .sample import _vocab_uri
+
+NO_DATE = -2 ** 63  # the value, in date columns, of rows without that date
+NO_VALUE = float('nan')  # the value, in number columns, of rows without that number
+_ABSENT = object()
+
+# the ROW columns decoded as vocab URI category codes, as (column, value name, vocab type)
+VOCAB_COLUMNS = [
+    ('SAMPLE_TYPE_NEW', 'sample_type', 'sample_type'),
+    ('SAMPLING_METHOD', 'method_type', 'method_type'),
+    ('MATERIAL_CLASS', 'material_type', 'material_type'),
+    ('LITHNAME', 'lith', 'lithology'),
+    ('ENTITY_TYPE', 'entity_type', 'entity_type')
+]
+
+
+class SampleSet:
+    """
+    A page of Samples held as columns:
+
+        igsn: a list of IGSN strs
+        date_acquired: an array of int64 day numbers, as date.toordinal() gives, or NO_DATE
+        date_modified: an array of int64 seconds since the epoch (UTC), or NO_DATE
+        x, y, z: arrays of float64 point coordinates, or NO_VALUE
+        codes: a dict of value name, from VOCAB_COLUMNS, to an array of category codes: the index, in
+            categories[value name], of each row's vocab URI
+        categories: a dict of value name to a list of vocab URIs, with None for rows without that column
+
+    Columns are in the order of the response's ROWs. SampleSets are shared, by the OAI-PMH page cache, so must not be
+    modified once made.
+    """
+    __slots__ = ('igsn', 'date_acquired', 'date_modified', 'x', 'y', 'z', 'codes', 'categories')
+
+    def __init__(self, igsn=None, date_acquired=None, date_modified=None, x=None, y=None, z=None, codes=None,
+                 categories=None):
+        self.igsn = igsn if igsn is not None else []
+        self.date_acquired = date_acquired if date_acquired is not None else array('q')
+        self.date_modified = date_modified if date_modified is not None else array('q')
+        self.x = x if x is not None else array('d')
+        self.y = y if y is not None else array('d')
+        self.z = z if z is not None else array('d')
+        self.codes = codes if codes is not None else dict((name, array('H')) for column, name, t in VOCAB_COLUMNS)
+        self.categories = categories if categories is not None else \
+            dict((name, []) for column, name, t in VOCAB_COLUMNS)
+
+    @classmethod
+    def from_api_response(cls, stream):
+        """
+        Decodes a SampleSet API response, as it is read, into columns
+
+        :param stream: binary file-like object of the response XML
+        :return: a SampleSet, empty if the response has no ROWs
+        """
+        sampleset = cls()
+        # category codes by column text, per vocab column
+        code_of_text = dict((name, {}) for column, name, t in VOCAB_COLUMNS)
+
+        for row in upstream.iter_rows(stream):
+            values = {}
+            for child in row.iterchildren():
+                if child.tag == 'GEOM':
+                    point = child.find('SDO_POINT')
+                    if point is not None:
+                        for coordinate in point.iterchildren():
+                            values[coordinate.tag] = coordinate.text
+                else:
+                    values[child.tag] = child.text
+
+            sampleset.igsn.append(values.get('IGSN') or '')
+            acquired = _datetime(values, 'ACQUIREDATE')
+            sampleset.date_acquired.append(acquired.toordinal() if acquired is not None else NO_DATE)
+            modified = _datetime(values, 'MODIFIED_DATE')
+            sampleset.date_modified.append(
+                calendar.timegm(modified.utctimetuple()) if modified is not None else NO_DATE
+            )
+            sampleset.x.append(_float(values.get('X')))
+            sampleset.y.append(_float(values.get('Y')))
+            sampleset.z.append(_float(values.get('Z')))
+
+            for column, name, vocab_type in VOCAB_COLUMNS:
+                # as for SampleRecords, rows without the column have no vocab URI, rather than the 'unknown' one
+                text = values.get(column, _ABSENT)
+                code = code_of_text[name].get(text)
+                if code is None:
+                    uri = _vocab_uri(text, vocab_type) if text is not _ABSENT else None
+                    code = code_of_text[name][text] = _category_code(sampleset.categories[name], uri)
+                sampleset.codes[name].append(code)
+
+        return sampleset
+
+    def __len__(self):
+        return len(self.igsn)
+
+    def __getitem__(self, index):
+        """
+        :param index: a slice of rows
+        :return: a SampleSet of the sliced rows, sharing this SampleSet's categories
+        """
+        if not isinstance(index, slice):
+            raise TypeError('SampleSets can only be sliced')
+        return SampleSet(
+            self.igsn[index],
+            self.date_acquired[index],
+            self.date_modified[index],
+            self.x[index],
+            self.y[index],
+            self.z[index],
+            dict((name, codes[index]) for name, codes in self.codes.items()),
+            self.categories
+        )
+
+    def vocab(self, name):
+        """
+        :param name: a value name from VOCAB_COLUMNS, such as 'material_type'
+        :return: a list of each row's vocab URI, or None, for that value
+        """
+        categories = self.categories[name]
+        return [categories[code] for code in self.codes[name]]
+
+    def headers(self):
+        """
+        The OAI-PMH ListIdentifiers headers of this page's Samples
+
+        :return: a generator of (IGSN, datestamp) tuples, with the date acquired, or None, as the datestamp
+        """
+        for igsn, acquired in zip(self.igsn, self.date_acquired):
+            yield igsn, date.fromordinal(acquired) if acquired != NO_DATE else None
+
+
+def _datetime(values, column):
+    text = values.get(column)
+    if text is None:
+        return None  # as an empty or missing date column gives no date
+    return fast_str2datetime(text, column)
+
+
+def _category_code(categories, uri):
+    if uri not in categories:
+        categories.append(uri)
+    return categories.index(uri)
+
+
+def _float(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return NO_VALUE
@@ -0,0 +1,394 @@
+"""
+This file contains the shared HTTP client used for all calls to GA's Oracle XML API (dbforms.ga.gov.au)
+
+A single requests Session is kept per process so that connections to the API are pooled and kept alive between calls
+rather than a new TCP (and TLS) connection being made for every request. All calls have connect & read timeouts and
+transient failures are retried a bounded number of times with jittered exponential backoff.
+
+Responses are parsed as they are streamed from the API, by iter_rows(), rather than being buffered and parsed whole.
+
+Concurrent fetches of the same URL are coalesced into one request, within a process and, if UPSTREAM_COALESCE_DIR is
+set, across worker processes.
+
+A circuit breaker stops calls to the API for a while after it has failed, or been too slow, several times in a row so
+that requests fail fast, or are served from stale cached data, rather than all waiting on it.
+"""
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from lxml import etree, objectify
+import _config as conf
+from .cache import SingleFlight
+try:
+    import fcntl
+except ImportError:  # not available on Windows, so no cross-process coalescing there
+    fcntl = None
+
+# HTTP statuses from the API, or a proxy in front of it, that are worth retrying
+RETRY_STATUSES = (502, 503, 504)
+# bytes read from a response stream at a time
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """
+    Raised instead of calling the API while the circuit breaker is open
+    """
+    pass
+
+
+class UpstreamError(requests.HTTPError):
+    """
+    The Oracle XML API gave an error response, or one that is not its XML, rather than data or its 'No data' message
+    """
+    pass
+
+
+class CircuitBreaker:
+    """
+    Tracks the outcome of API calls. After failure_threshold consecutive failures the breaker opens and calls are
+    refused for reset_after seconds. A single trial call is then allowed through (half-open): if it succeeds the breaker
+    closes, otherwise it opens again.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold, reset_after):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.state = CircuitBreaker.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+        self.last_failure = None
+        self.last_latency = None
+        self.calls = 0
+        self.failures = 0
+        self.refused = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        :return: True if a call may be made now, else False (and the refusal is counted)
+        """
+        with self._lock:
+            now = time.time()
+            if self.state == CircuitBreaker.OPEN and now - self.opened_at >= self.reset_after:
+                self.state = CircuitBreaker.HALF_OPEN
+                self.trial_started_at = None
+
+            if self.state == CircuitBreaker.HALF_OPEN:
+                # let one trial call through, or another if the last one never reported back
+                if self.trial_started_at is None or now - self.trial_started_at >= self.reset_after:
+                    self.trial_started_at = now
+                    return True
+            elif self.state == CircuitBreaker.CLOSED:
+                return True
+
+            self.refused += 1
+            return False
+
+    def record_success(self, latency):
+        with self._lock:
+            self.calls += 1
+            self.last_latency = latency
+            self.consecutive_failures = 0
+            self.state = CircuitBreaker.CLOSED
+
+    def record_failure(self, reason, latency=None):
+        with self._lock:
+            self.calls += 1
+            self.failures += 1
+            self.last_latency = latency
+            self.last_failure = reason
+            self.consecutive_failures += 1
+            if self.state == CircuitBreaker.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != CircuitBreaker.OPEN:
+                    print('Oracle XML API circuit breaker opened: {}'.format(reason))
+                self.state = CircuitBreaker.OPEN
+                self.opened_at = time.time()
+
+    def retry_after(self):
+        """
+        :return: seconds until a trial call will be allowed, or 0 if calls are allowed now
+        """
+        with self._lock:
+            if self.state != CircuitBreaker.OPEN:
+                return 0
+            return max(0, int(self.opened_at + self.reset_after - time.time()) + 1)
+
+    def stats(self):
+        """
+        :return: a dict of the breaker's state & counters, for monitoring
+        """
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'last_failure': self.last_failure,
+                'last_latency': self.last_latency,
+                'calls': self.calls,
+                'failures': self.failures,
+                'refused': self.refused
+            }
+
+
+BREAKER = CircuitBreaker(conf.UPSTREAM_BREAKER_FAILURES, conf.UPSTREAM_BREAKER_RESET)
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_flights = SingleFlight()
+_executor = None
+_executor_pid = None
+
+
+def get_session():
+    """
+    Returns this process' pooled Session, creating it if needed.
+
+    The Session is recreated if the process has been forked since it was made (e.g. by a pre-forking WSGI server) as
+    pooled sockets must not be shared between processes.
+
+    :return: a requests Session
+    """
+    global _session, _session_pid
+
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,  # there is only the one upstream host
+                    pool_maxsize=conf.UPSTREAM_POOL_SIZE,
+                    max_retries=0  # retries are handled in get() so that they can be jittered
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+                _session_pid = pid
+
+    return _session
+
+
+def submit(fn, *args):
+    """
+    Runs a function, typically one that calls the API, on this process' pool of background threads so that it can
+    proceed concurrently with other API calls made by the caller.
+
+    :param fn: the function to run
+    :param args: its arguments
+    :return: a concurrent.futures Future for its result
+    """
+    global _executor, _executor_pid
+
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _session_lock:
+            if _executor is None or _executor_pid != pid:
+                # threads do not survive a fork so a forked process needs its own pool
+                _executor = ThreadPoolExecutor(max_workers=conf.UPSTREAM_BACKGROUND_WORKERS)
+                _executor_pid = pid
+
+    return _executor.submit(fn, *args)
+
+
+def _backoff(attempt):
+    """
+    Returns the number of seconds to wait before retry number attempt + 1, using 'full jitter' exponential backoff
+
+    :param attempt: the zero-based number of the attempt that just failed
+    :return: a float number of seconds
+    """
+    ceiling = min(conf.UPSTREAM_BACKOFF_MAX, conf.UPSTREAM_BACKOFF * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+def get(url, timeout=None, stream=False):
+    """
+    GETs a URL from the Oracle XML API using the pooled Session
+
+    Connection errors, timeouts and gateway errors are retried up to UPSTREAM_RETRIES times. Unless stream is set, the
+    response body is read before returning so the connection is released back to the pool. If it is set, the caller
+    must read the body from the response's raw stream and then close the response.
+
+    The outcome is recorded by the circuit breaker: a call that still fails after its retries, or that takes longer than
+    UPSTREAM_BREAKER_SLOW seconds, counts as a failure. While the breaker is open no call is made.
+
+    :param url: the Oracle XML API URL
+    :param timeout: optional (connect, read) timeout tuple, defaults to the configured upstream timeouts
+    :param stream: whether or not to leave the response body to be streamed by the caller
+    :return: a requests Response, with a status of 200
+    :raises CircuitOpenError: if the breaker is open
+    :raises UpstreamError: if the API gives any other status, once any retries have been made
+    """
+    if timeout is None:
+        timeout = (conf.UPSTREAM_CONNECT_TIMEOUT, conf.UPSTREAM_READ_TIMEOUT)
+
+    if not BREAKER.allow():
+        raise CircuitOpenError('The Oracle XML API is unavailable, retry in {} seconds'.format(BREAKER.retry_after()))
+
+    started = time.time()
+    attempts = conf.UPSTREAM_RETRIES + 1
+    for attempt in range(attempts):
+        last_attempt = attempt == attempts - 1
+        try:
+            r = get_session().get(url, timeout=timeout, stream=stream)
+            if r.status_code not in RETRY_STATUSES or last_attempt:
+                if stream:
+                    r.raw.decode_content = True  # un-gzip as it is read
+                else:
+                    r.content  # read the body to release the connection
+                latency = time.time() - started
+                if r.status_code >= 500:
+                    BREAKER.record_failure('HTTP {}'.format(r.status_code), latency)
+                elif latency > conf.UPSTREAM_BREAKER_SLOW:
+                    BREAKER.record_failure('slow response: {:.1f}s'.format(latency), latency)
+                else:
+                    BREAKER.record_success(latency)
+                if r.status_code != 200:
+                    r.close()
+                    raise UpstreamError('HTTP {} from the Oracle XML API'.format(r.status_code), response=r)
+                return r
+            r.close()
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if last_attempt:
+                BREAKER.record_failure(type(e).__name__, time.time() - started)
+                raise
+        time.sleep(_backoff(attempt))
+
+
+def fetch(url, parse=None):
+    """
+    GETs a URL from the Oracle XML API, as get() does, but shares the request between concurrent callers: while a fetch
+    of a URL is in flight, any other fetch of the same URL, with the same parse function, waits for and is given its
+    result rather than making its own request.
+
+    If a parse function is given, it is given the response body as a stream so that it can parse it as it arrives. The
+    parsed result is shared by all callers so it must not be modified.
+
+    :param url: the Oracle XML API URL
+    :param parse: optional function, taking a binary file-like object, to apply to the response body once for all callers
+    :return: the response body bytes, or parse(body)
+    """
+    def fetch_and_parse():
+        if conf.UPSTREAM_COALESCE_DIR is not None and fcntl is not None:
+            content = _fetch_between_processes(url)
+            return parse(BytesIO(content)) if parse is not None else content
+        elif parse is None:
+            return get(url).content
+
+        r = get(url, stream=True)
+        try:
+            return parse(r.raw)
+        finally:
+            r.close()
+
+    return _flights.do((url, parse), fetch_and_parse)
+
+
+def _fetch_between_processes(url):
+    """
+    Fetches a URL holding an exclusive lock on a lock file, specific to the URL, in UPSTREAM_COALESCE_DIR. The response
+    body is kept in that directory for UPSTREAM_COALESCE_WINDOW seconds so that other processes that were waiting on the
+    lock for the same URL use it rather than making their own request.
+
+    :param url: the Oracle XML API URL
+    :return: the response body bytes
+    """
+    path = os.path.join(conf.UPSTREAM_COALESCE_DIR, hashlib.sha1(url.encode('utf-8')).hexdigest())
+    with open(path + '.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            try:
+                if time.time() - os.path.getmtime(path) < conf.UPSTREAM_COALESCE_WINDOW:
+                    with open(path, 'rb') as f:
+                        return f.read()
+            except OSError:
+                pass  # no recent result for this URL
+
+            content = get(url).content
+            tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+    if random.random() < 0.01:
+        _remove_old_results()
+
+    return content
+
+
+def _remove_old_results():
+    """
+    Deletes results, and their lock files, left in UPSTREAM_COALESCE_DIR that are well past UPSTREAM_COALESCE_WINDOW
+    """
+    cutoff = time.time() - 10 * conf.UPSTREAM_COALESCE_WINDOW
+    for name in os.listdir(conf.UPSTREAM_COALESCE_DIR):
+        path = os.path.join(conf.UPSTREAM_COALESCE_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass  # removed by another process
+
+
+def iter_rows(stream, objectified=False):
+    """
+    Parses an Oracle XML API response incrementally, as it is read, yielding each ROW element that has an IGSN. Each ROW
+    is cleared, and removed from the tree, once the next is asked for so only one is held in memory at a time.
+
+    A response with no such ROW, such as the API's 'No data' response, yields nothing.
+
+    :param stream: binary file-like object of the response XML
+    :param objectified: whether or not to make the ROWs lxml objectify elements, as objectify.fromstring() would
+    :return: a generator of ROW elements
+    :raises UpstreamError: if the response is neither XML nor the API's 'No data' message, e.g. an HTML error page
+    :raises XMLSyntaxError: if the XML is cut short, after its first ROW
+    """
+    parser = etree.XMLPullParser(events=('end',), tag='ROW', remove_blank_text=objectified)
+    if objectified:
+        parser.set_element_class_lookup(objectify.ObjectifyElementClassLookup())
+
+    found = False
+    head = b''  # the start of the response, until the first ROW, to tell a 'No data' message from an error
+    while True:
+        chunk = stream.read(STREAM_CHUNK_SIZE)
+        if not found and len(head) < STREAM_CHUNK_SIZE:
+            head += chunk[:STREAM_CHUNK_SIZE - len(head)]
+        error = None
+        try:
+            if chunk:
+                parser.feed(chunk)
+            else:
+                parser.close()
+        except etree.XMLSyntaxError as e:
+            error = e
+
+        for event, row in parser.read_events():
+            if row.find('IGSN') is not None:
+                found = True
+                yield row
+            row.clear()
+            parent = row.getparent()
+            if parent is not None:
+                parent.remove(row)
+
+        if error is not None:
+            if found:
+                raise error  # XML cut short
+            if b'No data' in head:
+                return  # the API's plain text 'No data' message
+            raise UpstreamError('The Oracle XML API gave a response that is not its XML: {}'.format(error)) from error
+        if not chunk:
+            return